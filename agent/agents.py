@@ -1,3 +1,4 @@
+import os
 from dotenv import load_dotenv
 
 from crewai import Agent
@@ -5,14 +6,36 @@ from textwrap import dedent
 from langchain_openai import ChatOpenAI
 from langchain_community.llms import Ollama
 from agent.tools import PMTools
+from agent.llm_cache import DiskLLMCache
+from agent.tracing import TraceCallbackHandler
+from agent.progress import ProgressCallbackHandler
 
 
 class PMAgents:
 
-    def __init__(self):
+    # Whether LLM responses are streamed token by token
+    STREAMING = os.environ.get("LLM_STREAMING", "true").lower() != "false"
 
-        # Define models
-        self.OpenAI_GPT4o_mini = ChatOpenAI(model_name="gpt-4o-mini", temperature=0.7)
+    def __init__(self, llm_cache=None, llm=None, pmbok_tools=None):
+
+        # Opt-in response cache, e.g. DiskLLMCache or one configured from LLM_CACHE_DIR
+        self.llm_cache = llm_cache if llm_cache is not None else DiskLLMCache.from_env()
+
+        # Define models, unless a model (e.g. a local or stub LLM) is given
+        self.llm = llm
+        if self.llm is None:
+            self.llm = ChatOpenAI(
+                model_name="gpt-4o-mini",
+                temperature=0.7,
+                cache=self.llm_cache,
+                # Stream tokens to the progress of the run as they are generated
+                streaming=self.STREAMING,
+                stream_usage=True,
+                callbacks=[TraceCallbackHandler(), ProgressCallbackHandler()],
+            )
+
+        # PMBOK search tools, looked up on first use unless given
+        self._pmbok_tools = pmbok_tools
 
         # For local llm
         # self.Ollama = Ollama(model="llama3.1", base_url="http://localhost:11434")
@@ -20,6 +43,11 @@ class PMAgents:
         # os.environ["OPENAI_API_BASE"] = "http://localhost:1234/v1"
         # os.environ["OPENAI_API_KEY"] = "lm-studio"
 
+    def pmbok_tools(self):
+        if self._pmbok_tools is None:
+            self._pmbok_tools = PMTools.pmbok_tools()
+        return self._pmbok_tools
+
     def project_manager(self):
         return Agent(
             role="Project Manager at Healthcare Facilitation Group (HFG)",
@@ -29,8 +57,8 @@ class PMAgents:
             goal=dedent(
                 """Develop comprehensive, PMBOK-aligned project workbooks that effectively cover all elements of project management, tailored to meet unique client needs"""
             ),
-            llm=self.OpenAI_GPT4o_mini,
-            tools=[PMTools.read_pmbok],
+            llm=self.llm,
+            tools=self.pmbok_tools(),
         )
 
     def interviewing_agent(self):
@@ -42,7 +70,7 @@ class PMAgents:
             goal=dedent(
                 """Help clients articulate their vision and needs clearly, ensuring all essential project management aspects are covered during the interview process"""
             ),
-            llm=self.OpenAI_GPT4o_mini,
+            llm=self.llm,
         )
 
     def writing_agent(self):
@@ -54,7 +82,7 @@ class PMAgents:
             goal=dedent(
                 """Create comprehensive, PMBOK-aligned project workbooks that ensure clarity and accountability throughout the project lifecycle."""
             ),
-            llm=self.OpenAI_GPT4o_mini,
+            llm=self.llm,
         )
 
     def document_analyst(self):
@@ -66,6 +94,6 @@ class PMAgents:
             goal=dedent(
                 """Extract, analyze, and synthesize critical information from various project-related documents, ensuring comprehensive understanding and effective utilization of available data"""
             ),
-            llm=self.OpenAI_GPT4o_mini,
-            tools=[PMTools.read_pmbok],
+            llm=self.llm,
+            tools=self.pmbok_tools(),
         )
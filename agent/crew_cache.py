@@ -0,0 +1,108 @@
+import threading
+from contextlib import contextmanager
+
+
+class CrewCache:
+    """
+    Per-process cache of the crew of each client.
+
+    Building a PMCrew creates LLM clients, the PMBOK tools and a Notion client,
+    which may create the client's page. The cache builds the agents once for the
+    process and the crew of each client once, so repeated runs skip that setup.
+    Runs for the same client are serialized, as they write to the same page and
+    share the crew's Notion logs.
+    """
+
+    def __init__(self):
+        self._crews = {}
+        self._client_locks = {}
+        self._agents = None
+        self._lock = threading.Lock()
+
+    def _shared_agents(self):
+        from agent.agents import PMAgents
+
+        with self._lock:
+            if self._agents is None:
+                self._agents = PMAgents()
+            return self._agents
+
+    def _client_lock(self, client_id):
+        with self._lock:
+            return self._client_locks.setdefault(client_id, threading.Lock())
+
+    def get(self, client_id):
+        """
+        Get the crew of a client, building it on first use.
+
+        Returns:
+            PMCrew: The client's crew.
+        """
+        with self._client_lock(client_id):
+            return self._get(client_id)
+
+    def _get(self, client_id):
+        from agent.workflow import PMCrew
+
+        # Called with the client's lock held, so the crew is only built once
+        with self._lock:
+            crew = self._crews.get(client_id)
+
+        if crew is None:
+            crew = PMCrew(client_id=client_id, agents=self._shared_agents())
+            with self._lock:
+                self._crews[client_id] = crew
+        return crew
+
+    @contextmanager
+    def session(self, client_id):
+        """
+        Use the crew of a client for a run, with no other run of the client at the same time.
+
+        The crew's Notion logs are cleared at the start of the run. If the run
+        fails, the crew is dropped, so the next run starts from a fresh one.
+
+        Yields:
+            PMCrew: The client's crew.
+        """
+        with self._client_lock(client_id):
+            crew = self._get(client_id)
+            crew.tasks.pm_tools.notion.logs = {}
+            try:
+                yield crew
+            except Exception:
+                self.invalidate(client_id)
+                raise
+
+    def invalidate(self, client_id=None):
+        """
+        Drop the cached crew of a client, or of every client and the shared agents.
+
+        Args:
+            client_id (str or None): The client ID, or None to drop everything.
+        """
+        with self._lock:
+            if client_id is None:
+                self._crews.clear()
+                self._agents = None
+            else:
+                self._crews.pop(client_id, None)
+
+
+_crew_cache = None
+_crew_cache_lock = threading.Lock()
+
+
+def get_crew_cache():
+    """
+    Get the crew cache of the process, creating it on first use.
+
+    Returns:
+        CrewCache: The shared crew cache.
+    """
+    global _crew_cache
+
+    with _crew_cache_lock:
+        if _crew_cache is None:
+            _crew_cache = CrewCache()
+        return _crew_cache
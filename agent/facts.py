@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+TRANSCRIPT_FACTS_DB = os.environ.get("TRANSCRIPT_FACTS_DB", ".cache/transcript_facts.sqlite3")
+
+
+def transcript_key(transcript):
+    """
+    Hash the content of a transcript, ignoring whitespace.
+
+    Returns:
+        str: The sha256 hex digest of the transcript.
+    """
+    return hashlib.sha256(" ".join(transcript.split()).encode("utf-8")).hexdigest()
+
+
+class TranscriptFactStore:
+    """
+    Local SQLite store of the workbook elements extracted from each transcript.
+
+    Facts are stored per client and keyed by the content hash of the transcript
+    they were extracted from, so a transcript is only sent to the LLM the first
+    time it is processed for a client.
+    """
+
+    def __init__(self, db_path=TRANSCRIPT_FACTS_DB):
+        """
+        Args:
+            db_path (str): The path of the SQLite database.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transcript_facts (
+                client_id TEXT NOT NULL,
+                transcript_key TEXT NOT NULL,
+                elements TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (client_id, transcript_key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+            return cursor
+
+    def get_all(self, client_id):
+        """
+        Get the facts of every transcript processed for a client.
+
+        Returns:
+            dict: The workbook elements of each transcript by transcript key, oldest first.
+        """
+        rows = self._execute(
+            "SELECT transcript_key, elements FROM transcript_facts WHERE client_id = ? ORDER BY created_at",
+            (client_id,),
+        ).fetchall()
+        return {key: json.loads(elements) for key, elements in rows}
+
+    def put(self, client_id, key, elements):
+        """Store the workbook elements extracted from a transcript."""
+        self._execute(
+            "INSERT OR REPLACE INTO transcript_facts (client_id, transcript_key, elements, created_at) VALUES (?, ?, ?, ?)",
+            (client_id, key, json.dumps(elements), time.time()),
+        )
+
+    def delete(self, client_id, keys):
+        """Forget the facts of transcripts of a client, e.g. transcripts that were removed."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM transcript_facts WHERE client_id = ? AND transcript_key = ?",
+                [(client_id, key) for key in keys],
+            )
+            self._conn.commit()
+
+    def clear(self, client_id):
+        """Forget the facts of a client, so all its transcripts are processed again."""
+        self._execute("DELETE FROM transcript_facts WHERE client_id = ?", (client_id,))
+
+
+_fact_store = None
+_fact_store_lock = threading.Lock()
+
+
+def get_fact_store():
+    """
+    Get the transcript fact store of the process, opening it on first use.
+
+    Returns:
+        TranscriptFactStore: The shared fact store.
+    """
+    global _fact_store
+
+    with _fact_store_lock:
+        if _fact_store is None:
+            _fact_store = TranscriptFactStore()
+        return _fact_store
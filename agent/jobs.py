@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.tracing import trace_run
+from agent.progress import RunProgress, track_progress
+
+
+class JobStore:
+    """
+    Local SQLite store of crew runs, their status and their results.
+
+    The store outlives Streamlit reruns and sessions, so a page refresh can pick
+    the status and results of a run back up by its job ID or client.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, db_path=".cache/jobs.sqlite3"):
+        """
+        Args:
+            db_path (str): The path of the SQLite database.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                pid INTEGER,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                logs TEXT,
+                error TEXT,
+                trace TEXT
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_client ON jobs (client_id, created_at)"
+        )
+
+        # Add the trace column to stores created before runs were traced
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "trace" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")
+        self._conn.commit()
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+            return cursor
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["logs"] = json.loads(job["logs"]) if job["logs"] else {}
+        job["trace"] = json.loads(job["trace"]) if job["trace"] else None
+        return job
+
+    def create(self, kind, client_id):
+        """
+        Record a new queued job.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, client_id, status, pid, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, client_id, self.QUEUED, os.getpid(), time.time()),
+        )
+        return job_id
+
+    def mark_running(self, job_id):
+        self._execute(
+            "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+            (self.RUNNING, time.time(), job_id),
+        )
+
+    def mark_succeeded(self, job_id, result, logs=None, trace=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, logs = ?, trace = ? WHERE id = ?",
+            (
+                self.SUCCEEDED,
+                time.time(),
+                result,
+                json.dumps(logs or {}, default=str),
+                json.dumps(trace) if trace else None,
+                job_id,
+            ),
+        )
+
+    def mark_failed(self, job_id, error, trace=None):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, trace = ? WHERE id = ?",
+            (self.FAILED, time.time(), error, json.dumps(trace) if trace else None, job_id),
+        )
+
+    def get(self, job_id):
+        """
+        Get a job.
+
+        Returns:
+            dict or None: The job, or None if it does not exist.
+        """
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_for_client(self, client_id, limit=10):
+        """
+        List the most recent jobs of a client.
+
+        Returns:
+            list[dict]: The jobs, newest first.
+        """
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE client_id = ? ORDER BY created_at DESC LIMIT ?",
+            (client_id, limit),
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def fail_interrupted(self):
+        """Mark unfinished jobs of processes that no longer exist as failed."""
+        rows = self._execute(
+            "SELECT id, pid FROM jobs WHERE status IN (?, ?)",
+            (self.QUEUED, self.RUNNING),
+        ).fetchall()
+
+        for row in rows:
+            if row["pid"] != os.getpid() and not _pid_alive(row["pid"]):
+                self.mark_failed(row["id"], "Interrupted by a server restart")
+
+
+def _pid_alive(pid):
+    """Check whether a process exists."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """
+    Runs crew jobs on a worker pool and records them in a JobStore.
+
+    Submitting returns a job ID immediately, so the Streamlit script thread is
+    never blocked by a crew run and can poll the store for the outcome.
+    """
+
+    def __init__(self, store=None, max_workers=None):
+        """
+        Args:
+            store (JobStore or None): The job store. Defaults to a JobStore at the default path.
+            max_workers (int or None): The number of concurrent jobs. Defaults to JOB_WORKERS or 4.
+        """
+        self.store = store or JobStore()
+        self.store.fail_interrupted()
+
+        # Live progress of the jobs running in this process, by job ID
+        self._progress = {}
+
+        max_workers = max_workers or int(os.environ.get("JOB_WORKERS", 4))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="crew-job"
+        )
+
+    def submit(self, kind, client_id, func, *args, **kwargs):
+        """
+        Submit a job to the worker pool.
+
+        Args:
+            kind (str): The kind of job, e.g. "interview_questions".
+            client_id (str): The client the job is for.
+            func (callable): The job. It returns a (result, logs) tuple. The run
+                is traced, and the trace summary is stored with the job.
+            *args, **kwargs: The arguments of the job.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = self.store.create(kind, client_id)
+        self._executor.submit(self._run, job_id, kind, client_id, func, *args, **kwargs)
+        return job_id
+
+    def progress(self, job_id):
+        """
+        Get the live progress of a job running in this process.
+
+        Returns:
+            dict or None: The progress snapshot, or None if the job is not running here.
+        """
+        progress = self._progress.get(job_id)
+        return progress.snapshot() if progress else None
+
+    def _run(self, job_id, kind, client_id, func, *args, **kwargs):
+        progress = self._progress[job_id] = RunProgress()
+        trace = None
+
+        try:
+            self.store.mark_running(job_id)
+
+            # Trace the run under the job ID, so its breakdown can be shown with it
+            with trace_run(run_id=job_id, client_id=client_id, kind=kind) as trace:
+                with track_progress(progress):
+                    result, logs = func(*args, **kwargs)
+
+            # Storing the result can fail too, e.g. on a result that does not serialize
+            self.store.mark_succeeded(job_id, str(result), logs, trace.summary())
+
+        except Exception:
+            print(f"Job {job_id} failed")
+            self._mark_failed(job_id, traceback.format_exc(), trace)
+
+        finally:
+            self._progress.pop(job_id, None)
+
+    def _mark_failed(self, job_id, error, trace=None):
+        """Mark a job as failed, without its trace if the trace can't be stored."""
+        try:
+            self.store.mark_failed(job_id, error, trace.summary() if trace else None)
+        except Exception:
+            try:
+                self.store.mark_failed(job_id, error)
+            except Exception as e:
+                print(f"Failed to mark job {job_id} as failed: {e}")
+
+
+def run_crew_job(kind, client_id, payload):
+    """
+    Run a crew workflow for a client.
+
+    Args:
+        kind (str): "interview_questions" or "project_workbook".
+        client_id (str): The client ID.
+        payload (str): The onboarding form response or the interview calls transcript.
+
+    Returns:
+        tuple: The crew result and the logs of the content written to Notion.
+    """
+    from agent.crew_cache import get_crew_cache
+
+    # Reuse the client's crew across runs, one run of the client at a time
+    with get_crew_cache().session(client_id) as pm_crew:
+        if kind == "interview_questions":
+            result = pm_crew.create_interview_questions(payload)
+        elif kind == "project_workbook":
+            result = pm_crew.update_project_workbook(payload)
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        return result, dict(pm_crew.tasks.pm_tools.notion.logs)
+
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """
+    Get the job runner of the process, creating it on first use.
+
+    Returns:
+        JobRunner: The shared job runner.
+    """
+    global _job_runner
+
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
@@ -0,0 +1,220 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+
+class DiskLLMCache(BaseCache):
+    """
+    Disk-backed, content-addressed cache for LLM responses.
+
+    Entries are keyed on a hash of the LLM string (model, temperature, bound
+    tool schema and other invocation parameters) and the prompt. The cache is
+    stored in a SQLite file, bounded in size with least-recently-used eviction,
+    and entries can optionally expire after a TTL.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=".cache/llm", max_size_mb=256, ttl_seconds=None):
+        """
+        Args:
+            cache_dir (str): The directory to store the cache database in.
+            max_size_mb (int): The maximum size of the cached responses in MB.
+            ttl_seconds (int or None): Time to live of an entry. None disables expiry.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.db_path = os.path.join(cache_dir, "llm_cache.sqlite3")
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+
+        # Hit/miss counters
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _make_key(prompt, llm_string):
+        """Create a content address from the LLM string and the prompt."""
+        digest = hashlib.sha256()
+        digest.update(llm_string.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        """Look up the cached generations for a prompt and LLM string."""
+        key = self._make_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            # Drop expired entries
+            if row is not None and self.ttl_seconds is not None:
+                if now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            # Mark the entry as recently used
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+
+        try:
+            generations = [loads(generation) for generation in loads(row[0])]
+            # Mark the generations as served from the cache, e.g. so traces don't count their cost
+            for generation in generations:
+                generation.generation_info = dict(generation.generation_info or {}, cached=True)
+        except Exception as e:
+            print(f"Failed to load cached LLM response, ignoring it: {e}")
+            generations = None
+
+        with self._lock:
+            if generations is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        """Store the generations for a prompt and LLM string."""
+        key = self._make_key(prompt, llm_string)
+        value = dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Evict expired entries, then least recently used ones until under the size bound."""
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+
+        total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            evicted.append((key,))
+            total_size -= size
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", evicted)
+
+    def clear(self, **kwargs):
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Report the cache counters.
+
+        Returns:
+            dict: The hits, misses, hit rate, number of entries and size in bytes.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+            hits, misses = self.hits, self.misses
+
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    @classmethod
+    def shared(cls, cache_dir=".cache/llm", max_size_mb=256, ttl_seconds=None):
+        """
+        Get the cache of a directory, opening it once per process.
+
+        Every PMAgents of the process then shares one SQLite connection and one
+        set of counters per cache file.
+
+        Returns:
+            DiskLLMCache: The shared cache.
+        """
+        key = os.path.abspath(cache_dir)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(cache_dir, max_size_mb=max_size_mb, ttl_seconds=ttl_seconds)
+            return cls._shared[key]
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a cache from environment variables, if caching is enabled.
+
+        Caching is opt-in and enabled by setting LLM_CACHE_DIR. LLM_CACHE_MAX_MB
+        and LLM_CACHE_TTL_SECONDS optionally bound the size and age of entries.
+
+        Returns:
+            DiskLLMCache or None: The shared cache, or None if caching is disabled.
+        """
+        cache_dir = os.environ.get("LLM_CACHE_DIR")
+        if not cache_dir:
+            return None
+
+        ttl_seconds = os.environ.get("LLM_CACHE_TTL_SECONDS")
+        return cls.shared(
+            cache_dir=cache_dir,
+            max_size_mb=float(os.environ.get("LLM_CACHE_MAX_MB", 256)),
+            ttl_seconds=float(ttl_seconds) if ttl_seconds else None,
+        )
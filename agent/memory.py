@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+
+import numpy as np
+from crewai.memory.memory import Memory
+from crewai.memory.entity.entity_memory import EntityMemory
+from crewai.memory.long_term.long_term_memory import LongTermMemory
+from crewai.memory.short_term.short_term_memory import ShortTermMemory
+from crewai.memory.storage.interface import Storage
+from crewai.memory.storage.ltm_sqlite_storage import LTMSQLiteStorage
+
+from pmbok.embeddings import EMBEDDING_MODEL, default_embedder
+
+
+# Directory holding the memory of each client
+MEMORY_DIR = os.environ.get("CREW_MEMORY_DIR", ".cache/memory")
+# Maximum number of entries kept per kind of memory and client
+MEMORY_MAX_ENTRIES = int(os.environ.get("CREW_MEMORY_MAX_ENTRIES", 1000))
+
+# The private Crew attributes crewai's agents read their memory from
+CREW_MEMORY_ATTRIBUTES = ("_short_term_memory", "_long_term_memory", "_entity_memory")
+
+
+class LocalMemoryStorage(Storage):
+    """
+    Bounded on-disk storage for short-term and entity memory.
+
+    Entries and their embeddings are stored in SQLite and searched by cosine
+    similarity with numpy. Once a kind of memory holds more than max_entries
+    entries, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        kind,
+        embedder=None,
+        model=EMBEDDING_MODEL,
+        max_entries=MEMORY_MAX_ENTRIES,
+    ):
+        """
+        Args:
+            db_path (str): The path of the SQLite database.
+            kind (str): The kind of memory, e.g. "short_term" or "entities".
+            embedder (Embeddings or None): The embedder. Defaults to the OpenAI embedder of model.
+            model (str): The embedding model, stored with each entry.
+            max_entries (int): The maximum number of entries kept.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self.kind = kind
+        self.model = model
+        self.max_entries = max_entries
+        self._embedder = embedder
+
+        # Entries loaded for search, reloaded after the next write
+        self._loaded = None
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT,
+                embedding BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memories_kind ON memories (kind, accessed_at)"
+        )
+        self._conn.commit()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = default_embedder(self.model)
+        return self._embedder
+
+    def save(self, value, metadata):
+        embedding = np.asarray(self.embedder.embed_query(str(value)), dtype=np.float32)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO memories (kind, model, text, metadata, embedding, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.kind,
+                    self.model,
+                    str(value),
+                    json.dumps(metadata or {}, default=str),
+                    embedding.tobytes(),
+                    time.time(),
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+            self._loaded = None
+
+    def _evict(self):
+        """Delete the least recently used entries beyond max_entries."""
+        self._conn.execute(
+            """
+            DELETE FROM memories WHERE kind = ? AND id NOT IN (
+                SELECT id FROM memories WHERE kind = ?
+                ORDER BY accessed_at DESC LIMIT ?
+            )
+            """,
+            (self.kind, self.kind, self.max_entries),
+        )
+
+    def _load(self):
+        """Load the entries of this kind and model, with their normalized embeddings."""
+        if self._loaded is None:
+            rows = self._conn.execute(
+                "SELECT id, text, metadata, embedding FROM memories WHERE kind = ? AND model = ?",
+                (self.kind, self.model),
+            ).fetchall()
+
+            matrix = np.array(
+                [np.frombuffer(row[3], dtype=np.float32) for row in rows], dtype=np.float32
+            )
+            if len(rows):
+                matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+            self._loaded = (rows, matrix)
+        return self._loaded
+
+    def search(self, query, limit=3, filter=None, score_threshold=0.35):
+        """
+        Find the entries most similar to a query.
+
+        Returns:
+            list[dict]: The entries, each with its text as "context" and its metadata and score as "metadata".
+        """
+        query_vector = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) + 1e-12
+
+        with self._lock:
+            rows, matrix = self._load()
+            if not rows:
+                return []
+
+            scores = matrix @ query_vector
+            top = np.argsort(-scores)[: limit * 4 if filter else limit]
+
+            results, used_ids = [], []
+            for i in top:
+                if scores[i] < score_threshold:
+                    break
+                metadata = json.loads(rows[i][2] or "{}")
+                if filter and any(metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                results.append(
+                    {
+                        "context": rows[i][1],
+                        "metadata": dict(metadata, score=float(scores[i])),
+                    }
+                )
+                used_ids.append(rows[i][0])
+                if len(results) == limit:
+                    break
+
+            # Mark the entries as used, so eviction keeps them
+            self._conn.executemany(
+                "UPDATE memories SET accessed_at = ? WHERE id = ?",
+                [(time.time(), memory_id) for memory_id in used_ids],
+            )
+            self._conn.commit()
+
+        return results
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM memories WHERE kind = ?", (self.kind,))
+            self._conn.commit()
+            self._loaded = None
+
+
+class BoundedLTMSQLiteStorage(LTMSQLiteStorage):
+    """Long-term memory storage keeping only the most recent max_entries evaluations."""
+
+    def __init__(self, db_path, max_entries=MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        super().__init__(db_path=db_path)
+
+    def save(self, task_description, metadata, datetime, score):
+        super().save(task_description, metadata, datetime, score)
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute(
+                    """
+                    DELETE FROM long_term_memories WHERE id NOT IN (
+                        SELECT id FROM long_term_memories ORDER BY id DESC LIMIT ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            print(f"Failed to evict old long-term memories: {e}")
+
+
+# The crewai memory classes build their own storage in __init__, so these set
+# the given storage instead
+
+
+class LocalShortTermMemory(ShortTermMemory):
+    def __init__(self, storage):
+        Memory.__init__(self, storage)
+
+
+class LocalEntityMemory(EntityMemory):
+    def __init__(self, storage):
+        Memory.__init__(self, storage)
+
+
+class LocalLongTermMemory(LongTermMemory):
+    def __init__(self, storage):
+        Memory.__init__(self, storage)
+
+
+class ClientMemory:
+    """
+    Short-term, long-term and entity memory of one client, stored on disk.
+
+    The memory lives in its own directory per client and is reused by every
+    crew and run of the client, instead of crewai's default storage, which is
+    shared by all clients and reset whenever a crew is created.
+    """
+
+    def __init__(
+        self,
+        client_id,
+        memory_dir=MEMORY_DIR,
+        max_entries=MEMORY_MAX_ENTRIES,
+        embedder=None,
+    ):
+        """
+        Args:
+            client_id (str): The client ID.
+            memory_dir (str): The directory holding the memory of each client.
+            max_entries (int): The maximum number of entries kept per kind of memory.
+            embedder (Embeddings or None): The embedder. Defaults to the OpenAI embedder.
+        """
+        self.directory = os.path.join(memory_dir, re.sub(r"[^\w.-]", "_", client_id))
+        db_path = os.path.join(self.directory, "memory.sqlite3")
+
+        self.short_term = LocalShortTermMemory(
+            LocalMemoryStorage(db_path, "short_term", embedder=embedder, max_entries=max_entries)
+        )
+        self.entities = LocalEntityMemory(
+            LocalMemoryStorage(db_path, "entities", embedder=embedder, max_entries=max_entries)
+        )
+        self.long_term = LocalLongTermMemory(
+            BoundedLTMSQLiteStorage(
+                os.path.join(self.directory, "long_term_memory.db"), max_entries=max_entries
+            )
+        )
+
+    def attach(self, crew):
+        """
+        Make a crew use this memory.
+
+        The crew must be created with memory=False, so crewai does not build
+        and reset its default storage first. crewai 0.51.1 takes no memory
+        objects in the Crew constructor, so they are set on the private
+        attributes its agents read. tests/test_memory.py fails if a crewai
+        upgrade renames them.
+
+        Raises:
+            RuntimeError: If the installed crewai has no such attributes.
+        """
+        missing = [
+            name
+            for name in CREW_MEMORY_ATTRIBUTES
+            if name not in getattr(type(crew), "__private_attributes__", {})
+        ]
+        if missing:
+            raise RuntimeError(
+                f"crewai's Crew has no {', '.join(missing)} attribute. "
+                "ClientMemory supports the crewai version pinned in requirements.txt."
+            )
+
+        crew.memory = True
+        crew._short_term_memory = self.short_term
+        crew._long_term_memory = self.long_term
+        crew._entity_memory = self.entities
+        return crew
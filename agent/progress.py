@@ -0,0 +1,331 @@
+import re
+import json
+import time
+import queue
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent.tracing import submit_in_context
+
+
+_current_progress = contextvars.ContextVar("current_progress", default=None)
+_token_listener = contextvars.ContextVar("token_listener", default=None)
+
+
+class RunProgress:
+    """
+    Live progress of one crew run.
+
+    Holds the tail of the LLM output streamed so far and the events of the run,
+    e.g. finished tasks and workbook sections written to Notion, so the UI can
+    show them while the run is still going.
+    """
+
+    # Number of streamed characters kept
+    MAX_STREAM_CHARS = 4000
+
+    def __init__(self):
+        self.events = []
+        self.stream = ""
+        self.stream_name = None
+        self.first_token_seconds = None
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def start_stream(self, name=None):
+        """Start showing the output of a new LLM call."""
+        with self._lock:
+            self.stream = ""
+            self.stream_name = name
+
+    def add_token(self, token):
+        with self._lock:
+            if self.first_token_seconds is None:
+                self.first_token_seconds = round(time.time() - self.started_at, 3)
+            self.stream = (self.stream + token)[-self.MAX_STREAM_CHARS :]
+
+    def add_event(self, message, **data):
+        """Record an event of the run, e.g. a finished task."""
+        with self._lock:
+            self.events.append(
+                dict(seconds=round(time.time() - self.started_at, 3), message=message, **data)
+            )
+
+    def snapshot(self):
+        """
+        Get the progress so far.
+
+        Returns:
+            dict: The streamed output, its LLM call, the events and the time to the first token.
+        """
+        with self._lock:
+            return {
+                "stream": self.stream,
+                "stream_name": self.stream_name,
+                "events": list(self.events),
+                "first_token_seconds": self.first_token_seconds,
+            }
+
+
+def current_progress():
+    """Get the progress of the run in progress in this context, if any."""
+    return _current_progress.get()
+
+
+@contextmanager
+def track_progress(progress):
+    """Send the progress of everything run in this context to a RunProgress."""
+    token = _current_progress.set(progress)
+    try:
+        yield progress
+    finally:
+        _current_progress.reset(token)
+
+
+def report(message, **data):
+    """Record an event in the progress of the current run, if it is tracked."""
+    progress = current_progress()
+    if progress is not None:
+        progress.add_event(message, **data)
+
+
+@contextmanager
+def listen_tokens(listener):
+    """
+    Send the LLM tokens streamed in this context to a listener.
+
+    Args:
+        listener: Object with start() called at the start of each LLM call and
+            feed(token) called with each streamed token.
+    """
+    token = _token_listener.set(listener)
+    try:
+        yield listener
+    finally:
+        _token_listener.reset(token)
+
+
+class ProgressCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler streaming LLM tokens to the current run's progress."""
+
+    def _start(self, serialized):
+        progress = current_progress()
+        if progress is not None:
+            progress.start_stream((serialized or {}).get("name"))
+
+        listener = _token_listener.get()
+        if listener is not None:
+            listener.start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._start(serialized)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._start(serialized)
+
+    def on_llm_new_token(self, token, **kwargs):
+        progress = current_progress()
+        if progress is not None:
+            progress.add_token(token)
+
+        listener = _token_listener.get()
+        if listener is not None:
+            listener.feed(token)
+
+
+class JSONSectionParser:
+    """
+    Incremental parser of the sections of a JSON final answer.
+
+    Fed the streamed tokens of an agent's answer, it finds the JSON object
+    after "Final Answer:" and calls on_section(name, value) as soon as each of
+    its members is complete, before the rest of the answer has been generated.
+    Members of a wrapping object, e.g. {"elements": {...}}, are used as the
+    sections.
+    """
+
+    FINAL_ANSWER = "Final Answer:"
+
+    def __init__(self, on_section, wrapper_key="elements"):
+        """
+        Args:
+            on_section (callable): Called with the name and value of each complete section.
+            wrapper_key (str or None): The key of the object wrapping the sections.
+        """
+        self.on_section = on_section
+        self.wrapper_key = wrapper_key
+        self.start()
+
+    def start(self):
+        """Reset the parser for a new LLM call."""
+        self.text = ""
+        self.json_start = None
+        self.section_depth = None
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.member_start = None
+
+    def feed(self, token):
+        self.text += token
+
+        if self.json_start is None:
+            answer = self.text.find(self.FINAL_ANSWER)
+            if answer == -1:
+                return
+            brace = self.text.find("{", answer)
+            if brace == -1:
+                return
+            self.json_start = self.position = brace
+
+        if self.section_depth is None:
+            # Wait until the first key shows whether the sections are wrapped
+            match = re.match(r'\{\s*"((?:[^"\\]|\\.)*)"\s*:\s*(\S)', self.text[self.json_start :])
+            if not match:
+                return
+            wrapped = match.group(1) == self.wrapper_key and match.group(2) == "{"
+            self.section_depth = 2 if wrapped else 1
+
+        self._scan()
+
+    def _scan(self):
+        """Scan the new text, emitting every section completed in it."""
+        for i in range(self.position, len(self.text)):
+            char = self.text[i]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == self.section_depth and self.member_start is None:
+                    self.member_start = i
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == self.section_depth:
+                    self._emit(i)
+                self.depth -= 1
+            elif char == "," and self.depth == self.section_depth:
+                self._emit(i)
+
+        self.position = len(self.text)
+
+    def _emit(self, end):
+        if self.member_start is None:
+            return
+
+        member = self.text[self.member_start : end]
+        self.member_start = None
+        try:
+            section = json.loads("{" + member + "}")
+        except json.JSONDecodeError:
+            return
+
+        for name, value in section.items():
+            self.on_section(name, value)
+
+
+class ProgressiveWorkbookWriter:
+    """
+    Writes workbook sections to Notion on a background thread as they are generated.
+
+    Sections queued while a write is in progress are written together in the
+    next one, so a burst of sections costs one round of Notion requests. The
+    page is read once, and only sections that are not on it yet are added;
+    sections already on the page are left to the final save of the validated
+    workbook, as are sections whose writes failed.
+    """
+
+    def __init__(self, notion):
+        """
+        Args:
+            notion (Notion): The Notion client of the client's page.
+        """
+        self.notion = notion
+        # The sections added to the page, by workbook element
+        self.written = {}
+        # The workbook sections on the page, once read
+        self.sections = None
+        self.errors = []
+        self._queue = queue.Queue()
+        self._executor = None
+        self._future = None
+
+    def __enter__(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workbook-writer")
+        self._future = submit_in_context(self._executor, self._run)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_section(self, name, value):
+        """Queue a complete section for writing."""
+        self._queue.put((name, value))
+
+    def close(self):
+        """Write the remaining sections and stop the writer thread."""
+        if self._executor is None:
+            return
+
+        self._queue.put(None)
+        self._future.result()
+        self._executor.shutdown()
+        self._executor = None
+
+    def discard(self):
+        """Delete the sections added to the page, e.g. when the answer they came from failed to parse."""
+        self.close()
+        if not self.written:
+            return
+
+        try:
+            self.notion.remove_workbook_sections(list(self.written), self.sections)
+        except Exception as e:
+            print(f"Failed to remove the workbook sections written early: {e}")
+        self.written = {}
+
+    def _run(self):
+        done = False
+        while not done:
+            sections = {}
+            item = self._queue.get()
+            while True:
+                if item is None:
+                    done = True
+                    break
+                sections[item[0]] = item[1]
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if not sections:
+                continue
+
+            try:
+                self.sections, added = self.notion.add_workbook_sections(
+                    sections, sections=self.sections
+                )
+                for name in added:
+                    self.written[name] = sections[name]
+                    report(f"Wrote {name} to Notion", section=name)
+            except Exception as e:
+                # The final save of the workbook writes whatever failed here,
+                # after reading the page again
+                print(f"Failed to write workbook sections early: {e}")
+                self.errors.append(str(e))
+                self.sections = None
@@ -0,0 +1,98 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agent.tracing import submit_in_context
+
+
+class TaskGraph:
+    """
+    Runs workflow steps as a dependency graph.
+
+    Each step declares the steps it depends on and is called with their results
+    as keyword arguments. Steps whose dependencies are done run concurrently, so
+    the wall-clock time of a workflow is the length of its critical path.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Args:
+            max_workers (int): The maximum number of steps running at once.
+        """
+        self.max_workers = max_workers
+        self.steps = {}
+
+    def add(self, name, func, depends_on=()):
+        """
+        Add a step to the graph.
+
+        Args:
+            name (str): The name of the step, also the keyword its result is passed as.
+            func (callable): The step, called with the results of its dependencies.
+            depends_on (iterable[str]): The names of the steps it depends on.
+        """
+        if name in self.steps:
+            raise ValueError(f"Step {name} is already in the graph")
+
+        self.steps[name] = (func, tuple(depends_on))
+        return self
+
+    def _check(self):
+        """Make sure every dependency exists and the graph has no cycles."""
+        for name, (_, depends_on) in self.steps.items():
+            for dependency in depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step {name} depends on unknown step {dependency}")
+
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Step {name} is part of a dependency cycle")
+            visiting.add(name)
+            for dependency in self.steps[name][1]:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def run(self):
+        """
+        Run all steps, each as soon as its dependencies are done.
+
+        Returns:
+            dict: The result of each step, by name.
+
+        Raises:
+            Exception: The first exception raised by a step. Steps that have not
+                started yet are not run.
+        """
+        self._check()
+
+        results = {}
+        pending = dict(self.steps)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Start every step whose dependencies are done
+                for name, (func, depends_on) in list(pending.items()):
+                    if all(dependency in results for dependency in depends_on):
+                        kwargs = {dependency: results[dependency] for dependency in depends_on}
+                        future = submit_in_context(executor, func, **kwargs)
+                        running[future] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    exception = future.exception()
+                    if exception is not None:
+                        for other in running:
+                            other.cancel()
+                        raise exception
+                    results[name] = future.result()
+
+        return results
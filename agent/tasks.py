@@ -1,8 +1,50 @@
+import json
 from crewai import Task
 from textwrap import dedent
+from typing import Dict, List
+from pydantic import BaseModel, Field
 
 
 from agent.tools import PMTools
+from pmbok.context import element_guidance
+
+
+PROJECT_WORKBOOK_ELEMENTS = [
+    "Project Description",
+    "Key Deliverables",
+    "High-Level Risks",
+    "High-Level Milestones",
+    "Budget Summary",
+    "Stakeholders",
+    "Project Plan Version",
+    "Approval Date",
+    "Subsidiary Plans Included",
+    "Current State of Strategy",
+    "Current State of People",
+    "Current State of Products",
+    "Current State of Processes",
+    "Scope Management Approach",
+    "Scope Statement",
+    "Scope Validation",
+    "Scope Control",
+    "Detailed Scope Description",
+    "Deliverables",
+    "Exclusions",
+    "Constraints",
+    "Assumptions",
+    "Approval Date",
+    "Key Milestones",
+]
+
+
+class ProjectWorkbookElements(BaseModel):
+    elements: Dict[str, List[str]] = Field(
+        description="The elements of the project workbook mapped to the list of their details"
+    )
+
+
+class InterviewQuestions(BaseModel):
+    questions: List[str] = Field(description="The list of interview questions")
 
 
 class PMTasks:
@@ -12,39 +54,23 @@ class PMTasks:
         self.pm_tools = PMTools(client_id=client_id)
 
     def __project_workbook_elements(self):
-        workbook_elements = [
-            "Project Description",
-            "Key Deliverables",
-            "High-Level Risks",
-            "High-Level Milestones",
-            "Budget Summary",
-            "Stakeholders",
-            "Project Plan Version",
-            "Approval Date",
-            "Subsidiary Plans Included",
-            "Current State of Strategy",
-            "Current State of People",
-            "Current State of Products",
-            "Current State of Processes",
-            "Scope Management Approach",
-            "Scope Statement",
-            "Scope Validation",
-            "Scope Control",
-            "Detailed Scope Description",
-            "Deliverables",
-            "Exclusions",
-            "Constraints",
-            "Assumptions",
-            "Approval Date",
-            "Key Milestones",
-        ]
-
-        return ", ".join(workbook_elements)
+        return ", ".join(PROJECT_WORKBOOK_ELEMENTS)
+
+    def __pmbok_guidance_section(self):
+        # Guidance precomputed by pmbok.context, if it was built
+        guidance = element_guidance(PROJECT_WORKBOOK_ELEMENTS)
+        if not guidance:
+            return ""
+
+        lines = "\n".join(f"- {element}: {text}" for element, text in guidance.items())
+        return f"**PMBOK Guidance on the Elements** (no need to search the PMBOK for these elements):\n{lines}"
 
     def __tip_section(self):
         return "If you do your BEST WORK, you'll get a $10,000 bonus!"
 
-    def create_interview_questions(self, agent, onboarding_form_response):
+    def create_interview_questions(
+        self, agent, onboarding_form_response, structured=False
+    ):
         return Task(
             description=dedent(
                 f"""
@@ -69,6 +95,7 @@ class PMTasks:
             ),
             expected_output="A list of questions to ask during an interview",
             agent=agent,
+            output_json=InterviewQuestions if structured else None,
         )
 
     def save_interview_questions(self, agent, title):
@@ -86,7 +113,9 @@ class PMTasks:
             tools=[self.pm_tools.save_interview_questions],
         )
 
-    def create_project_workbook_elements(self, agent, interview_calls_transcript):
+    def create_project_workbook_elements(
+        self, agent, interview_calls_transcript, structured=False
+    ):
         return Task(
             description=dedent(
                 f"""
@@ -96,6 +125,8 @@ class PMTasks:
 
             **Elements of Project Workbook**: {self.__project_workbook_elements()}
 
+            {self.__pmbok_guidance_section()}
+
             **Interview Calls Transcript**:
             {interview_calls_transcript}
 
@@ -104,15 +135,45 @@ class PMTasks:
             ),
             expected_output="A structured text with the project workbook elements and their details",
             agent=agent,
+            output_json=ProjectWorkbookElements if structured else None,
         )
 
-    def update_project_workbook_elements(self, agent):
+    def extract_project_workbook_elements(self, agent, interview_calls_transcript):
+        return Task(
+            description=dedent(
+                f"""
+            **Task**: To extract project workbook elements from part of the client meeting transcripts
+            **Description**: Extract the details of the project workbook elements that are explicitly discussed or implied in this part of the client meeting transcripts. Only include elements covered in this part of the transcripts, as concise statements of what was agreed. The extractions from all parts of the transcripts will be merged into one workbook.
+
+            **Elements of Project Workbook**: {self.__project_workbook_elements()}
+
+            {self.__pmbok_guidance_section()}
+
+            **Interview Calls Transcript (part)**:
+            {interview_calls_transcript}
+
+            **Note**: {self.__tip_section()}
+        """
+            ),
+            expected_output="The project workbook elements discussed in this part of the transcripts, each with the list of its details",
+            agent=agent,
+            output_json=ProjectWorkbookElements,
+        )
+
+    def __workbook_contents_section(self, workbook_contents):
+        if workbook_contents is None:
+            return ""
+        return f"**Project Workbook Elements**:\n{json.dumps(workbook_contents, indent=2)}"
+
+    def update_project_workbook_elements(self, agent, workbook_contents=None):
         return Task(
             description=dedent(
                 f"""
             **Task**: To update the details of a project workbook for a client
             **Description**: Update the details of a client's project workbook based on the new fields created and ensure all information is accurate.
 
+            {self.__workbook_contents_section(workbook_contents)}
+
             **Note**: {self.__tip_section()}
         """
             ),
@@ -137,7 +198,9 @@ class PMTasks:
             agent=agent,
         )
 
-    def create_follow_up_interview_questions(self, agent):
+    def create_follow_up_interview_questions(
+        self, agent, workbook_contents=None, structured=False
+    ):
         return Task(
             description=dedent(
                 f"""
@@ -152,9 +215,12 @@ class PMTasks:
 
             **Elements of Project Workbook**: {self.__project_workbook_elements()}
 
+            {self.__workbook_contents_section(workbook_contents)}
+
             **Note**: {self.__tip_section()}
         """
             ),
             expected_output="A list of questions to ask during a follow up interview",
             agent=agent,
+            output_json=InterviewQuestions if structured else None,
         )
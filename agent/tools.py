@@ -1,39 +1,231 @@
+import os
+import json
+import hashlib
+import threading
 from pydantic import BaseModel, Field
 from typing import List, Dict
 
 from crewai_tools import tool, PDFSearchTool
+from crewai_tools.tools.pdf_search_tool.pdf_search_tool import (
+    FixedPDFSearchToolSchema,
+)
 from langchain.tools import tool
 from notion.notion import Notion
+from pmbok.index import PMBOKIndex
+from pmbok.bm25 import hybrid_search
+from pmbok.query_cache import get_query_cache
+from agent.tracing import timed
 
 
 class PMTools:
 
-    # Define pmbok scrape tools
-    read_pmbok = PDFSearchTool(
-        pdf="data/PMBOK Guide.pdf",
-        config=dict(
-            llm=dict(
-                provider="openai",
-                config=dict(
-                    model="gpt-4o-mini",
-                    # temperature=0.5,
-                    # top_p=1,
-                    # stream=true,
+    # Location of the PMBOK guide and its persisted vector index
+    PMBOK_PDF_PATH = "data/PMBOK Guide.pdf"
+    PMBOK_DB_DIR = "db"
+    PMBOK_MANIFEST_PATH = os.path.join(PMBOK_DB_DIR, "pmbok_manifest.json")
+
+    _pmbok_search_tool = None
+    _pmbok_lock = threading.Lock()
+
+    @classmethod
+    def pmbok_search_tool(cls):
+        """
+        Get the PMBOK search tool, building it on first use.
+
+        The tool is backed by the persisted Chroma index in PMBOK_DB_DIR. The PDF
+        is only (re)indexed when its content hash differs from the one recorded
+        in the manifest, so start-up cost does not depend on the size of the PDF.
+        A non-empty index without a manifest is kept, and the guide's
+        fingerprint recorded for it.
+
+        Returns:
+            PDFSearchTool: The PMBOK search tool.
+        """
+        if cls._pmbok_search_tool is not None:
+            return cls._pmbok_search_tool
+
+        with cls._pmbok_lock:
+            if cls._pmbok_search_tool is None:
+                cls._pmbok_search_tool = cls._build_pmbok_search_tool()
+
+        return cls._pmbok_search_tool
+
+    @classmethod
+    def _build_pmbok_search_tool(cls):
+        """Create the PMBOK search tool over the persisted index, re-indexing if the PDF changed."""
+
+        # Define pmbok scrape tools
+        read_pmbok = PDFSearchTool(
+            config=dict(
+                llm=dict(
+                    provider="openai",
+                    config=dict(
+                        model="gpt-4o-mini",
+                        # temperature=0.5,
+                        # top_p=1,
+                        # stream=true,
+                    ),
                 ),
-            ),
-            embedder=dict(
-                provider="openai",
-                config=dict(
-                    model="gpt-4o-mini",
+                embedder=dict(
+                    provider="openai",
+                    config=dict(
+                        model="gpt-4o-mini",
+                    ),
+                ),
+                vectordb=dict(
+                    provider="chroma",
+                    config=dict(dir=cls.PMBOK_DB_DIR),
                 ),
             ),
-        ),
-    )
+        )
+
+        # Only embed the PDF when it changed since the index was built
+        manifest = cls._load_pmbok_manifest()
+        if not os.path.exists(cls.PMBOK_PDF_PATH):
+            print(f"{cls.PMBOK_PDF_PATH} not found. Using the persisted PMBOK index.")
+        else:
+            fingerprint = cls._pmbok_fingerprint(manifest)
+            embedchain_app = read_pmbok.adapter.embedchain_app
+            if not manifest and embedchain_app.db.count():
+                # A persisted index without a manifest, e.g. the shipped db/, is
+                # taken to be of the current guide instead of being rebuilt
+                print("Using the persisted PMBOK index and recording its fingerprint.")
+            elif fingerprint["sha256"] != manifest.get("sha256"):
+                print("PMBOK guide changed or not indexed yet. Rebuilding the index.")
+
+                # add() appends to the collection, so drop the chunks of the old guide first
+                embedchain_app.reset()
+                read_pmbok.add(cls.PMBOK_PDF_PATH)
+
+            # Record the fingerprint, e.g. a new modification time of an identical file
+            if fingerprint != manifest:
+                cls._save_pmbok_manifest(fingerprint)
+
+        # Fix the tool to the PMBOK guide, as PDFSearchTool does when given a pdf
+        read_pmbok.description = f"A tool that can be used to semantic search a query the {cls.PMBOK_PDF_PATH} PDF's content."
+        read_pmbok.args_schema = FixedPDFSearchToolSchema
+        read_pmbok._generate_description()
+
+        return read_pmbok
+
+    @classmethod
+    def _load_pmbok_manifest(cls):
+        """Load the manifest describing the indexed PMBOK guide."""
+        try:
+            with open(cls.PMBOK_MANIFEST_PATH, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @classmethod
+    def _save_pmbok_manifest(cls, manifest):
+        """Save the manifest describing the indexed PMBOK guide."""
+        os.makedirs(cls.PMBOK_DB_DIR, exist_ok=True)
+        with open(cls.PMBOK_MANIFEST_PATH, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def _pmbok_fingerprint(cls, manifest):
+        """
+        Fingerprint the PMBOK guide.
+
+        The file is only hashed when its size or modification time differ from the
+        manifest, so an unchanged guide is recognized without reading it.
+
+        Args:
+            manifest (dict): The manifest of the indexed guide.
+
+        Returns:
+            dict: The size, modification time and sha256 of the guide.
+        """
+        stat = os.stat(cls.PMBOK_PDF_PATH)
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        if all(manifest.get(key) == value for key, value in fingerprint.items()):
+            fingerprint["sha256"] = manifest.get("sha256")
+            return fingerprint
+
+        digest = hashlib.sha256()
+        with open(cls.PMBOK_PDF_PATH, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        fingerprint["sha256"] = digest.hexdigest()
+
+        return fingerprint
+
+    @classmethod
+    def pmbok_tools(cls):
+        """
+        Get the tools agents use to search the PMBOK.
+
+        The offline local index is used when it has been built, otherwise the
+        PDFSearchTool over the persisted Chroma index. Only searches of the
+        local index go through the query cache; the PDFSearchTool queries
+        Chroma on every call.
+
+        Returns:
+            list: The PMBOK search tools.
+        """
+        if PMBOKIndex.exists():
+            return [cls.search_pmbok]
+        return [cls.pmbok_search_tool()]
+
+    class SearchPMBOKInput(BaseModel):
+        query: str = Field(description="What to search for in the PMBOK Guide")
+
+    @tool("search_pmbok", args_schema=SearchPMBOKInput)
+    def search_pmbok(query: str) -> str:
+        """
+        Searches the PMBOK Guide for the passages most relevant to a query.
+        Exact terms, e.g. "WBS" or "scope validation", are matched by keyword.
+
+        Parameters:
+        - query (str): What to search for in the PMBOK Guide.
+
+        Returns:
+        - The most relevant passages of the PMBOK Guide.
+        """
+
+        try:
+            with timed("tool", "search_pmbok"):
+                # Reuse the passages of the same query, from any session
+                cache = get_query_cache()
+                index = PMBOKIndex.shared()
+                passages, vector = cache.lookup(query, namespace=index.version)
+                if passages is None:
+                    # Reuse the embedding of the lookup when it has the model of the index
+                    query_vector = (
+                        vector
+                        if vector is not None
+                        and getattr(cache.embedder, "model", None) == index.model
+                        else None
+                    )
+                    results = hybrid_search(query, k=5, query_vector=query_vector)
+                    passages = [result["text"] for result in results]
+                    cache.put(query, passages, namespace=index.version, vector=vector)
+            return "Relevant Content:\n" + "\n\n".join(passages)
+
+        except Exception as e:
+            return f"An error occurred while searching the PMBOK Guide: {e}"
 
     def __init__(self, client_id):
 
         # Create an instance of notion
-        PMTools.notion = Notion(client_id=client_id)
+        self.notion = Notion(client_id=client_id)
+
+        # Bind the saving tools to this client's Notion page, so that concurrent
+        # runs for different clients never write to each other's pages
+        self.save_interview_questions = tool(
+            "save_interview_questions",
+            args_schema=PMTools.SaveInterviewQuestionInput,
+            return_direct=True,
+        )(self._save_interview_questions)
+
+        self.create_project_workbook_elements = tool(
+            "create_project_workbook",
+            args_schema=PMTools.CreateProjectWorkbookInput,
+            return_direct=True,
+        )(self._create_project_workbook_elements)
 
     class SaveInterviewQuestionInput(BaseModel):
         title: str = Field(description="The title of the interview questions")
@@ -41,12 +233,9 @@ class PMTools:
             description="A list of interview questions on the project"
         )
 
-    @tool(
-        "save_interview_questions",
-        args_schema=SaveInterviewQuestionInput,
-        return_direct=True,
-    )
-    def save_interview_questions(title: str, interview_questions: List[str]) -> str:
+    def _save_interview_questions(
+        self, title: str, interview_questions: List[str]
+    ) -> str:
         """
         Saves the interviewing questions for a client.
 
@@ -60,9 +249,10 @@ class PMTools:
 
         try:
             # Add toggleable Notion block with the interview questions
-            PMTools.notion.add_toggleable_notion_block(
-                title=title, content=interview_questions
-            )
+            with timed("tool", "save_interview_questions"):
+                self.notion.add_toggleable_notion_block(
+                    title=title, content=interview_questions
+                )
             return "Interviewing questions saved successfully!"
 
         except Exception as e:
@@ -73,12 +263,7 @@ class PMTools:
             description="The contents of the project workbook. The keys represent the elements of the workbook, and the values are the details of the elements"
         )
 
-    @tool(
-        "create_project_workbook",
-        args_schema=CreateProjectWorkbookInput,
-        return_direct=True,
-    )
-    def create_project_workbook_elements(workbook_contents: Dict) -> str:
+    def _create_project_workbook_elements(self, workbook_contents: Dict) -> str:
         """
         Creates a new project workbook for a client.
 
@@ -93,7 +278,8 @@ class PMTools:
 
         try:
             # Update the project workbook
-            PMTools.notion.update_project_workbook(workbook_contents=workbook_contents)
+            with timed("tool", "create_project_workbook"):
+                self.notion.update_project_workbook(workbook_contents=workbook_contents)
             return "Workbook created successfully!"
 
         except Exception as e:
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from notion.notion import Notion
+
+
+# USD per 1M tokens (prompt, completion), used to estimate the cost of a run
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+TRACE_DIR = os.environ.get("TRACE_DIR", "traces")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _model_price(model):
+    """Find the price of a model, matching dated model versions by prefix."""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model and model.startswith(name):
+            return MODEL_PRICES[name]
+    return (0.0, 0.0)
+
+
+class RunTrace:
+    """
+    Structured trace of one crew run.
+
+    Records the wall time of tasks and tool calls, every LLM call with its token
+    counts and estimated cost, and every Notion request with its latency. LLM
+    calls served from the cache are recorded without cost and left out of the
+    LLM totals.
+    """
+
+    def __init__(self, run_id=None, client_id=None, kind=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.client_id = client_id
+        self.kind = kind
+        self.started_at = time.time()
+        self.duration_seconds = None
+
+        self.spans = []
+        self.llm_calls = []
+        self.notion_requests = []
+        self._lock = threading.Lock()
+
+    def record_span(self, category, name, seconds, **attributes):
+        """Record a timed step, e.g. a task or a tool call."""
+        with self._lock:
+            self.spans.append(
+                dict(category=category, name=name, seconds=round(seconds, 3), **attributes)
+            )
+
+    def record_llm_call(self, model, seconds, prompt_tokens=0, completion_tokens=0, cached=False):
+        """Record an LLM call and estimate its cost, which is nothing if it was served from the cache."""
+        prompt_price, completion_price = _model_price(model)
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+        with self._lock:
+            self.llm_calls.append(
+                {
+                    "model": model,
+                    "seconds": round(seconds, 3),
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "cost_usd": 0.0 if cached else cost,
+                    "cached": cached,
+                }
+            )
+
+    def record_notion_request(self, method, path, status_code, seconds):
+        """Record a Notion API request."""
+        with self._lock:
+            self.notion_requests.append(
+                {
+                    "method": method,
+                    "path": path,
+                    "status_code": status_code,
+                    "seconds": round(seconds, 3),
+                }
+            )
+
+    def summary(self):
+        """
+        Summarize the trace.
+
+        Returns:
+            dict: The totals of the run and its spans, LLM calls and Notion requests.
+        """
+        with self._lock:
+            llm_calls = list(self.llm_calls)
+            notion_requests = list(self.notion_requests)
+            spans = list(self.spans)
+
+        # Calls served from the LLM cache cost nothing and are counted separately
+        paid_calls = [call for call in llm_calls if not call.get("cached")]
+
+        return {
+            "run_id": self.run_id,
+            "client_id": self.client_id,
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration_seconds,
+            "llm": {
+                "calls": len(paid_calls),
+                "cached_calls": len(llm_calls) - len(paid_calls),
+                "seconds": round(sum(call["seconds"] for call in llm_calls), 3),
+                "prompt_tokens": sum(call["prompt_tokens"] for call in paid_calls),
+                "completion_tokens": sum(call["completion_tokens"] for call in paid_calls),
+                "cost_usd": round(sum(call["cost_usd"] for call in paid_calls), 6),
+            },
+            "notion": {
+                "requests": len(notion_requests),
+                "seconds": round(sum(request["seconds"] for request in notion_requests), 3),
+            },
+            "spans": spans,
+            "llm_calls": llm_calls,
+            "notion_requests": notion_requests,
+        }
+
+    def save(self, trace_dir=TRACE_DIR):
+        """
+        Write the trace summary to a JSON file.
+
+        Returns:
+            str: The path of the file.
+        """
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f"{self.run_id}.json")
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+
+def current_trace():
+    """Get the trace of the run in progress in this context, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_run(run_id=None, client_id=None, kind=None, trace_dir=TRACE_DIR):
+    """
+    Trace a run, saving the trace when it ends.
+
+    Everything recorded in this context, including on threads started with
+    copy_context, is added to the trace.
+
+    Yields:
+        RunTrace: The trace of the run.
+    """
+    trace = RunTrace(run_id=run_id, client_id=client_id, kind=kind)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duration_seconds = round(time.perf_counter() - start, 3)
+        _current_trace.reset(token)
+        try:
+            trace.save(trace_dir)
+        except OSError as e:
+            print(f"Failed to save the trace of run {trace.run_id}: {e}")
+
+
+@contextmanager
+def timed(category, name, **attributes):
+    """Record the wall time of a block as a span of the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = current_trace()
+        if trace is not None:
+            trace.record_span(category, name, time.perf_counter() - start, **attributes)
+
+
+def _record_notion_request(method, path, status_code, seconds):
+    """Record a Notion request in the trace of the current run, if any."""
+    trace = current_trace()
+    if trace is not None:
+        trace.record_notion_request(method, path, status_code, seconds)
+
+
+Notion.add_request_hook(_record_notion_request)
+
+
+class TaskSpanCallback:
+    """
+    Task callback of a sequential crew, recording a span per task and agent.
+
+    Tasks of a sequential crew run one after the other, so each task is timed
+    from the end of the previous one, or from the start of the crew.
+    """
+
+    def __init__(self, category="task"):
+        self.category = category
+        self.start()
+
+    def start(self):
+        """Start timing the first task."""
+        self._last = time.perf_counter()
+
+    def __call__(self, output):
+        now = time.perf_counter()
+        trace = current_trace()
+        if trace is not None:
+            name = getattr(output, "name", None) or " ".join(
+                str(getattr(output, "description", "")).split()
+            )[:80]
+            trace.record_span(
+                self.category, name, now - self._last, agent=getattr(output, "agent", None)
+            )
+        self._last = now
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """Submit a function to an executor, running it in a copy of the current context."""
+    context = contextvars.copy_context()
+    return executor.submit(context.run, func, *args, **kwargs)
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler recording LLM calls in the current trace."""
+
+    def __init__(self):
+        self._started = {}
+
+    def _start(self, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model")
+        self._started[run_id] = (time.perf_counter(), model)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start, model = self._started.pop(run_id, (None, None))
+        trace = current_trace()
+        if trace is None or start is None:
+            return
+
+        # Generations served from the DiskLLMCache are marked by it
+        generations = [generation for batch in response.generations for generation in batch]
+        cached = bool(generations) and all(
+            (generation.generation_info or {}).get("cached") for generation in generations
+        )
+
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+
+        # Streamed responses report their usage on the message instead
+        if not token_usage:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+
+        trace.record_llm_call(
+            model=llm_output.get("model_name") or model,
+            seconds=time.perf_counter() - start,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached=cached,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
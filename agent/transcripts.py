@@ -0,0 +1,329 @@
+import re
+from difflib import SequenceMatcher
+
+
+MEETING_HEADING = "******** MEETING TRANSCRIPT {number} ********\n"
+
+
+def combine_transcripts(transcripts):
+    """
+    Combine meeting transcripts into a single text, each under a numbered heading.
+
+    Args:
+        transcripts (list[str]): The transcript of each meeting.
+
+    Returns:
+        str: The combined transcripts.
+    """
+    return "".join(
+        MEETING_HEADING.format(number=number) + transcript + "\n\n"
+        for number, transcript in enumerate(transcripts, 1)
+    )
+
+
+# Matches the heading combine_transcripts puts before each meeting
+MEETING_HEADING_PATTERN = re.compile(r"^\*+ MEETING TRANSCRIPT \d+ \*+\s*$", re.MULTILINE)
+
+# Matches the start of a speaker turn, e.g. "John Smith:" or "[00:12:31] Speaker 2:"
+SPEAKER_TURN_PATTERN = re.compile(
+    r"^(?=\s*(?:\[?\(?\d{1,2}:\d{2}(?::\d{2})?\)?\]?\s*)?[A-Z][\w .'-]{0,40}:)",
+    re.MULTILINE,
+)
+
+
+def split_meetings(text):
+    """
+    Split combined transcripts back into one text per meeting, including its heading.
+
+    Args:
+        text (str): The combined transcripts.
+
+    Returns:
+        list[str]: The meetings. Text without headings is a single meeting.
+    """
+    starts = [match.start() for match in MEETING_HEADING_PATTERN.finditer(text)]
+    if not starts:
+        return [text] if text.strip() else []
+
+    # Keep any text before the first heading with the first meeting
+    starts[0] = 0
+    ends = starts[1:] + [len(text)]
+    return [text[start:end] for start, end in zip(starts, ends) if text[start:end].strip()]
+
+
+def _split_turns(text, max_chars):
+    """Split a meeting into speaker turns, cutting turns longer than max_chars on whitespace."""
+    starts = [match.start() for match in SPEAKER_TURN_PATTERN.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    ends = starts[1:] + [len(text)]
+
+    turns = []
+    for start, end in zip(starts, ends):
+        turn = text[start:end]
+        while len(turn) > max_chars:
+            cut = turn.rfind("\n", 0, max_chars)
+            if cut <= max_chars // 2:
+                cut = turn.rfind(" ", 0, max_chars)
+            if cut <= max_chars // 2:
+                cut = max_chars
+            turns.append(turn[:cut])
+            turn = turn[cut:]
+        if turn:
+            turns.append(turn)
+
+    return turns
+
+
+def split_transcript(text, max_chars=12000):
+    """
+    Split combined transcripts into chunks on meeting and speaker boundaries.
+
+    Each meeting starts a new chunk. Meetings longer than max_chars are split
+    between speaker turns, and every chunk of a meeting keeps its heading.
+
+    Args:
+        text (str): The combined transcripts.
+        max_chars (int): The maximum number of characters per chunk.
+
+    Returns:
+        list[str]: The chunks, in transcript order.
+    """
+    chunks = []
+    for meeting in split_meetings(text):
+        if len(meeting) <= max_chars:
+            chunks.append(meeting)
+            continue
+
+        # Repeat the meeting heading at the top of each of its chunks
+        match = MEETING_HEADING_PATTERN.search(meeting)
+        heading = meeting[: match.end()].lstrip() + "\n" if match else ""
+        body = meeting[match.end() :] if match else meeting
+        budget = max(max_chars - len(heading), max_chars // 2)
+
+        current = ""
+        for turn in _split_turns(body, budget):
+            if current and len(current) + len(turn) > budget:
+                chunks.append(heading + current)
+                current = ""
+            current += turn
+        if current.strip():
+            chunks.append(heading + current)
+
+    return chunks
+
+
+def _normalize_text(text):
+    """Fold case, punctuation and whitespace so that equivalent items compare equal."""
+    return " ".join(re.sub(r"[^\w\s]", " ", str(text).casefold()).split())
+
+
+# Words that flip the meaning of an item once normalized, e.g. the "t" of "don't"
+NEGATION_WORDS = frozenset("not no never none nor neither without cannot t".split())
+
+
+def _meaning_words(words):
+    """Get the negations and numbers of an item's words, which must match for items to be duplicates."""
+    return sorted(
+        word for word in words if word in NEGATION_WORDS or any(c.isdigit() for c in word)
+    )
+
+
+def _is_near_duplicate(item, kept, threshold=0.9, min_contained_words=4):
+    """
+    Check whether an item repeats an already kept item.
+
+    Items are compared as word sequences, so word order matters, and items
+    that differ in their negations or numbers are never duplicates, e.g.
+    "The budget is approved" and "The budget is not approved". An item whose
+    words appear in order within a kept item is only a duplicate when it has
+    at least min_contained_words words and neither item is negated.
+    """
+    words = item.split()
+    for other in kept:
+        other_words = other.split()
+        if _meaning_words(words) != _meaning_words(other_words):
+            continue
+        if SequenceMatcher(None, words, other_words, autojunk=False).ratio() >= threshold:
+            return True
+        if (
+            len(words) >= min_contained_words
+            and not any(word in NEGATION_WORDS for word in other_words)
+            and f" {item} " in f" {other} "
+        ):
+            return True
+    return False
+
+
+def merge_workbook_elements(extractions, known_elements=()):
+    """
+    Merge workbook elements extracted from several chunks, deduplicating each element.
+
+    Element names are matched case, space and underscore insensitively, using the
+    spelling of known_elements where one matches. Items that repeat an item
+    already kept, up to case, punctuation and small wording differences, are
+    dropped. Items that contradict a kept item, e.g. by a negation or another
+    number, are kept, so a correction in a later chunk is never lost.
+
+    Args:
+        extractions (list[dict]): Element names mapped to a string or a list of strings, per chunk.
+        known_elements (iterable[str]): The canonical workbook element names.
+
+    Returns:
+        dict: Element names mapped to their merged list of items, in first-seen order.
+    """
+    canonical = {_normalize_text(name): name for name in known_elements}
+    merged = {}
+    seen = {}
+
+    for extraction in extractions:
+        for key, value in (extraction or {}).items():
+            key_normalized = _normalize_text(key.replace("_", " "))
+            name = canonical.get(key_normalized, key.replace("_", " ").title())
+
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                item_normalized = _normalize_text(item)
+                if not item_normalized:
+                    continue
+
+                kept = seen.setdefault(name, [])
+                if _is_near_duplicate(item_normalized, kept):
+                    continue
+
+                kept.append(item_normalized)
+                merged.setdefault(name, []).append(str(item).strip())
+
+    return merged
+
+
+# Cue numbers, cue timings and headers of subtitle exports (SRT, WebVTT)
+SUBTITLE_LINE_PATTERN = re.compile(
+    r"^\s*(?:WEBVTT.*|\d+|\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?\s*-->.*)\s*$"
+)
+
+# Timestamps at the start of a line, e.g. "[00:12:31]", "(12:31)", "00:12:31 -" or
+# "00:12:31 John:", but not times that are part of what was said
+_TIMESTAMP = r"\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?"
+TIMESTAMP_PATTERN = re.compile(
+    rf"^\s*(?:[\[(]{_TIMESTAMP}[\])]|{_TIMESTAMP}(?=\s*[-–]|\s+[A-Z][\w .'-]{{0,40}}:))\s*[-–]?\s*"
+)
+
+# A speaker label at the start of a line, e.g. "JOHN SMITH:" or ">> Speaker 2:"
+SPEAKER_LABEL_PATTERN = re.compile(r"^\s*(?:>>\s*)?([A-Za-z][\w .'-]{0,40}?)\s*:\s*(.*)$")
+
+# Filler words and stutters that carry no content
+DISFLUENCY_PATTERN = re.compile(
+    r"\b(?:u+m+|u+h+m*|e+r+m+|a+h+|h+m+|m+h+m+|mm-hmm|uh-huh)\b[,.]?\s*",
+    re.IGNORECASE,
+)
+REPEATED_WORD_PATTERN = re.compile(r"\b(\w+)(?:[\s,-]+\1\b)+", re.IGNORECASE)
+
+# Words of turns that are only greetings, thanks or audio checks
+PLEASANTRY_WORDS = set(
+    """
+    hi hello hey morning afternoon evening good everyone everybody all guys folks
+    thanks thank you so much very for joining having me us great to see meet nice
+    can hear me you see my screen am i audible bye talk soon later have a day
+    """.split()
+)
+
+
+def _normalize_speaker(name, speakers):
+    """Normalize a speaker label, spelling every label of a speaker the same way."""
+    name = " ".join(name.split())
+    if name.isupper():
+        name = name.title()
+    return speakers.setdefault(name.casefold(), name)
+
+
+def _clean_utterance(text):
+    """Strip filler words and stutters from an utterance."""
+    text = DISFLUENCY_PATTERN.sub("", text)
+    text = REPEATED_WORD_PATTERN.sub(r"\1", text)
+    text = re.sub(r"\s+([,.?!])", r"\1", text)
+    text = re.sub(r"([,.?!])(?:\s*[,.])+", r"\1", text)
+    return " ".join(text.split()).lstrip(",. ")
+
+
+def _compact_meeting(text, speakers, window=5):
+    """Compact the text of one meeting into one line per speaker turn."""
+    turns = []
+    # The recent lines of each speaker, normalized
+    recent = {}
+
+    for line in text.splitlines():
+        if SUBTITLE_LINE_PATTERN.match(line):
+            continue
+
+        line = TIMESTAMP_PATTERN.sub("", line)
+        match = SPEAKER_LABEL_PATTERN.match(line)
+        if match:
+            speaker, utterance = _normalize_speaker(match.group(1), speakers), match.group(2)
+        else:
+            speaker, utterance = None, line
+
+        utterance = _clean_utterance(utterance)
+        if not utterance:
+            continue
+
+        words = _normalize_text(utterance).split()
+        if not words or all(word in PLEASANTRY_WORDS for word in words):
+            continue
+
+        # Drop lines repeating a recent line of the same speaker word for word,
+        # e.g. from overlapping captions. Other speakers echoing a line, as in a
+        # question and its answer, and rewordings, e.g. negations, are kept.
+        if speaker is None and turns:
+            speaker_recent = recent.setdefault(turns[-1][0], [])
+        else:
+            speaker_recent = recent.setdefault(speaker, [])
+        normalized = " ".join(words)
+        if len(words) >= 4 and normalized in speaker_recent[-window:]:
+            continue
+        speaker_recent.append(normalized)
+
+        # Continue the turn of the same speaker, or of the last speaker for unlabeled lines
+        if turns and (speaker is None or speaker == turns[-1][0]):
+            turns[-1][1].append(utterance)
+        else:
+            turns.append((speaker, [utterance]))
+
+    return "\n".join(
+        f"{speaker}: {' '.join(utterances)}" if speaker else " ".join(utterances)
+        for speaker, utterances in turns
+    )
+
+
+def compact_transcript(text):
+    """
+    Compact interview call transcripts before they are sent to the LLM.
+
+    Strips timestamps and subtitle cues, normalizes speaker labels, removes
+    filler words, stutters and turns that are only pleasantries, drops lines
+    that repeat a recent line of the same speaker word for word, and joins
+    consecutive lines of the same speaker.
+    Meeting headings are kept, so the result can still be split by meeting.
+
+    Args:
+        text (str): The combined transcripts.
+
+    Returns:
+        tuple: The compacted transcripts, and a dict with the input and output
+            character counts and the compression ratio (output / input).
+    """
+    speakers = {}
+    meetings = []
+    for meeting in split_meetings(text):
+        match = MEETING_HEADING_PATTERN.search(meeting)
+        heading = meeting[: match.end()].strip() + "\n" if match else ""
+        body = meeting[match.end() :] if match else meeting
+        meetings.append(heading + _compact_meeting(body, speakers) + "\n\n")
+
+    compacted = "".join(meetings)
+    stats = {
+        "input_chars": len(text),
+        "output_chars": len(compacted),
+        "ratio": round(len(compacted) / len(text), 3) if text else 1.0,
+    }
+    return compacted, stats
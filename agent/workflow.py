@@ -1,20 +1,164 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from crewai import Crew, Process
 from agent.agents import PMAgents
-from agent.tasks import PMTasks
+from agent.memory import ClientMemory
+from agent.tasks import PMTasks, PROJECT_WORKBOOK_ELEMENTS
+from agent.scheduler import TaskGraph
+from agent.tracing import TaskSpanCallback, submit_in_context, timed
+from agent.progress import (
+    JSONSectionParser,
+    ProgressiveWorkbookWriter,
+    listen_tokens,
+    report,
+)
+from agent.facts import get_fact_store, transcript_key
+from agent.transcripts import (
+    MEETING_HEADING_PATTERN,
+    compact_transcript,
+    merge_workbook_elements,
+    split_meetings,
+    split_transcript,
+)
+
+
+class StructuredOutputError(ValueError):
+    """Raised when the output of a task does not parse into its output_json schema."""
+
+
+def structured_output(result, key, task_name):
+    """
+    Get a field of the structured output of a task.
+
+    Args:
+        result (CrewOutput): The output of the task's crew.
+        key (str): The field of the output_json schema.
+        task_name (str): The name of the task, for the error message.
+
+    Returns:
+        The value of the field.
+
+    Raises:
+        StructuredOutputError: If the output did not parse or lacks the field.
+    """
+    data = result.json_dict
+    if not isinstance(data, dict) or data.get(key) is None:
+        raise StructuredOutputError(
+            f"The output of {task_name} has no {key!r}: {str(result.raw)[:300]}"
+        )
+    return data[key]
 
 
 class PMCrew:
-    def __init__(self, client_id):
+
+    # Transcripts longer than this are extracted chunk by chunk and merged
+    TRANSCRIPT_CHUNK_CHARS = 12000
+    # Number of transcript chunks extracted concurrently
+    EXTRACTION_CONCURRENCY = 4
+    # Number of independent workflow steps run concurrently
+    STEP_CONCURRENCY = 4
+    # Compact transcripts before they are sent to the LLM
+    COMPACT_TRANSCRIPTS = True
+
+    def __init__(
+        self,
+        client_id,
+        llm_cache=None,
+        direct_tools=True,
+        memory=True,
+        llm=None,
+        pmbok_tools=None,
+        agents=None,
+        incremental=True,
+    ):
         self.client_id = client_id
 
-        # Create instances of the agents and tasks
-        self.agents = PMAgents()
+        # Store of the facts extracted from each transcript, so a transcript is
+        # only sent to the LLM the first time it is processed for the client
+        self.fact_store = get_fact_store() if incremental else None
+
+        # Whether the crews use memory, kept on disk per client and opened on first use
+        self.memory = memory
+        self._client_memory = None
+        self._client_memory_lock = threading.Lock()
+
+        # Save generated content by calling the Notion tools directly with the
+        # structured task output, instead of in an extra writing agent turn
+        self.direct_tools = direct_tools
+
+        # The writer of the sections streamed to Notion by the last extraction,
+        # until the workbook is saved
+        self._streamed_workbook = None
+
+        # Create instances of the agents and tasks. The agents hold no client
+        # state, so one PMAgents (and its LLM clients) can be shared by all crews
+        self.agents = agents or PMAgents(
+            llm_cache=llm_cache, llm=llm, pmbok_tools=pmbok_tools
+        )
         self.tasks = PMTasks(client_id)
 
+    def client_memory(self):
+        """Get the client's on-disk crew memory, opening it on first use."""
+        with self._client_memory_lock:
+            if self._client_memory is None:
+                self._client_memory = ClientMemory(self.client_id)
+            return self._client_memory
+
+    def _create_crew(self, agents, tasks, memory=False):
+        """Create a sequential crew, using the client's on-disk memory if memory is on."""
+        # crewai would build and reset its default memory storage for memory=True
+        crew = Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            memory=False,
+            verbose=True,
+            # Single tasks are timed by _kickoff, the tasks of longer crews here
+            task_callback=TaskSpanCallback() if len(tasks) > 1 else None,
+        )
+        if memory:
+            self.client_memory().attach(crew)
+        return crew
+
+    def _kickoff(self, name, agent, task, memory=False):
+        """Run a single task with its own crew, timing it in the run's trace."""
+        crew = self._create_crew([agent], [task], memory=memory)
+
+        report(f"Started {name}", task=name)
+        with timed("task", name, agent=agent.role):
+            result = crew.kickoff()
+        report(f"Finished {name}", task=name, output=result.raw)
+        return result
+
+    def _save_interview_questions_directly(self, result, title):
+        """Save the structured interview questions of a task with the Notion tool."""
+        questions = structured_output(result, "questions", "the interview questions task")
+        return self.tasks.pm_tools.save_interview_questions.run(
+            {"title": title, "interview_questions": questions}
+        )
+
     def create_interview_questions(self, onboarding_form_response):
 
         # Assign agents to variables
         interviewing_agent = self.agents.interviewing_agent()
+
+        if self.direct_tools:
+            # Generate the questions, then save them without an agent turn
+            create_interview_questions = self.tasks.create_interview_questions(
+                agent=interviewing_agent,
+                onboarding_form_response=onboarding_form_response,
+                structured=True,
+            )
+            result = self._kickoff(
+                "create_interview_questions",
+                interviewing_agent,
+                create_interview_questions,
+                memory=self.memory,
+            )
+            return self._save_interview_questions_directly(
+                result, title="First Interviewing Questions"
+            )
+
         writing_agent = self.agents.writing_agent()
 
         # Assign tasks to agents
@@ -27,7 +171,7 @@ class PMCrew:
         )
 
         # Define Crew
-        crew = Crew(
+        crew = self._create_crew(
             agents=[
                 interviewing_agent,
                 writing_agent,
@@ -36,19 +180,177 @@ class PMCrew:
                 create_interview_questions,
                 save_interview_questions,
             ],
-            process=Process.sequential,
-            memory=True,
-            verbose=True,
+            memory=self.memory,
         )
 
-        result = crew.kickoff()
+        with timed("crew", "sequential_crew"):
+            result = crew.kickoff()
         return result
 
+    def _extract_chunk_workbook_elements(self, transcript_chunk):
+        """Extract the workbook elements of one transcript chunk with its own single-task crew."""
+        project_manager = self.agents.project_manager()
+        extract_project_workbook_elements = (
+            self.tasks.extract_project_workbook_elements(
+                agent=project_manager, interview_calls_transcript=transcript_chunk
+            )
+        )
+
+        result = self._kickoff(
+            "extract_project_workbook_elements",
+            project_manager,
+            extract_project_workbook_elements,
+        )
+        return structured_output(result, "elements", "extract_project_workbook_elements")
+
+    def extract_project_workbook_elements(self, transcript_chunks):
+        """
+        Extract the workbook elements of transcript chunks concurrently, then merge them.
+
+        Args:
+            transcript_chunks (list[str]): The transcript chunks.
+
+        Returns:
+            dict: The merged and deduplicated workbook elements.
+        """
+        return merge_workbook_elements(
+            self._extract_chunks(transcript_chunks), PROJECT_WORKBOOK_ELEMENTS
+        )
+
+    def _extract_chunks(self, transcript_chunks):
+        """Extract the workbook elements of each transcript chunk concurrently."""
+        with ThreadPoolExecutor(max_workers=self.EXTRACTION_CONCURRENCY) as executor:
+            futures = [
+                submit_in_context(executor, self._extract_chunk_workbook_elements, chunk)
+                for chunk in transcript_chunks
+            ]
+            return [future.result() for future in futures]
+
+    def _store_facts(self, key, elements):
+        """
+        Store the workbook elements extracted from a meeting transcript.
+
+        Raises:
+            StructuredOutputError: If no element has any content, so the meeting
+                is extracted again by the next run instead of being skipped.
+        """
+        if not isinstance(elements, dict) or not any(elements.values()):
+            raise StructuredOutputError(
+                f"No workbook elements were extracted from transcript {key[:12]}"
+            )
+        self.fact_store.put(self.client_id, key, elements)
+
+    def _update_project_workbook_incrementally(self, interview_calls_transcript):
+        """
+        Update the workbook with only the transcripts not processed for the client before.
+
+        The facts of each meeting transcript are stored by content hash. New or
+        changed meetings are extracted and stored, then the facts of every
+        meeting in the transcripts are merged and saved, so the LLM cost of a
+        run scales with the new material only. The facts of meetings no longer
+        in the transcripts are forgotten.
+        """
+        stored = self.fact_store.get_all(self.client_id)
+
+        meetings = {}
+        for meeting in split_meetings(interview_calls_transcript):
+            match = MEETING_HEADING_PATTERN.search(meeting)
+            key = transcript_key(meeting[match.end() :] if match else meeting)
+            meetings.setdefault(key, meeting)
+
+        # Forget the facts of removed or changed meetings
+        stale_keys = [key for key in stored if key not in meetings]
+        if stale_keys:
+            self.fact_store.delete(self.client_id, stale_keys)
+            for key in stale_keys:
+                del stored[key]
+
+        new_meetings = {
+            key: meeting for key, meeting in meetings.items() if key not in stored
+        }
+
+        message = (
+            f"{len(new_meetings)} new transcripts to process, "
+            f"{len(stored)} already processed"
+        )
+        print(message)
+        report(message)
+
+        # Without earlier facts to merge, a single short transcript can be
+        # extracted with streamed, progressive Notion writes
+        if not stored and len(new_meetings) == 1 and self.direct_tools:
+            (key, meeting), = new_meetings.items()
+            if len(meeting) <= self.TRANSCRIPT_CHUNK_CHARS:
+
+                def extract_workbook_elements():
+                    elements = self._create_project_workbook_elements(meeting)
+                    self._store_facts(key, elements)
+                    return elements
+
+                return self._run_workbook_graph(extract_workbook_elements)
+
+        # Extract the chunks of all new meetings together, then store them by meeting
+        chunk_keys, chunks = [], []
+        for key, meeting in new_meetings.items():
+            for chunk in split_transcript(meeting, max_chars=self.TRANSCRIPT_CHUNK_CHARS):
+                chunk_keys.append(key)
+                chunks.append(chunk)
+
+        extractions = {}
+        for key, elements in zip(chunk_keys, self._extract_chunks(chunks)):
+            extractions.setdefault(key, []).append(elements)
+
+        for key, meeting_extractions in extractions.items():
+            stored[key] = merge_workbook_elements(
+                meeting_extractions, PROJECT_WORKBOOK_ELEMENTS
+            )
+            self._store_facts(key, stored[key])
+
+        workbook_contents = merge_workbook_elements(
+            stored.values(), PROJECT_WORKBOOK_ELEMENTS
+        )
+        return self.save_project_workbook(workbook_contents)
+
     def update_project_workbook(self, interview_calls_transcript):
 
         # Assign onboarding form response to self
         self.interview_calls_transcript = interview_calls_transcript
 
+        # Strip timestamps, filler words and repeated lines to cut prompt tokens
+        if self.COMPACT_TRANSCRIPTS:
+            with timed("preprocess", "compact_transcript"):
+                interview_calls_transcript, stats = compact_transcript(
+                    interview_calls_transcript
+                )
+            message = (
+                f"Compacted the transcript from {stats['input_chars']} to "
+                f"{stats['output_chars']} characters ({stats['ratio']:.0%})"
+            )
+            print(message)
+            report(message, **stats)
+
+        if self.fact_store is not None:
+            return self._update_project_workbook_incrementally(
+                interview_calls_transcript
+            )
+
+        # Map-reduce long transcripts instead of sending them in a single prompt
+        transcript_chunks = split_transcript(
+            interview_calls_transcript, max_chars=self.TRANSCRIPT_CHUNK_CHARS
+        )
+        if len(transcript_chunks) > 1:
+            workbook_contents = self.extract_project_workbook_elements(
+                transcript_chunks
+            )
+            return self.save_project_workbook(workbook_contents)
+
+        if self.direct_tools:
+            return self._run_workbook_graph(
+                lambda: self._create_project_workbook_elements(
+                    interview_calls_transcript
+                )
+            )
+
         # Assign agents to variables
         project_manager = self.agents.project_manager()
         interviewing_agent = self.agents.interviewing_agent()
@@ -70,7 +372,7 @@ class PMCrew:
         )
 
         # Define Crew
-        crew = Crew(
+        crew = self._create_crew(
             agents=[project_manager, writing_agent, interviewing_agent],
             tasks=[
                 create_project_workbook_elements,
@@ -78,12 +380,172 @@ class PMCrew:
                 create_follow_up_interview_questions,
                 save_interview_questions,
             ],
-            process=Process.sequential,
-            memory=True,
-            verbose=True,
+            memory=self.memory,
         )
 
-        result = crew.kickoff()
+        with timed("crew", "sequential_crew"):
+            result = crew.kickoff()
+        return result
+
+    def _create_project_workbook_elements(self, interview_calls_transcript):
+        """Extract the workbook elements of a transcript as structured output."""
+        project_manager = self.agents.project_manager()
+        create_project_workbook_elements = self.tasks.create_project_workbook_elements(
+            agent=project_manager,
+            interview_calls_transcript=interview_calls_transcript,
+            structured=True,
+        )
+
+        # Write each new section to Notion as soon as its part of the streamed
+        # answer is complete, while the rest is still being generated
+        writer = ProgressiveWorkbookWriter(self.tasks.pm_tools.notion)
+        try:
+            with writer:
+                with listen_tokens(JSONSectionParser(writer.add_section)):
+                    result = self._kickoff(
+                        "create_project_workbook_elements",
+                        project_manager,
+                        create_project_workbook_elements,
+                        memory=self.memory,
+                    )
+            elements = structured_output(
+                result, "elements", "create_project_workbook_elements"
+            )
+        except Exception:
+            # Don't leave sections of an answer that failed on the page
+            writer.discard()
+            raise
+
+        self._streamed_workbook = writer
+        return elements
+
+    def _save_workbook_directly(self, workbook_contents):
+        """
+        Save the workbook elements to Notion.
+
+        Sections already written with the same content while the workbook was
+        streamed are skipped, and the rest are synced against the sections the
+        writer read, without reading the page again.
+        """
+        writer, self._streamed_workbook = self._streamed_workbook, None
+        if writer is None:
+            return self.tasks.pm_tools.create_project_workbook_elements.run(
+                {"workbook_contents": workbook_contents}
+            )
+
+        remaining = {
+            key: value
+            for key, value in workbook_contents.items()
+            if writer.written.get(key) != value
+        }
+        if remaining:
+            with timed("tool", "create_project_workbook"):
+                self.tasks.pm_tools.notion.update_project_workbook(
+                    remaining, sections=writer.sections
+                )
+        return "Workbook created successfully!"
+
+    def _create_follow_up_interview_questions(self, workbook_contents):
+        """Create follow-up interview questions for the workbook as structured output."""
+        interviewing_agent = self.agents.interviewing_agent()
+        create_follow_up_interview_questions = (
+            self.tasks.create_follow_up_interview_questions(
+                agent=interviewing_agent,
+                workbook_contents=workbook_contents,
+                structured=True,
+            )
+        )
+
+        return self._kickoff(
+            "create_follow_up_interview_questions",
+            interviewing_agent,
+            create_follow_up_interview_questions,
+            memory=self.memory,
+        )
+
+    def _run_workbook_graph(self, extract_workbook_elements):
+        """
+        Run the workbook workflow as a dependency graph.
+
+        Saving the workbook and creating the follow-up questions only depend on
+        the extracted workbook, so they run concurrently once it is available.
+        The questions are saved after the workbook, so the writes to the page
+        never interleave and the sections keep the same order on every run.
+
+        Args:
+            extract_workbook_elements (callable): Returns the workbook elements.
+
+        Returns:
+            str: The results of saving the workbook and the follow-up questions.
+        """
+        graph = TaskGraph(max_workers=self.STEP_CONCURRENCY)
+        graph.add("workbook_contents", extract_workbook_elements)
+        graph.add(
+            "saved_workbook",
+            self._save_workbook_directly,
+            depends_on=["workbook_contents"],
+        )
+        graph.add(
+            "follow_up_interview_questions",
+            self._create_follow_up_interview_questions,
+            depends_on=["workbook_contents"],
+        )
+        graph.add(
+            "saved_interview_questions",
+            lambda follow_up_interview_questions, saved_workbook: self._save_interview_questions_directly(
+                follow_up_interview_questions, title="Recommended Follow-Up Questions"
+            ),
+            depends_on=["follow_up_interview_questions", "saved_workbook"],
+        )
+
+        results = graph.run()
+        return f"{results['saved_workbook']} {results['saved_interview_questions']}"
+
+    def save_project_workbook(self, workbook_contents):
+        """
+        Save extracted workbook elements and create follow-up interview questions.
+
+        Args:
+            workbook_contents (dict): The workbook elements mapped to their details.
+
+        Returns:
+            CrewOutput or str: The result of the crew, or the results of the
+                Notion tools when they are called directly.
+        """
+
+        if self.direct_tools:
+            return self._run_workbook_graph(lambda: workbook_contents)
+
+        # Assign agents to variables
+        interviewing_agent = self.agents.interviewing_agent()
+        writing_agent = self.agents.writing_agent()
+
+        # Create tasks and assign agents to them
+        update_project_workbook_elements = self.tasks.update_project_workbook_elements(
+            agent=writing_agent, workbook_contents=workbook_contents
+        )
+        create_follow_up_interview_questions = (
+            self.tasks.create_follow_up_interview_questions(
+                agent=interviewing_agent, workbook_contents=workbook_contents
+            )
+        )
+        save_interview_questions = self.tasks.save_interview_questions(
+            agent=writing_agent, title="Recommended Follow-Up Questions"
+        )
+
+        # Define Crew
+        crew = self._create_crew(
+            agents=[writing_agent, interviewing_agent],
+            tasks=[
+                update_project_workbook_elements,
+                create_follow_up_interview_questions,
+                save_interview_questions,
+            ],
+            memory=self.memory,
+        )
+
+        with timed("crew", "sequential_crew"):
+            result = crew.kickoff()
         return result
 
     def test_crew(self, onboarding_form_response):
@@ -101,7 +563,7 @@ class PMCrew:
             agent=writing_agent, title="First Interviewing Questions"
         )
 
-        crew = Crew(
+        crew = self._create_crew(
             agents=[
                 interviewing_agent,
                 writing_agent,
@@ -110,30 +572,5 @@ class PMCrew:
                 create_interview_questions,
                 save_interview_questions,
             ],
-            process=Process.sequential,
-            verbose=True,
             memory=True,
-            # long_term_memory=EnhanceLongTermMemory(
-            #     storage=LTMSQLiteStorage(
-            #         db_path="/my_data_dir/my_crew1/long_term_memory_storage.db"
-            #     )
-            # ),
-            # short_term_memory=EnhanceShortTermMemory(
-            #     storage=CustomRAGStorage(
-            #         crew_name="my_crew",
-            #         storage_type="short_term",
-            #         data_dir="//my_data_dir",
-            #         model=embedder["model"],
-            #         dimension=embedder["dimension"],
-            #     ),
-            # ),
-            # entity_memory=EnhanceEntityMemory(
-            #     storage=CustomRAGStorage(
-            #         crew_name="my_crew",
-            #         storage_type="entities",
-            #         data_dir="//my_data_dir",
-            #         model=embedder["model"],
-            #         dimension=embedder["dimension"],
-            #     ),
-            # ),
         )
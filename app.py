@@ -1,8 +1,17 @@
 import io
+import time
+import datetime
 from dotenv import load_dotenv
 import streamlit as st
-from notion.notion import Notion
-from agent.workflow import PMCrew
+from notion.clients import get_client_registry
+from agent.jobs import JobStore, get_job_runner, run_crew_job
+from agent.crew_cache import get_crew_cache
+from agent.facts import get_fact_store
+from agent.transcripts import combine_transcripts
+
+
+# Number of clients listed in the client selector at a time
+CLIENTS_PER_PAGE = 50
 
 
 def get_onboarding_form_response():
@@ -54,7 +63,7 @@ def get_interview_calls_transcript():
 
     if uploaded_files:
         combined_contents = []
-        for i, uploaded_file in enumerate(uploaded_files, 1):
+        for uploaded_file in uploaded_files:
             try:
                 # Check if the file is a text file
                 if uploaded_file.type == "text/plain":
@@ -62,9 +71,8 @@ def get_interview_calls_transcript():
                     stringio = io.StringIO(uploaded_file.getvalue().decode("utf-8"))
                     content = stringio.read()
 
-                    # Add heading and content to the list
-                    heading = f"******** MEETING TRANSCRIPT {i} ********\n"
-                    combined_contents.append(heading + content + "\n\n")
+                    # Add the content to the list
+                    combined_contents.append(content)
                 else:
                     st.error(
                         f"Please upload a text file. '{uploaded_file.name}' is not a text file."
@@ -75,12 +83,151 @@ def get_interview_calls_transcript():
                 )
 
         if combined_contents:
-            return "".join(combined_contents)
+            # Combine the transcripts under meeting headings
+            return combine_transcripts(combined_contents)
         else:
             return None
     return None
 
 
+@st.cache_resource
+def job_runner():
+    """Get the job runner shared by all sessions of this server."""
+    return get_job_runner()
+
+
+def submit_crew_job(kind, client_id, payload):
+    """
+    Submit a crew run to the worker pool and remember its job ID.
+
+    Args:
+        kind (str): "interview_questions" or "project_workbook".
+        client_id (str): The client ID.
+        payload (str): The onboarding form response or the interview calls transcript.
+    """
+    job_id = job_runner().submit(kind, client_id, run_crew_job, kind, client_id, payload)
+    st.session_state["job_ids"].append(job_id)
+    st.info(f"Started job {job_id}")
+
+
+def render_trace(trace):
+    """
+    Show where the time and cost of a crew run went.
+
+    Args:
+    trace (dict): The trace summary of the run
+    """
+    llm, notion = trace["llm"], trace["notion"]
+
+    total, llm_time, notion_time, cost = st.columns(4)
+    total.metric("Wall time", f"{trace['duration_seconds'] or 0:.1f} s")
+    llm_time.metric(
+        "LLM",
+        f"{llm['seconds']:.1f} s",
+        f"{llm['calls']} calls, {llm.get('cached_calls', 0)} cached",
+        delta_color="off",
+    )
+    notion_time.metric(
+        "Notion", f"{notion['seconds']:.1f} s", f"{notion['requests']} requests", delta_color="off"
+    )
+    cost.metric(
+        "Estimated cost",
+        f"${llm['cost_usd']:.4f}",
+        f"{llm['prompt_tokens']} + {llm['completion_tokens']} tokens",
+        delta_color="off",
+    )
+
+    # Per-task, per-agent and tool call wall times
+    if trace["spans"]:
+        st.dataframe(trace["spans"], use_container_width=True)
+
+
+def render_progress(progress):
+    """
+    Show the live progress of a running crew run.
+
+    Args:
+    progress (dict or None): The progress snapshot of the run
+    """
+    if not progress:
+        return
+
+    if progress["first_token_seconds"] is not None:
+        st.caption(f"First output after {progress['first_token_seconds']:.1f} s")
+
+    # Finished tasks and workbook sections already written to Notion
+    for event in progress["events"]:
+        st.write(f"{event['seconds']:.1f} s - {event['message']}")
+        if event.get("output"):
+            st.text(event["output"])
+
+    # What the LLM is generating right now
+    if progress["stream"]:
+        st.code(progress["stream"], language=None)
+
+
+def select_client():
+    """
+    Let the user pick a client, one page of the client registry at a time.
+
+    Returns:
+        str or None: The selected client ID.
+    """
+    registry = get_client_registry()
+    page_count = max(1, -(-registry.count() // CLIENTS_PER_PAGE))
+
+    page = 1
+    if page_count > 1:
+        page = st.number_input("Client page", min_value=1, max_value=page_count, value=1)
+
+    client_ids = registry.list_ids(
+        offset=(page - 1) * CLIENTS_PER_PAGE, limit=CLIENTS_PER_PAGE
+    )
+    return st.selectbox("Clients", client_ids)
+
+
+def render_jobs(client_id):
+    """
+    Show the status and results of the client's recent crew runs.
+
+    Runs are read from the job store, so they survive reruns and page refreshes.
+
+    Returns:
+    bool: True if a run is still queued or running
+    """
+    st.subheader("Runs")
+
+    jobs = job_runner().store.list_for_client(client_id)
+    if not jobs:
+        st.write("No runs yet.")
+        return False
+
+    active = False
+    for job in jobs:
+        created_at = datetime.datetime.fromtimestamp(job["created_at"])
+        label = f"{job['kind'].replace('_', ' ').title()} - {created_at:%Y-%m-%d %H:%M} - {job['status']}"
+
+        with st.expander(label, expanded=job["id"] in st.session_state["job_ids"]):
+            if job["status"] in (JobStore.QUEUED, JobStore.RUNNING):
+                active = True
+                st.write("Running..." if job["status"] == JobStore.RUNNING else "Queued...")
+                render_progress(job_runner().progress(job["id"]))
+            elif job["status"] == JobStore.SUCCEEDED:
+                st.success(job["result"])
+            else:
+                st.error(job["error"])
+
+            if job["trace"]:
+                render_trace(job["trace"])
+
+    # Show what the runs wrote to Notion in the Results tab, newest last
+    for job in reversed(jobs):
+        if job["status"] == JobStore.SUCCEEDED:
+            st.session_state["logs"].update(job["logs"])
+
+    return active
+
+
 def main():
 
     # Load environment variables
@@ -92,8 +239,19 @@ def main():
         unsafe_allow_html=True,
     )
 
-    all_clients = Notion.CLIENTS_DATA.keys()
-    client_id = st.selectbox("Clients", all_clients)
+    if "logs" not in st.session_state:
+        st.session_state["logs"] = {}
+    if "job_ids" not in st.session_state:
+        st.session_state["job_ids"] = []
+
+    client_id = select_client()
+
+    # Crews are reused across reruns, so offer a way to rebuild a client's
+    # crew, e.g. after its Notion page was replaced
+    if client_id and st.button(
+        "Reload client", help="Rebuild the client's crew and look up its Notion page again"
+    ):
+        get_crew_cache().invalidate(client_id)
 
     onboarding_tab, interview_tab, results_tab = st.tabs(
         ["Onboarding", "Interview", "Results"]
@@ -115,16 +273,10 @@ def main():
 
             if st.button("Create Interview Questions"):
 
-                with st.spinner("Creating interview questions"):
-
-                    # Create an instance of PMCrew
-                    pm_crew = PMCrew(client_id=client_id)
-                    # Create and add interview questions
-                    result = pm_crew.create_interview_questions(
-                        onboarding_form_response
-                    )
-
-                st.success(result)
+                # Create and add interview questions in the background
+                submit_crew_job(
+                    "interview_questions", client_id, onboarding_form_response
+                )
 
     with interview_tab:
         # Get the initial interview call transcript
@@ -140,20 +292,22 @@ def main():
                 label_visibility="hidden",
             )
 
-            if st.button("Populate Workbook"):
-
-                with st.spinner("Updating project workbook"):
+            # Transcripts processed before are not sent to the LLM again,
+            # unless the stored facts of the client are cleared
+            reprocess = st.checkbox(
+                "Reprocess all transcripts",
+                help="Forget the facts extracted from earlier transcripts of this client",
+            )
 
-                    # Create an instance of PMCrew
-                    pm_crew = PMCrew(client_id=client_id)
-                    # Populate project workbook
-                    result = pm_crew.update_project_workbook(interview_calls_transcript)
+            if st.button("Populate Workbook"):
+                if reprocess:
+                    get_fact_store().clear(client_id)
 
-                st.success(result)
+                # Populate project workbook in the background
+                submit_crew_job("project_workbook", client_id, interview_calls_transcript)
 
     with results_tab:
-        if "logs" not in st.session_state:
-            st.session_state["logs"] = {}
+        active = render_jobs(client_id)
 
         def render_results(data):
             rendered = []
@@ -182,6 +336,11 @@ def main():
 
         st.write(render_results(st.session_state["logs"]))
 
+    # Poll the job store until the client's runs are finished
+    if active and st.toggle("Auto-refresh", value=True):
+        time.sleep(2)
+        st.rerun()
+
 
 if __name__ == "__main__":
     main()
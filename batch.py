@@ -0,0 +1,225 @@
+"""
+Populate project workbooks for many clients without the UI.
+
+Expects one directory per client ID in the client registry:
+
+    <input_dir>/<client_id>/onboarding.txt       Onboarding form response (optional)
+    <input_dir>/<client_id>/transcripts/*.txt    Interview call transcripts (optional)
+
+Usage:
+    python batch.py <input_dir> [--concurrency 4] [--executor thread|process]
+"""
+
+import os
+import glob
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from dotenv import load_dotenv
+
+from notion.notion import Notion
+from notion.clients import get_client_registry
+from notion.rate_limit import TokenBucket
+from agent.jobs import run_crew_job
+from agent.tracing import trace_run
+from agent.transcripts import combine_transcripts
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def load_client_inputs(client_dir):
+    """
+    Read a client's onboarding form response and interview call transcripts.
+
+    Args:
+        client_dir (str): The client's input directory.
+
+    Returns:
+        tuple: The onboarding form response and the combined transcripts, each None if missing.
+    """
+    onboarding_path = os.path.join(client_dir, "onboarding.txt")
+    onboarding_form_response = (
+        read_text(onboarding_path) if os.path.exists(onboarding_path) else None
+    )
+
+    transcript_paths = sorted(glob.glob(os.path.join(client_dir, "transcripts", "*.txt")))
+    interview_calls_transcript = (
+        combine_transcripts([read_text(path) for path in transcript_paths])
+        if transcript_paths
+        else None
+    )
+
+    return onboarding_form_response, interview_calls_transcript
+
+
+def init_worker_process(workers):
+    """
+    Give each worker process an equal share of the Notion rate limit.
+
+    The rate limiter is shared by the threads of one process only, so with a
+    process pool each process gets REQUESTS_PER_SECOND / workers, keeping the
+    combined rate within Notion's limit.
+
+    Args:
+        workers (int): The number of worker processes.
+    """
+    Notion.rate_limiter = TokenBucket(rate=Notion.REQUESTS_PER_SECOND / workers, capacity=1)
+
+
+def process_client(client_id, client_dir, workflows):
+    """
+    Run the requested workflows for one client.
+
+    Args:
+        client_id (str): The client ID.
+        client_dir (str): The client's input directory.
+        workflows (list[str]): The workflows to run, in order.
+
+    Returns:
+        dict: The result summary of the client.
+    """
+    load_dotenv()
+
+    summary = {"client_id": client_id, "status": "succeeded", "runs": []}
+    onboarding_form_response, interview_calls_transcript = load_client_inputs(client_dir)
+    payloads = {
+        "interview_questions": onboarding_form_response,
+        "project_workbook": interview_calls_transcript,
+    }
+
+    for kind in workflows:
+        if not payloads[kind]:
+            summary["runs"].append({"kind": kind, "status": "skipped"})
+            continue
+
+        start = time.perf_counter()
+        with trace_run(client_id=client_id, kind=kind) as trace:
+            try:
+                result, logs = run_crew_job(kind, client_id, payloads[kind])
+                run = {"kind": kind, "status": "succeeded", "result": str(result), "logs": logs}
+            except Exception:
+                run = {"kind": kind, "status": "failed", "error": traceback.format_exc()}
+                summary["status"] = "failed"
+
+        run["duration_seconds"] = round(time.perf_counter() - start, 2)
+        run["trace"] = {
+            key: value
+            for key, value in trace.summary().items()
+            if key in ("run_id", "llm", "notion", "spans")
+        }
+        summary["runs"].append(run)
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Populate project workbooks for many clients in parallel."
+    )
+    parser.add_argument("input_dir", help="Directory with one subdirectory per client ID")
+    parser.add_argument(
+        "--output-dir",
+        default="batch_results",
+        help="Directory to write the per-client result summaries to",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Number of clients processed at once"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        default="thread",
+        help="Run clients in a thread pool or a process pool",
+    )
+    parser.add_argument(
+        "--workflow",
+        choices=["interview_questions", "project_workbook", "all"],
+        default="all",
+        help="The workflow to run for each client",
+    )
+    parser.add_argument(
+        "--clients", nargs="*", help="Only process these client IDs"
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    workflows = (
+        ["interview_questions", "project_workbook"]
+        if args.workflow == "all"
+        else [args.workflow]
+    )
+
+    # Match the input directories against the known clients
+    client_ids = args.clients or sorted(os.listdir(args.input_dir))
+    registry = get_client_registry()
+    clients = {}
+    for client_id in client_ids:
+        client_dir = os.path.join(args.input_dir, client_id)
+        if not os.path.isdir(client_dir):
+            continue
+        if client_id not in registry:
+            print(f"Skipping {client_id}: not a client in the client registry")
+            continue
+        clients[client_id] = client_dir
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.executor == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=args.concurrency,
+            initializer=init_worker_process,
+            initargs=(args.concurrency,),
+        )
+    else:
+        executor = ThreadPoolExecutor(max_workers=args.concurrency)
+
+    summaries = []
+    with executor:
+        futures = {
+            executor.submit(process_client, client_id, client_dir, workflows): client_id
+            for client_id, client_dir in clients.items()
+        }
+
+        for future in as_completed(futures):
+            client_id = futures[future]
+            try:
+                summary = future.result()
+            except Exception:
+                summary = {
+                    "client_id": client_id,
+                    "status": "failed",
+                    "error": traceback.format_exc(),
+                }
+
+            # Write the client's summary as soon as it is done
+            with open(os.path.join(args.output_dir, f"{client_id}.json"), "w") as f:
+                json.dump(summary, f, indent=2, default=str)
+
+            print(f"{client_id}: {summary['status']}")
+            summaries.append(summary)
+
+    with open(os.path.join(args.output_dir, "summary.json"), "w") as f:
+        json.dump(
+            {
+                client["client_id"]: client["status"]
+                for client in sorted(summaries, key=lambda client: client["client_id"])
+            },
+            f,
+            indent=2,
+        )
+
+    failed = sum(summary["status"] != "succeeded" for summary in summaries)
+    print(f"Processed {len(summaries)} clients, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
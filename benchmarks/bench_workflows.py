@@ -0,0 +1,285 @@
+"""
+End-to-end benchmarks of the crew workflows, without OpenAI or Notion.
+
+Runs PMCrew.create_interview_questions and PMCrew.update_project_workbook with a
+deterministic stub LLM and an in-memory fake of the Notion API, over synthetic
+onboarding forms and transcripts of increasing size, and reports the latency,
+LLM calls, Notion requests and peak memory of each.
+
+Usage:
+    python -m benchmarks.bench_workflows [--sizes 1 4 16] [--repeats 5]
+        [--output benchmarks/results.json] [--compare baseline.json]
+"""
+
+import os
+
+# Keep crewai from sending telemetry during benchmark runs
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("NOTION_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from agent.tasks import PROJECT_WORKBOOK_ELEMENTS
+from agent.progress import ProgressCallbackHandler, RunProgress, track_progress
+from agent.tracing import TraceCallbackHandler, trace_run
+from agent.transcripts import combine_transcripts
+from agent.workflow import PMCrew
+from benchmarks.stubs import FakeNotionSession, StubChatModel
+from notion.notion import Notion
+from notion.rate_limit import TokenBucket
+
+
+WORKFLOWS = ["interview_questions", "project_workbook"]
+
+# An existing client with a Notion page, so runs never write to the client registry
+CLIENT_ID = "Client 1"
+
+TRACE_DIR = os.path.join(tempfile.gettempdir(), "pm_benchmark_traces")
+
+WORDS = (
+    "budget timeline launch vendor review release customer team risk scope "
+    "approval integration training migration report dashboard contract"
+).split()
+
+
+def synthetic_onboarding_form(size, rng):
+    """Create an onboarding form response with `size` answered sections."""
+    lines = []
+    for i in range(size):
+        for element in rng.sample(PROJECT_WORKBOOK_ELEMENTS, 3):
+            answer = " ".join(rng.choices(WORDS, k=12))
+            lines.append(f"Q{i + 1}. What is the {element}?\nA: {answer}")
+    return "\n\n".join(lines)
+
+
+def synthetic_transcripts(size, rng, turns=40):
+    """Create `size` interview call transcripts, combined as in the app."""
+    transcripts = []
+    for _ in range(size):
+        lines = []
+        for turn in range(turns):
+            speaker = "Consultant" if turn % 2 == 0 else "Client"
+            element = rng.choice(PROJECT_WORKBOOK_ELEMENTS)
+            detail = " ".join(rng.choices(WORDS, k=15))
+            lines.append(f"{speaker}: The {element} is {detail}.")
+        transcripts.append("\n".join(lines))
+    return combine_transcripts(transcripts)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def run_once(workflow, payload, llm_latency, notion_latency, notion_rate):
+    """
+    Run one workflow against a fresh fake Notion.
+
+    Returns:
+        dict: The latency, time to first token, LLM calls, Notion requests and peak memory of the run.
+    """
+    session = FakeNotionSession(latency=notion_latency)
+    Notion.session = session
+    Notion.rate_limiter = TokenBucket(rate=notion_rate)
+
+    llm = StubChatModel(
+        latency=llm_latency,
+        callbacks=[TraceCallbackHandler(), ProgressCallbackHandler()],
+    )
+    progress = RunProgress()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with trace_run(client_id=CLIENT_ID, kind=workflow, trace_dir=TRACE_DIR) as trace:
+        with track_progress(progress):
+            pm_crew = PMCrew(
+                client_id=CLIENT_ID,
+                llm=llm,
+                memory=False,
+                pmbok_tools=[],
+                incremental=False,
+            )
+            if workflow == "interview_questions":
+                pm_crew.create_interview_questions(payload)
+            else:
+                pm_crew.update_project_workbook(payload)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = trace.summary()
+    return {
+        "seconds": seconds,
+        "first_token_seconds": progress.first_token_seconds,
+        "llm_calls": summary["llm"]["calls"],
+        "prompt_tokens": summary["llm"]["prompt_tokens"],
+        "notion_requests": dict(session.counts),
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def benchmark(workflow, size, repeats, seed, **run_options):
+    """
+    Benchmark a workflow on a synthetic input of a given size.
+
+    Returns:
+        dict: The latency percentiles and the request counts and memory of the runs.
+    """
+    rng = random.Random(f"{seed}-{workflow}-{size}")
+    payload = (
+        synthetic_onboarding_form(size, rng)
+        if workflow == "interview_questions"
+        else synthetic_transcripts(size, rng)
+    )
+
+    runs = [run_once(workflow, payload, **run_options) for _ in range(repeats)]
+    latencies = [run["seconds"] for run in runs]
+
+    notion_requests = {}
+    for run in runs:
+        for method, count in run["notion_requests"].items():
+            notion_requests[method] = max(notion_requests.get(method, 0), count)
+
+    return {
+        "workflow": workflow,
+        "size": size,
+        "input_chars": len(payload),
+        "repeats": repeats,
+        "p50_seconds": round(percentile(latencies, 50), 4),
+        "p95_seconds": round(percentile(latencies, 95), 4),
+        "mean_seconds": round(sum(latencies) / len(latencies), 4),
+        "p50_first_token_seconds": percentile(
+            [run["first_token_seconds"] or 0.0 for run in runs], 50
+        ),
+        "llm_calls": max(run["llm_calls"] for run in runs),
+        "prompt_tokens": max(run["prompt_tokens"] for run in runs),
+        "notion_requests": notion_requests,
+        "peak_memory_mb": round(max(run["peak_memory_mb"] for run in runs), 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline run of the benchmarks.
+
+    Returns:
+        list[str]: The regressions, empty if there are none.
+    """
+    baseline_cases = {
+        (case["workflow"], case["size"]): case for case in baseline["results"]
+    }
+
+    regressions = []
+    for case in results["results"]:
+        previous = baseline_cases.get((case["workflow"], case["size"]))
+        if previous is None:
+            continue
+
+        name = f"{case['workflow']} (size {case['size']})"
+        for metric in ("p50_seconds", "p95_seconds", "peak_memory_mb"):
+            if previous[metric] and case[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]} -> {case[metric]}"
+                )
+
+        previous_requests = sum(previous["notion_requests"].values())
+        requests = sum(case["notion_requests"].values())
+        if case["llm_calls"] > previous["llm_calls"]:
+            regressions.append(
+                f"{name}: llm_calls {previous['llm_calls']} -> {case['llm_calls']}"
+            )
+        if requests > previous_requests:
+            regressions.append(
+                f"{name}: notion_requests {previous_requests} -> {requests}"
+            )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the crew workflows with a stub LLM and a fake Notion."
+    )
+    parser.add_argument(
+        "--workflow", choices=WORKFLOWS + ["all"], default="all", help="The workflow to benchmark"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 4, 16],
+        help="Input sizes, in onboarding form sections or transcripts",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per input size")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic inputs")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.05, help="Seconds per stub LLM call"
+    )
+    parser.add_argument(
+        "--notion-latency", type=float, default=0.02, help="Seconds per fake Notion request"
+    )
+    parser.add_argument(
+        "--notion-rate", type=float, default=Notion.REQUESTS_PER_SECOND,
+        help="Notion requests per second allowed by the client rate limiter",
+    )
+    parser.add_argument(
+        "--output", default="benchmarks/results.json", help="Where to write the results"
+    )
+    parser.add_argument("--compare", help="A previous results file to check for regressions")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="Relative slowdown or memory growth reported as a regression",
+    )
+    args = parser.parse_args()
+
+    workflows = WORKFLOWS if args.workflow == "all" else [args.workflow]
+    run_options = {
+        "llm_latency": args.llm_latency,
+        "notion_latency": args.notion_latency,
+        "notion_rate": args.notion_rate,
+    }
+
+    results = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "options": dict(run_options, repeats=args.repeats, seed=args.seed),
+        "results": [],
+    }
+    for workflow in workflows:
+        for size in args.sizes:
+            case = benchmark(workflow, size, args.repeats, args.seed, **run_options)
+            results["results"].append(case)
+            print(
+                f"{workflow} size={size}: p50 {case['p50_seconds']}s, "
+                f"p95 {case['p95_seconds']}s, {case['llm_calls']} LLM calls, "
+                f"{sum(case['notion_requests'].values())} Notion requests, "
+                f"{case['peak_memory_mb']} MB peak"
+            )
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, ClassVar, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agent.tasks import PROJECT_WORKBOOK_ELEMENTS
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in for the OpenAI chat model.
+
+    Answers in the format crewai agents expect, after a configurable latency,
+    and streams the answer to the callbacks.
+    Workbook extraction prompts get the transcript lines that mention each
+    workbook element, and question prompts get a fixed set of questions derived
+    from the prompt, so the same input always produces the same output.
+    """
+
+    latency: float = 0.05
+
+    # Characters per streamed token
+    STREAM_CHUNK_CHARS: ClassVar[int] = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @staticmethod
+    def _answer(prompt):
+        """Create the structured answer to a prompt."""
+        if "Interview Calls Transcript" in prompt:
+            transcript = prompt.split("Interview Calls Transcript", 1)[1]
+            elements = {}
+            for line in transcript.splitlines():
+                for element in PROJECT_WORKBOOK_ELEMENTS:
+                    if element.lower() in line.lower():
+                        items = elements.setdefault(element, [])
+                        if len(items) < 3:
+                            items.append(line.split(":", 1)[-1].strip())
+            return {"elements": elements}
+
+        if "questions" in prompt.lower():
+            digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+            elements = [
+                PROJECT_WORKBOOK_ELEMENTS[(digest >> (8 * i)) % len(PROJECT_WORKBOOK_ELEMENTS)]
+                for i in range(6)
+            ]
+            return {"questions": [f"Can you describe the {element}?" for element in elements]}
+
+        return {"result": "done"}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = (
+            "Thought: I now can give a great answer\n"
+            f"Final Answer: {json.dumps(self._answer(prompt))}"
+        )
+
+        # Stream the answer in small pieces, as the streaming OpenAI model does
+        if run_manager is not None:
+            for i in range(0, len(content), self.STREAM_CHUNK_CHARS):
+                run_manager.on_llm_new_token(content[i : i + self.STREAM_CHUNK_CHARS])
+
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={
+                "model_name": "stub",
+                "token_usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                },
+            },
+        )
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.headers = {}
+        self.text = json.dumps(self._data)
+
+    def json(self):
+        return self._data
+
+
+class FakeNotionSession:
+    """
+    In-memory stand-in for the Notion API, used in place of Notion.session.
+
+    Implements the endpoints the Notion client uses: creating pages, listing
+    block children with pagination, appending children (optionally after a
+    block), and updating and deleting blocks. Every request waits a configurable
+    latency and is counted by method.
+    """
+
+    BASE_URL = "https://api.notion.com/v1"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.children = {}
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def _store(self, block):
+        """Store a sent block as Notion would return it, with its children stored separately."""
+        block_id = uuid.uuid4().hex
+        block_type = block["type"]
+        content = dict(block[block_type])
+        children = content.pop("children", None) or []
+
+        content["rich_text"] = [
+            dict(item, plain_text=item.get("text", {}).get("content", ""))
+            for item in content.get("rich_text", [])
+        ]
+        stored = {
+            "object": "block",
+            "id": block_id,
+            "type": block_type,
+            "has_children": bool(children),
+            block_type: content,
+        }
+        self.children[block_id] = [self._store(child) for child in children]
+        return stored
+
+    def request(self, method, url, headers=None, json=None, params=None, timeout=None):
+        time.sleep(self.latency)
+        path = url.replace(self.BASE_URL, "")
+
+        with self._lock:
+            self.counts[method] += 1
+
+            if method == "POST" and path == "/pages":
+                page_id = uuid.uuid4().hex
+                self.children[page_id] = []
+                return FakeResponse(200, {"id": page_id})
+
+            match = re.fullmatch(r"/blocks/([^/]+)/children", path)
+            if match:
+                children = self.children.setdefault(match.group(1), [])
+
+                if method == "GET":
+                    # Like Notion, cursors are the IDs of the first block of a page
+                    params = params or {}
+                    ids = [child["id"] for child in children]
+                    cursor = params.get("start_cursor")
+                    if cursor is not None and cursor not in ids:
+                        return FakeResponse(400, {"code": "validation_error"})
+                    start = ids.index(cursor) if cursor is not None else 0
+                    end = start + int(params.get("page_size", 100))
+                    return FakeResponse(
+                        200,
+                        {
+                            "results": children[start:end],
+                            "has_more": end < len(children),
+                            "next_cursor": ids[end] if end < len(children) else None,
+                        },
+                    )
+
+                created = [self._store(block) for block in json["children"]]
+                ids = [child["id"] for child in children]
+                position = (
+                    ids.index(json["after"]) + 1
+                    if json.get("after") in ids
+                    else len(children)
+                )
+                children[position:position] = created
+                return FakeResponse(200, {"results": created})
+
+            match = re.fullmatch(r"/blocks/([^/]+)", path)
+            if match:
+                for children in self.children.values():
+                    for i, block in enumerate(children):
+                        if block["id"] != match.group(1):
+                            continue
+                        if method == "DELETE":
+                            del children[i]
+                        else:
+                            block_type = block["type"]
+                            stored = self._store(dict(json, type=block_type))
+                            block[block_type] = stored[block_type]
+                        return FakeResponse(200, block)
+                return FakeResponse(404, {"code": "object_not_found"})
+
+        return FakeResponse(400, {"code": "invalid_request_url"})
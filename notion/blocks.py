@@ -0,0 +1,174 @@
+import json
+
+
+# Notion API request limits
+MAX_TEXT_LENGTH = 2000
+MAX_RICH_TEXT_ITEMS = 100
+MAX_CHILDREN = 100
+MAX_BLOCKS_PER_REQUEST = 1000
+MAX_PAYLOAD_BYTES = 500_000
+
+# Leave room for the rest of the request body
+PAYLOAD_BUDGET_BYTES = MAX_PAYLOAD_BYTES - 10_000
+
+
+def split_text(text, limit=MAX_TEXT_LENGTH):
+    """
+    Split text into pieces of at most `limit` characters, preferring whitespace boundaries.
+
+    Args:
+        text (str): The text to split.
+        limit (int): The maximum length of a piece.
+
+    Returns:
+        list[str]: The pieces, which join back into the original text.
+    """
+    pieces = []
+    while len(text) > limit:
+        # Break after the last whitespace within the limit, if there is one
+        cut = max(text.rfind(" ", 0, limit), text.rfind("\n", 0, limit)) + 1
+        if cut <= limit // 2:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:]
+
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def rich_text(text):
+    """
+    Create the rich_text arrays for a text of any length.
+
+    Each text object holds at most MAX_TEXT_LENGTH characters and each array at
+    most MAX_RICH_TEXT_ITEMS objects, so very long text is spread over several arrays.
+
+    Args:
+        text (str): The text content.
+
+    Returns:
+        list[list[dict]]: One rich_text array per block needed to hold the text.
+    """
+    items = [
+        {"type": "text", "text": {"content": piece}} for piece in split_text(str(text))
+    ]
+    return [
+        items[i : i + MAX_RICH_TEXT_ITEMS]
+        for i in range(0, len(items), MAX_RICH_TEXT_ITEMS)
+    ]
+
+
+def text_blocks(block_type, text, **properties):
+    """
+    Create blocks of a type holding a text of any length.
+
+    Args:
+        block_type (str): The block type, e.g. "paragraph" or "bulleted_list_item".
+        text (str): The text content.
+        **properties: Additional properties of the block type, e.g. color.
+
+    Returns:
+        list[dict]: The blocks, usually a single one.
+    """
+    return [
+        {
+            "object": "block",
+            "type": block_type,
+            block_type: dict(properties, rich_text=items),
+        }
+        for items in rich_text(text)
+    ]
+
+
+def _get_children(block):
+    return block.get(block["type"], {}).get("children") or []
+
+
+def _without_children(block):
+    block_type = block["type"]
+    content = {
+        key: value for key, value in block[block_type].items() if key != "children"
+    }
+    return dict(block, **{block_type: content})
+
+
+def _count_blocks(block):
+    return 1 + sum(_count_blocks(child) for child in _get_children(block))
+
+
+def _fit_children(block):
+    """
+    Keep a block's children inline only if they fit within Notion's nesting limits.
+
+    A request may nest blocks two levels deep and hold at most MAX_CHILDREN
+    children per block. Children that do not fit are removed from the block, to
+    be appended to it once it has been created.
+
+    Returns:
+        tuple: The block to send and the list of its deferred children.
+    """
+    children = _get_children(block)
+    if not children:
+        return block, []
+
+    if any(_get_children(child) for child in children):
+        # Grandchildren exceed the nesting limit, so add all children afterwards
+        return _without_children(block), children
+
+    if len(children) > MAX_CHILDREN:
+        block_type = block["type"]
+        inline = dict(block[block_type], children=children[:MAX_CHILDREN])
+        return dict(block, **{block_type: inline}), children[MAX_CHILDREN:]
+
+    return block, []
+
+
+def pack_blocks(children):
+    """
+    Pack blocks into as few append requests as Notion's limits allow.
+
+    Each request holds at most MAX_CHILDREN top-level blocks, MAX_BLOCKS_PER_REQUEST
+    blocks in total and PAYLOAD_BUDGET_BYTES of JSON, and nests at most two levels.
+
+    Args:
+        children (list): The blocks to append.
+
+    Returns:
+        list[tuple]: One (blocks, deferred) pair per request, where deferred[i]
+            holds the children to append to blocks[i] once it has been created.
+    """
+    batches = []
+    blocks, deferred = [], []
+    block_count = payload_size = 0
+
+    for block in children:
+        block, overflow = _fit_children(block)
+        size = len(json.dumps(block).encode("utf-8")) + 1
+
+        # A block whose children alone exceed the payload budget gets them afterwards
+        if size > PAYLOAD_BUDGET_BYTES and _get_children(block):
+            overflow = _get_children(block) + overflow
+            block = _without_children(block)
+            size = len(json.dumps(block).encode("utf-8")) + 1
+
+        count = _count_blocks(block)
+
+        if blocks and (
+            len(blocks) >= MAX_CHILDREN
+            or block_count + count > MAX_BLOCKS_PER_REQUEST
+            or payload_size + size > PAYLOAD_BUDGET_BYTES
+        ):
+            batches.append((blocks, deferred))
+            blocks, deferred = [], []
+            block_count = payload_size = 0
+
+        blocks.append(block)
+        deferred.append(overflow)
+        block_count += count
+        payload_size += size
+
+    if blocks:
+        batches.append((blocks, deferred))
+
+    return batches
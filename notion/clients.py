@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+CLIENTS_DB_PATH = os.environ.get("CLIENTS_DB_PATH", "clients.sqlite3")
+CLIENTS_JSON_PATH = "clients.json"
+
+
+class ClientRegistry:
+    """
+    SQLite registry of the clients and their Notion pages.
+
+    Clients are looked up by ID one at a time instead of being loaded all at
+    once, and the Notion page ID of a client is updated with a single atomic
+    upsert, so concurrent sessions never overwrite each other's changes. The
+    database runs in WAL mode, so reads are not blocked by a write in progress.
+    """
+
+    def __init__(self, db_path=CLIENTS_DB_PATH, import_path=CLIENTS_JSON_PATH):
+        """
+        Args:
+            db_path (str): The path of the SQLite database.
+            import_path (str or None): A clients.json file imported when the registry is empty.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clients (
+                client_id TEXT PRIMARY KEY,
+                client_name TEXT NOT NULL,
+                notion_page_id TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        if import_path and self.count() == 0:
+            self.import_json(import_path)
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+            return cursor
+
+    def import_json(self, path):
+        """
+        Import the clients of a clients.json file, keeping clients already registered.
+
+        Returns:
+            int: The number of clients imported.
+        """
+        try:
+            with open(path, "r") as f:
+                clients_data = json.load(f)
+        except FileNotFoundError:
+            print(f"{path} not found. Starting with an empty client registry.")
+            return 0
+
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.executemany(
+                    "INSERT OR IGNORE INTO clients (client_id, client_name, notion_page_id, updated_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (client_id, data["client_name"], data.get("notion_page_id"), now)
+                        for client_id, data in clients_data.items()
+                    ],
+                )
+        print(f"Imported {cursor.rowcount} clients from {path}")
+        return cursor.rowcount
+
+    def get(self, client_id):
+        """
+        Get a client.
+
+        Returns:
+            dict or None: The client name and Notion page ID, or None if the client is unknown.
+        """
+        row = self._execute(
+            "SELECT client_name, notion_page_id FROM clients WHERE client_id = ?",
+            (client_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def __contains__(self, client_id):
+        return self.get(client_id) is not None
+
+    def add(self, client_id, client_name=None):
+        """
+        Register a client without a Notion page, unless it is already registered.
+
+        Args:
+            client_id (str): The client ID.
+            client_name (str or None): The client name. Defaults to the client ID.
+
+        Returns:
+            dict: The client name and Notion page ID of the client.
+        """
+        self._execute(
+            "INSERT OR IGNORE INTO clients (client_id, client_name, notion_page_id, updated_at) VALUES (?, ?, NULL, ?)",
+            (client_id, client_name or client_id, time.time()),
+        )
+        return self.get(client_id)
+
+    def set_notion_page_id(self, client_id, notion_page_id, client_name=None):
+        """
+        Atomically set the Notion page ID of a client, adding the client if needed.
+
+        Args:
+            client_id (str): The client ID.
+            notion_page_id (str): The ID of the client's Notion page.
+            client_name (str or None): The name of a new client. Defaults to the client ID.
+        """
+        self._execute(
+            """
+            INSERT INTO clients (client_id, client_name, notion_page_id, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (client_id) DO UPDATE SET
+                notion_page_id = excluded.notion_page_id,
+                updated_at = excluded.updated_at
+            """,
+            (client_id, client_name or client_id, notion_page_id, time.time()),
+        )
+
+    def count(self):
+        return self._execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+
+    def list_ids(self, offset=0, limit=50):
+        """
+        List a page of client IDs, in ID order.
+
+        Returns:
+            list[str]: The client IDs.
+        """
+        rows = self._execute(
+            "SELECT client_id FROM clients ORDER BY client_id LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        return [row["client_id"] for row in rows]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """
+    Get the client registry of the process, opening it on first use.
+
+    Returns:
+        ClientRegistry: The shared client registry.
+    """
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
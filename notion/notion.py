@@ -1,10 +1,30 @@
 import os
-import json
 import time
+import random
 import requests
 import datetime
 import pytz
-import streamlit as st
+from requests.adapters import HTTPAdapter
+
+from notion.rate_limit import TokenBucket
+from notion.clients import get_client_registry
+from notion.blocks import pack_blocks, rich_text, text_blocks
+
+
+def _create_session():
+    """Create the pooled HTTP session shared by all Notion instances."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    return session
+
+
+class NotionAPIError(Exception):
+    """Raised when a Notion request still fails after all retries."""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
 
 
 class Notion:
@@ -35,23 +55,40 @@ class Notion:
         "yellow_background",
     ]
 
-    @staticmethod
-    def _load_clients_data():
-        """Load clients data from JSON file."""
-        try:
-            with open("clients.json", "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print("clients.json not found. Creating an empty dictionary.")
-            return {}
+    # Notion allows an average of 3 requests per second per integration
+    REQUESTS_PER_SECOND = 3
+    REQUEST_TIMEOUT = 30
+
+    # Retry policy shared by all Notion requests
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    # Connection pool and rate limiter shared by every instance in the process
+    session = _create_session()
+    rate_limiter = TokenBucket(rate=REQUESTS_PER_SECOND)
+
+    # Called with the method, path, status code (None on connection errors)
+    # and seconds of every request, e.g. to trace runs
+    request_hooks = []
 
-    # Load the clients data
-    CLIENTS_DATA = _load_clients_data()
+    @classmethod
+    def add_request_hook(cls, hook):
+        """Register a function called after every Notion request."""
+        if hook not in cls.request_hooks:
+            cls.request_hooks.append(hook)
 
     def __init__(self, client_id: str):
 
         self.dev = False
 
+        # Content written to the page, shown in the Results tab
+        self.logs = {}
+
+        # The ID of the last child of each block appended to, None if it has none
+        self._last_children = {}
+
         # Retrieve the Notion API key from environment variable
         NOTION_API_KEY = os.environ.get("NOTION_API_KEY")
         if self.dev:
@@ -72,25 +109,242 @@ class Notion:
 
         # Store the client ID
         self.client_id = client_id
-        # Retrieve the client data
-        self.client_data = Notion.CLIENTS_DATA.get(
-            client_id, Notion.CLIENTS_DATA["new_client"]
-        )
+        # Retrieve the client data, registering an unknown client under its own name
+        clients = get_client_registry()
+        self.client_data = clients.get(client_id) or clients.add(client_id)
 
         self.notion_page_id = self.client_data["notion_page_id"]
 
         if self.notion_page_id is None:
             # Create a new page for the client and store the page ID
-            self.notion_page_id = self._create_page()
-            self.client_data["notion_page_id"] = self.notion_page_id
-            self._save_clients_data()
+            self._recreate_page()
 
     def _save_clients_data(self):
-        """Save updated clients data to JSON file."""
-        self.CLIENTS_DATA[self.client_id] = self.client_data
-        with open("clients.json", "w") as f:
-            json.dump(self.CLIENTS_DATA, f, indent=2)
-        print(f"Successfully updated json data for {self.client_id}")
+        """Save the client's Notion page ID to the client registry."""
+        get_client_registry().set_notion_page_id(
+            self.client_id, self.notion_page_id, self.client_data["client_name"]
+        )
+        print(f"Successfully updated the client registry for {self.client_id}")
+
+    def _request(self, method, url, already_applied=None, **kwargs):
+        """
+        Make a rate-limited request to the Notion API over the shared session.
+
+        Rate limited (429) and server error (5xx) responses as well as connection
+        errors are retried with exponential backoff and full jitter, honoring the
+        Retry-After header, up to MAX_RETRIES times.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            already_applied (callable or None): For non-idempotent writes, called
+                before retrying a request that failed ambiguously (5xx or connection
+                error). If it returns True, the write landed and is not repeated.
+            **kwargs: Additional arguments for requests, e.g. json.
+
+        Returns:
+            requests.Response or None: The last response, or None if
+                already_applied reported that the write landed.
+        """
+        kwargs.setdefault("timeout", Notion.REQUEST_TIMEOUT)
+
+        for attempt in range(Notion.MAX_RETRIES + 1):
+            Notion.rate_limiter.acquire()
+
+            start = time.perf_counter()
+            try:
+                response = Notion.session.request(
+                    method, url, headers=self.headers, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._trace_request(method, url, None, start)
+                if attempt == Notion.MAX_RETRIES:
+                    raise NotionAPIError(f"{method} {url} failed: {e}") from e
+                response = None
+                print(f"Notion request failed ({e}). Retrying.")
+            else:
+                self._trace_request(method, url, response.status_code, start)
+                if response.status_code not in Notion.RETRY_STATUS_CODES:
+                    return response
+                if attempt == Notion.MAX_RETRIES:
+                    return response
+                print(
+                    f"Notion request failed with status code {response.status_code}. Retrying."
+                )
+
+            time.sleep(self._retry_delay(attempt, response))
+
+            # A 429 is never applied, anything else might have been
+            ambiguous = response is None or response.status_code != 429
+            if ambiguous and already_applied is not None and already_applied():
+                print("The failed request was applied by Notion. Not retrying it.")
+                return None
+
+    @staticmethod
+    def _trace_request(method, url, status_code, start):
+        """Report a request to the registered request hooks."""
+        seconds = time.perf_counter() - start
+        path = url.replace("https://api.notion.com/v1", "")
+        for hook in Notion.request_hooks:
+            try:
+                hook(method, path, status_code, seconds)
+            except Exception as e:
+                print(f"Notion request hook failed: {e}")
+
+    @staticmethod
+    def _error_data(response):
+        """Get the error object of a failed response, empty if it is not JSON."""
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _retry_delay(attempt, response=None):
+        """
+        Compute how long to wait before retrying a request.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 0.
+            response (requests.Response or None): The failed response.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), Notion.BACKOFF_MAX)
+            except ValueError:
+                pass
+
+        # Exponential backoff with full jitter
+        backoff = min(Notion.BACKOFF_MAX, Notion.BACKOFF_BASE * 2**attempt)
+        return random.uniform(0, backoff)
+
+    def _get_block_children(self, block_id, start_cursor=None):
+        """
+        Retrieve all children of a block or page, following pagination.
+
+        Args:
+            block_id (str): The ID of the block or page.
+            start_cursor (str or None): The ID of the child to start from.
+                Defaults to the first child.
+
+        Returns:
+            list: The child blocks, in page order.
+        """
+        url = f"https://api.notion.com/v1/blocks/{block_id}/children"
+        params = {"page_size": 100}
+        if start_cursor is not None:
+            # Notion's block children cursors are block IDs
+            params["start_cursor"] = start_cursor
+        children = []
+
+        while True:
+            response = self._request("GET", url, params=params)
+            if response.status_code != 200:
+                raise NotionAPIError(
+                    f"Failed to retrieve the block children. Status code: {response.status_code}",
+                    response,
+                )
+
+            data = response.json()
+            children.extend(data.get("results", []))
+
+            if not data.get("has_more"):
+                return children
+            params["start_cursor"] = data["next_cursor"]
+
+    @staticmethod
+    def _block_signature(block):
+        """Describe a block by its type and plain text, to compare sent and stored blocks."""
+        block_type = block.get("type")
+        rich_text = block.get(block_type, {}).get("rich_text", [])
+        text = "".join(
+            item.get("plain_text") or item.get("text", {}).get("content", "")
+            for item in rich_text
+        )
+        return block_type, text
+
+    def _find_batch_at_end(self, block_id, batch):
+        """
+        Find a batch of blocks at the end of a block's children.
+
+        Used to check a failed append whose position was not known when it was
+        sent, i.e. the first append to a parent whose children were never read,
+        so the normal path never lists the children up front.
+
+        Args:
+            block_id (str): The ID of the parent block or page.
+            batch (list): The blocks that were sent.
+
+        Returns:
+            list or None: The stored blocks matching the batch, or None if the
+                batch was not appended.
+        """
+        try:
+            children = self._get_block_children(block_id)
+        except NotionAPIError:
+            return None
+
+        added = children[-len(batch) :] if len(children) >= len(batch) else []
+        if not added or [self._block_signature(block) for block in added] != [
+            self._block_signature(block) for block in batch
+        ]:
+            return None
+
+        return added
+
+    def _find_appended_batch(self, block_id, batch, after=None, before=None):
+        """
+        Find a batch of blocks among a block's children, where it would have been appended.
+
+        The position of the batch is recorded before it is sent: the block it
+        follows and the block that followed that one. Only the blocks between
+        the two are read and compared, so a section that legitimately repeats
+        earlier content is never mistaken for the batch.
+
+        Args:
+            block_id (str): The ID of the parent block or page.
+            batch (list): The blocks that were sent.
+            after (str or None): The ID of the block the batch was added after,
+                or None if the parent had no children before it.
+            before (str or None): The ID of the block that followed `after`
+                before the batch was sent, or None if `after` was the last child.
+
+        Returns:
+            list or None: The stored blocks matching the batch, or None if the
+                batch was not appended.
+        """
+        try:
+            # Read from the preceding block on, instead of the whole page
+            children = self._get_block_children(block_id, start_cursor=after)
+        except NotionAPIError:
+            return None
+
+        if after is not None:
+            if not children or children[0].get("id") != after:
+                return None
+            children = children[1:]
+
+        ids = [child.get("id") for child in children]
+        if before is not None and before not in ids:
+            return None
+        added = children[: ids.index(before)] if before is not None else children
+
+        if len(added) != len(batch) or [
+            self._block_signature(block) for block in added
+        ] != [self._block_signature(block) for block in batch]:
+            return None
+
+        return added
+
+    def _recreate_page(self):
+        """Create a new page for the client, replacing an archived or deleted one."""
+        self.notion_page_id = self._create_page()
+        self._last_children[self.notion_page_id] = None
+        self.client_data["notion_page_id"] = self.notion_page_id
+        self._save_clients_data()
 
     def _create_page(self):
         """
@@ -100,7 +354,10 @@ class Notion:
         Creates the page as a child of self.parent_page.
 
         Returns:
-            str or None: The ID of the new page if successful, None otherwise.
+            str: The ID of the new page.
+
+        Raises:
+            NotionAPIError: If the page could not be created.
         """
 
         # Get the client's page details
@@ -132,7 +389,7 @@ class Notion:
         }
 
         # Make the POST request
-        response = requests.post(self.base_url, headers=self.headers, json=data)
+        response = self._request("POST", self.base_url, json=data)
 
         # Check the response
         if response.status_code == 200:
@@ -142,81 +399,176 @@ class Notion:
         else:
             print(f"Failed to create the page. Status code: {response.status_code}")
             print(response.text)
-            return None
+            raise NotionAPIError(
+                f"Failed to create the page. Status code: {response.status_code}",
+                response,
+            )
 
     def _generate_bulleted_list_items(self, list_contents):
         contents_list = []
         for content in list_contents:
-            child = {
-                "object": "block",
-                "type": "bulleted_list_item",
-                "bulleted_list_item": {
-                    "rich_text": [{"type": "text", "text": {"content": content}}]
-                },
-            }
-            contents_list.append(child)
+            # Long content is split to respect Notion's rich_text limits
+            contents_list.extend(text_blocks("bulleted_list_item", content))
 
         return contents_list
 
-    def _add_content_to_page(self, children):
+    def _add_content_to_page(self, children, after=None, block_id=None, before=None):
         """
-        Add content blocks to the Notion page in batches of 10.
+        Add content blocks to the Notion page in as few requests as possible.
+
+        Blocks are packed up to Notion's per-request block, nesting and payload
+        limits. Children that do not fit in a request are added to their parent
+        block once it has been created. Requests are paced by the shared rate
+        limiter, and failed requests are retried without appending a batch twice.
+        If the page is archived or deleted, a new page is created once per call
+        and the remaining batches are added to it.
 
         Args:
             children (list): List of content blocks to add.
+            after (str or None): The ID of the block to insert the content after.
+                Defaults to appending at the end.
+            block_id (str or None): The ID of the block to add the content to.
+                Defaults to the client's page.
+            before (str or None): The ID of the block following `after`, or None
+                if `after` is the last block. Used to check failed requests.
+
+        Returns:
+            list: The created top-level blocks.
 
-        Prints success or failure message.
+        Raises:
+            NotionAPIError: If a batch could not be added.
         """
         if self.dev:
-            return
-
-        batch_size = 50
-        for i in range(0, len(children), batch_size):
-            batch = children[i : i + batch_size]
-
-            # Create the request body for this batch
-            data = {"children": batch}
-
-            url = f"https://api.notion.com/v1/blocks/{self.notion_page_id}/children"
-            # Make a PATCH request to update the block children
-            response = requests.patch(url, headers=self.headers, json=data)
-
-            # Check the response
-            if response.status_code == 200:
-                print(
-                    f"Successfully updated page in Notion (batch {i//batch_size + 1})"
+            return []
+
+        created = []
+        page_recreated = False
+        for batch_number, (batch, deferred) in enumerate(pack_blocks(children), 1):
+
+            while True:
+                # Create the request body for this batch
+                data = {"children": batch}
+                if after is not None:
+                    data["after"] = after
+
+                # Record where the batch goes before sending it, to check an
+                # ambiguous failure against only the blocks added since. The
+                # last child of the parent is known from earlier responses, and
+                # is never looked up before sending.
+                parent_id = block_id or self.notion_page_id
+                at_end = after is None or before is None
+                position_known = after is not None or parent_id in self._last_children
+                batch_after = after if after is not None else self._last_children.get(parent_id)
+                batch_before = None if at_end else before
+                applied = {}
+
+                def already_applied():
+                    if position_known:
+                        applied["blocks"] = self._find_appended_batch(
+                            parent_id, batch, after=batch_after, before=batch_before
+                        )
+                    else:
+                        applied["blocks"] = self._find_batch_at_end(parent_id, batch)
+                    return applied["blocks"] is not None
+
+                url = f"https://api.notion.com/v1/blocks/{parent_id}/children"
+                # Make a PATCH request to update the block children
+                response = self._request(
+                    "PATCH", url, json=data, already_applied=already_applied
                 )
 
-            elif response.status_code == 400:
-                error_data = response.json()
-                if error_data.get(
-                    "code"
-                ) == "validation_error" and "archived" in error_data.get("message", ""):
+                # Check the response
+                if response is None or response.status_code == 200:
+                    print(f"Successfully updated page in Notion (batch {batch_number})")
+                    results = (
+                        applied["blocks"]
+                        if response is None
+                        else response.json().get("results", [])
+                    )
+                    created.extend(results)
+                    if at_end and results:
+                        self._last_children[parent_id] = results[-1]["id"]
+
+                    # Add the children that did not fit in the request
+                    for result, overflow in zip(results, deferred):
+                        if overflow:
+                            self._add_content_to_page(overflow, block_id=result["id"])
+
+                    # Keep the following batches in order after this one
+                    if after is not None and results:
+                        after = results[-1]["id"]
+                    break
+
+                error_data = self._error_data(response) if response.status_code == 400 else {}
+                if (
+                    block_id is None
+                    and not page_recreated
+                    and error_data.get("code") == "validation_error"
+                    and "archived" in error_data.get("message", "")
+                ):
                     print(
                         "Block is archived or doesn't exist. Attempting to create a new block."
                     )
 
-                    # Create a new page for the client and store the page ID
-                    self.notion_page_id = self._create_page()
-                    self.client_data["notion_page_id"] = self.notion_page_id
-                    self._save_clients_data()
-
-                    # Retry adding this batch to the new page
-                    self._add_content_to_page(batch)
+                    # Create a new page for the client and retry this batch on it
+                    self._recreate_page()
+                    page_recreated = True
+                    after = before = None
+                    continue
 
-                else:
-                    print(
-                        f"Failed to update the block children (batch {i//batch_size + 1}). Status code: {response.status_code}"
-                    )
-                    print(response.text)
-            else:
                 print(
-                    f"Failed to update the block children (batch {i//batch_size + 1}). Status code: {response.status_code}"
+                    f"Failed to update the block children (batch {batch_number}). Status code: {response.status_code}"
                 )
                 print(response.text)
+                raise NotionAPIError(
+                    f"Failed to update the block children (batch {batch_number}). Status code: {response.status_code}",
+                    response,
+                )
+
+        return created
+
+    def _update_block(self, block):
+        """
+        Replace the content of an existing block.
+
+        Args:
+            block (dict): The new block, with the "id" of the block to update.
+        """
+        block_type = block["type"]
+        url = f"https://api.notion.com/v1/blocks/{block['id']}"
+        response = self._request("PATCH", url, json={block_type: block[block_type]})
+
+        if response.status_code != 200:
+            raise NotionAPIError(
+                f"Failed to update block {block['id']}. Status code: {response.status_code}",
+                response,
+            )
 
-            # Add a small delay between batches to avoid rate limiting
-            time.sleep(1)
+    def _delete_block(self, block_id):
+        """
+        Delete (archive) a block.
+
+        Args:
+            block_id (str): The ID of the block to delete.
+        """
+        url = f"https://api.notion.com/v1/blocks/{block_id}"
+        response = self._request("DELETE", url)
+
+        # Forget a deleted block as the last child of its parent
+        for parent_id, last_id in list(self._last_children.items()):
+            if last_id == block_id:
+                del self._last_children[parent_id]
+
+        # A block that is gone or already archived was deleted by a previous attempt
+        already_deleted = response.status_code == 404 or (
+            response.status_code == 400
+            and "archived" in self._error_data(response).get("message", "")
+        )
+        if response.status_code != 200 and not already_deleted:
+            raise NotionAPIError(
+                f"Failed to delete block {block_id}. Status code: {response.status_code}",
+                response,
+            )
 
     def add_toggleable_notion_block(self, title, content):
         """
@@ -235,7 +587,7 @@ class Notion:
         content_block = {
             "type": "heading_2",
             "heading_2": {
-                "rich_text": [{"type": "text", "text": {"content": title}}],
+                "rich_text": rich_text(title)[0],
                 "is_toggleable": True,
                 "children": [],
             },
@@ -246,24 +598,129 @@ class Notion:
                 content
             )
         else:
-            content_block["heading_2"]["children"] = [
-                {
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [{"type": "text", "text": {"content": content}}]
-                    },
-                }
-            ]
+            content_block["heading_2"]["children"] = text_blocks("paragraph", content)
 
-        st.session_state["logs"][title] = content
+        self.logs[title] = content
 
         # Add the content to the page
         self._add_content_to_page(children=[content_block])
 
         return
 
-    def update_project_workbook(self, workbook_contents):
+    @staticmethod
+    def _get_title_element(text_content):
+        return {
+            "type": "heading_2",
+            "heading_2": {
+                "rich_text": rich_text(text_content)[0],
+                "color": "purple_background",
+            },
+        }
+
+    @staticmethod
+    def _is_section_heading(block):
+        """Check whether a block is the heading of a workbook section."""
+        heading = block.get("heading_2")
+        return (
+            block.get("type") == "heading_2"
+            and heading.get("color") == "purple_background"
+            and not heading.get("is_toggleable")
+        )
+
+    def _parse_sections(self, blocks):
+        """
+        Find the workbook sections among consecutive top-level blocks.
+
+        A section is a purple heading followed by its bulleted list items. If a
+        title appears more than once, the last section with that title is used.
+
+        Returns:
+            dict: Section titles mapped to {"heading": block, "items": [blocks],
+                "next": the ID of the block after the section, None if it is last}.
+        """
+        sections = {}
+        current = None
+
+        for block in blocks:
+            if current is not None and block.get("type") == "bulleted_list_item":
+                current["items"].append(block)
+                continue
+
+            # The section ends before this block
+            if current is not None:
+                current["next"] = block["id"]
+
+            if self._is_section_heading(block):
+                current = {"heading": block, "items": [], "next": None}
+                sections[self._block_signature(block)[1]] = current
+            else:
+                current = None
 
+        return sections
+
+    def _get_workbook_sections(self):
+        """
+        Read the workbook sections already on the page.
+
+        Returns:
+            dict: The sections, as returned by _parse_sections.
+        """
+        blocks = self._get_block_children(self.notion_page_id)
+        self._last_children[self.notion_page_id] = blocks[-1]["id"] if blocks else None
+        return self._parse_sections(blocks)
+
+    def _sync_section(self, section, items):
+        """
+        Update an existing workbook section in place, touching only the changed items.
+
+        Args:
+            section (dict): The existing section, as returned by _get_workbook_sections.
+                Its items are replaced by the blocks now on the page.
+            items (list): The new bulleted list item blocks of the section.
+        """
+        existing = section["items"]
+        kept = []
+
+        # Update changed items in place
+        for old_block, new_block in zip(existing, items):
+            if self._block_signature(old_block) != self._block_signature(new_block):
+                self._update_block(dict(new_block, id=old_block["id"]))
+                old_block = dict(new_block, id=old_block["id"])
+            kept.append(old_block)
+
+        # Append new items after the last existing one
+        added = []
+        if len(items) > len(existing):
+            last = existing[-1] if existing else section["heading"]
+            added = self._add_content_to_page(
+                items[len(existing) :], after=last["id"], before=section["next"]
+            )
+
+        # Delete items that are no longer part of the section
+        for old_block in existing[len(items) :]:
+            self._delete_block(old_block["id"])
+
+        section["items"] = kept + added
+
+    @staticmethod
+    def _section_title(key):
+        """Get the title of the workbook section of a workbook element."""
+        return key.replace("_", " ").title()
+
+    def _section_items(self, value):
+        """Create the bulleted list items of a workbook section."""
+        if isinstance(value, list):
+            return self._generate_bulleted_list_items(value)
+        return self._generate_bulleted_list_items([value])
+
+    def _append_sections(self, new_sections, sections):
+        """
+        Append workbook sections at the end of the page.
+
+        Args:
+            new_sections (dict): Section titles mapped to their bulleted list item blocks.
+            sections (dict): The sections on the page, updated with the new ones.
+        """
         children = []
 
         # children.append(
@@ -278,32 +735,114 @@ class Notion:
         #     }
         # )
 
-        def get_title_element(text_content):
-            return {
-                "type": "heading_2",
-                "heading_2": {
-                    "rich_text": [{"type": "text", "text": {"content": text_content}}],
-                    "color": "purple_background",
-                },
-            }
+        for title, items in new_sections.items():
+            # Add the title element and the bulleted list items
+            children.append(self._get_title_element(title))
+            children.extend(items)
+
+        page_id = self.notion_page_id
+        created = self._add_content_to_page(children=children)
+
+        if self.notion_page_id != page_id:
+            # The sections were added to a new page
+            sections.clear()
+        elif created:
+            # The last section on the page is now followed by the first new one
+            for section in sections.values():
+                if section["next"] is None:
+                    section["next"] = created[0]["id"]
+        sections.update(self._parse_sections(created))
+
+    def update_project_workbook(self, workbook_contents, sync=True, sections=None):
+        """
+        Write the project workbook sections to the client's page.
 
-        for key, value in workbook_contents.items():
+        In sync mode, the sections already on the page are matched by title and
+        only the changed items are updated, appended or deleted. Unchanged
+        sections cost no write, and new sections are appended at the end.
 
-            # Convert the key to title case
-            title = key.replace("_", " ").title()
+        Args:
+            workbook_contents (dict): Workbook elements mapped to a string or a list of strings.
+            sync (bool): Sync the existing sections instead of appending all of them again.
+            sections (dict or None): The sections on the page, as returned by a
+                previous call, to sync against without reading the page again.
+
+        Returns:
+            dict: The sections on the page after the update, in sync mode.
+        """
+        if sync and not self.dev:
+            existing_sections = sections if sections is not None else self._get_workbook_sections()
+        else:
+            existing_sections = {}
 
-            # Add the title element
-            children.append(get_title_element(title))
-            # Add the bulleted list items
+        new_sections = {}
+        for key, value in workbook_contents.items():
+            title = self._section_title(key)
+            items = self._section_items(value)
+            self.logs[title] = value
 
-            if isinstance(value, list):
-                children.extend(self._generate_bulleted_list_items(value))
+            if title in existing_sections:
+                # Only write what changed in the section
+                self._sync_section(existing_sections[title], items)
             else:
-                children.extend(self._generate_bulleted_list_items([value]))
+                new_sections[title] = items
 
-            st.session_state["logs"][title] = value
+        # Add the new sections to the page
+        if new_sections:
+            self._append_sections(new_sections, existing_sections)
 
-        # Add the content to the page
-        self._add_content_to_page(children=children)
+        return existing_sections
 
-        return
+    def add_workbook_sections(self, workbook_contents, sections=None):
+        """
+        Append the workbook sections that are not on the page yet, leaving existing ones unchanged.
+
+        Args:
+            workbook_contents (dict): Workbook elements mapped to a string or a list of strings.
+            sections (dict or None): The sections on the page, as returned by a
+                previous call. Read from the page if None.
+
+        Returns:
+            tuple: The sections on the page after the update, and the keys of
+                workbook_contents that were added.
+        """
+        if sections is None:
+            sections = self._get_workbook_sections() if not self.dev else {}
+
+        new_sections = {}
+        added = []
+        for key, value in workbook_contents.items():
+            title = self._section_title(key)
+            if title in sections or title in new_sections:
+                continue
+            new_sections[title] = self._section_items(value)
+            self.logs[title] = value
+            added.append(key)
+
+        if new_sections:
+            self._append_sections(new_sections, sections)
+
+        return sections, added
+
+    def remove_workbook_sections(self, keys, sections):
+        """
+        Delete workbook sections from the page.
+
+        Args:
+            keys (list[str]): The workbook elements of the sections to delete.
+            sections (dict): The sections on the page, updated to exclude the deleted ones.
+        """
+        for key in keys:
+            title = self._section_title(key)
+            section = sections.pop(title, None)
+            if section is None:
+                continue
+
+            for block in [section["heading"], *section["items"]]:
+                self._delete_block(block["id"])
+            self.logs.pop(title, None)
+
+            # The section before the deleted one is now followed by what followed it
+            for other in sections.values():
+                if other["next"] == section["heading"]["id"]:
+                    other["next"] = section["next"]
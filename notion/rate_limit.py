@@ -0,0 +1,54 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second up to `capacity`. Each
+    request takes one token, waiting until one is available, so bursts of up to
+    `capacity` requests go out immediately and sustained traffic is held to `rate`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float or None): The maximum number of tokens. Defaults to rate.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens from the bucket, blocking until they are available.
+
+        Args:
+            tokens (float): The number of tokens to take.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,185 @@
+import os
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from pmbok.index import PMBOKIndex
+
+
+# Queries with at most this many terms may be answered by keyword search alone
+KEYWORD_MAX_TERMS = int(os.environ.get("PMBOK_KEYWORD_MAX_TERMS", 4))
+
+# Constant of reciprocal rank fusion, dampening the weight of the top ranks
+RRF_K = 60
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from how in is it of on or that the this to
+    what when where which who why with do does should can i we you our your
+    """.split()
+)
+
+
+def tokenize(text):
+    """
+    Split text into lowercase search terms, without stopwords.
+
+    Returns:
+        list[str]: The terms, in order.
+    """
+    return [term for term in re.findall(r"[a-z0-9]+", text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory inverted index with BM25 scoring over the chunks of a PMBOKIndex.
+
+    Rows are the same as the rows of the PMBOKIndex, so lexical and vector
+    results can be fused by row. The postings of each term are stored as numpy
+    arrays, so a query is scored with a few vectorized updates per term.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        """
+        Args:
+            chunks (list[dict]): The chunks, each with a "text".
+            k1 (float): The term frequency saturation of BM25.
+            b (float): The document length normalization of BM25.
+        """
+        self.k1 = k1
+        self.b = b
+        self.count = len(chunks)
+        self.rows = {chunk.get("id"): row for row, chunk in enumerate(chunks)}
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(self.count, dtype=np.float32)
+        for row, chunk in enumerate(chunks):
+            terms = tokenize(chunk["text"])
+            lengths[row] = len(terms)
+            for term, frequency in Counter(terms).items():
+                rows, frequencies = postings[term]
+                rows.append(row)
+                frequencies.append(frequency)
+
+        self.postings = {
+            term: (np.array(rows, dtype=np.int32), np.array(frequencies, dtype=np.float32))
+            for term, (rows, frequencies) in postings.items()
+        }
+
+        # Length normalization of each row, computed once for all queries
+        average_length = lengths.mean() if self.count else 0.0
+        self.norms = k1 * (1 - b + b * lengths / (average_length or 1.0))
+
+    @classmethod
+    def shared(cls, index_dir=PMBOKIndex.DEFAULT_DIR):
+        """
+        Get the inverted index of the chunks of a PMBOKIndex, building it once per process.
+
+        The inverted index is rebuilt when the PMBOKIndex of the directory was
+        rebuilt, so its rows always match the rows of the current index.
+
+        Returns:
+            BM25Index: The shared inverted index.
+        """
+        index = PMBOKIndex.shared(index_dir)
+        with cls._shared_lock:
+            version, bm25 = cls._shared.get(index_dir, (None, None))
+            if version != index.version:
+                bm25 = cls(index.chunks)
+                cls._shared[index_dir] = (index.version, bm25)
+            return bm25
+
+    def idf(self, term):
+        frequency = len(self.postings[term][0]) if term in self.postings else 0
+        return math.log(1 + (self.count - frequency + 0.5) / (frequency + 0.5))
+
+    def score(self, query):
+        """
+        Score every row against a query.
+
+        Returns:
+            tuple: The BM25 score of each row, and the share of the query's
+                IDF weight matched by each row, from 0 to 1.
+        """
+        scores = np.zeros(self.count, dtype=np.float32)
+        matched = np.zeros(self.count, dtype=np.float32)
+
+        terms = set(tokenize(query))
+        total_idf = sum(self.idf(term) for term in terms)
+        for term in terms:
+            if term not in self.postings:
+                continue
+            rows, frequencies = self.postings[term]
+            idf = self.idf(term)
+            scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + self.norms[rows])
+            matched[rows] += idf
+
+        return scores, matched / (total_idf or 1.0)
+
+    def search(self, query, k=5):
+        """
+        Find the rows that best match a query.
+
+        Returns:
+            list[tuple]: The row, BM25 score and matched share of the query of
+                each matching row, best first.
+        """
+        scores, coverage = self.score(query)
+        top = PMBOKIndex._top_k(scores, k)
+        return [(int(row), float(scores[row]), float(coverage[row])) for row in top if scores[row] > 0]
+
+
+def hybrid_search(
+    query, k=5, index_dir=PMBOKIndex.DEFAULT_DIR, candidates=20, query_vector=None
+):
+    """
+    Search the PMBOK with BM25 and vector similarity.
+
+    Short queries whose top k keyword matches all contain every query term,
+    e.g. "WBS" or "scope validation", are answered from the inverted index
+    alone, without an embedding call. Other queries fuse the keyword and
+    vector rankings with reciprocal rank fusion.
+
+    Args:
+        query (str): The query.
+        k (int): The number of chunks to return.
+        index_dir (str): The directory of the PMBOKIndex.
+        candidates (int): The number of results of each ranking that are fused.
+        query_vector (list[float] or None): The embedding of the query, if it
+            was already embedded with the model of the index.
+
+    Returns:
+        list[dict]: The chunks with their "score" and the search "mode", best first.
+    """
+    index = PMBOKIndex.shared(index_dir)
+    bm25 = BM25Index.shared(index_dir)
+    keyword_results = bm25.search(query, k=max(k, candidates))
+
+    # Keyword-only fast path when lexical confidence is high
+    top = keyword_results[:k]
+    if (
+        len(tokenize(query)) <= KEYWORD_MAX_TERMS
+        and len(top) == min(k, index.count)
+        and all(coverage >= 0.999 for _, _, coverage in top)
+    ):
+        return [dict(index.chunks[row], score=score, mode="keyword") for row, score, _ in top]
+
+    if query_vector is not None:
+        vector_results = index.search(query_vector, k=max(k, candidates))
+    else:
+        vector_results = index.search_text(query, k=max(k, candidates))
+
+    fused = defaultdict(float)
+    for rank, (row, _, _) in enumerate(keyword_results):
+        fused[row] += 1.0 / (RRF_K + rank + 1)
+    for rank, result in enumerate(vector_results):
+        fused[bm25.rows[result["id"]]] += 1.0 / (RRF_K + rank + 1)
+
+    best = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [dict(index.chunks[row], score=fused[row], mode="hybrid") for row in best]
@@ -0,0 +1,190 @@
+"""
+Precompute the PMBOK guidance for each project workbook element.
+
+The guidance on the standard workbook elements is the same for every client,
+so it is retrieved from the local PMBOK index and condensed once, cached on
+disk, and injected into the task prompts instead of being looked up by the
+agents on every run.
+
+Usage:
+    python -m pmbok.context [--force]
+"""
+
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pmbok.index import PMBOKIndex
+
+
+PMBOK_CONTEXT_PATH = os.environ.get("PMBOK_CONTEXT_PATH", "db/pmbok_context.json")
+
+# Model condensing the retrieved passages
+CONTEXT_MODEL = os.environ.get("PMBOK_CONTEXT_MODEL", "gpt-4o-mini")
+
+CONDENSE_PROMPT = """You are an expert in the PMBOK Guide.
+Using only the passages of the PMBOK Guide below, state in at most three sentences what the "{element}" element of a project workbook should contain and how to write it.
+
+Passages:
+{passages}"""
+
+# Loaded guidance by path, with the modification time it was loaded at
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_element_context(path=PMBOK_CONTEXT_PATH, index_dir=PMBOKIndex.DEFAULT_DIR):
+    """
+    Load the cached guidance of the workbook elements.
+
+    The file is only read again when it was modified, so this is cheap to call
+    for every task.
+
+    Returns:
+        dict: The guidance of each element, empty if it was not built or was
+            built from another version of the index.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    with _loaded_lock:
+        if path not in _loaded or _loaded[path][0] != mtime:
+            try:
+                with open(path, "r") as f:
+                    _loaded[path] = (mtime, json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Failed to load the PMBOK context: {e}")
+                return {}
+        context = _loaded[path][1]
+
+    if context.get("version") != PMBOKIndex.current_version(index_dir):
+        return {}
+    return context.get("elements", {})
+
+
+def element_guidance(elements, path=PMBOK_CONTEXT_PATH, index_dir=PMBOKIndex.DEFAULT_DIR):
+    """
+    Get the cached guidance of workbook elements.
+
+    Guidance built from another version of the PMBOK index is ignored, so a
+    rebuilt index never serves guidance condensed from its old passages.
+
+    Returns:
+        dict: The guidance of each element that has any, in the order of elements.
+    """
+    context = load_element_context(path, index_dir)
+    return {element: context[element] for element in dict.fromkeys(elements) if element in context}
+
+
+def _condense(element, llm, index_dir, k):
+    """Retrieve the PMBOK passages on an element and condense them into guidance."""
+    from pmbok.bm25 import hybrid_search
+
+    results = hybrid_search(f"{element} project management", k=k, index_dir=index_dir)
+    passages = "\n\n".join(result["text"] for result in results)
+    response = llm.invoke(CONDENSE_PROMPT.format(element=element, passages=passages))
+    return " ".join(response.content.split())
+
+
+def build_element_context(
+    elements=None,
+    index_dir=PMBOKIndex.DEFAULT_DIR,
+    path=PMBOK_CONTEXT_PATH,
+    llm=None,
+    k=6,
+    workers=4,
+    force=False,
+):
+    """
+    Build the guidance of the workbook elements that are not cached yet.
+
+    All guidance is rebuilt when the chunks of the PMBOK index changed since
+    it was cached. The guidance is stamped with the version of the index, and
+    only served while that version is current.
+
+    Args:
+        elements (list[str] or None): The workbook elements. Defaults to PROJECT_WORKBOOK_ELEMENTS.
+        index_dir (str): The directory of the PMBOK index.
+        path (str): The path of the cached guidance.
+        llm: The chat model condensing the passages. Defaults to CONTEXT_MODEL.
+        k (int): The number of passages retrieved per element.
+        workers (int): The number of elements condensed concurrently.
+        force (bool): Rebuild the guidance of every element.
+
+    Returns:
+        dict: The guidance of each element.
+    """
+    if elements is None:
+        from agent.tasks import PROJECT_WORKBOOK_ELEMENTS
+
+        elements = PROJECT_WORKBOOK_ELEMENTS
+    elements = list(dict.fromkeys(elements))
+
+    version = PMBOKIndex.current_version(index_dir)
+    if version is None:
+        raise FileNotFoundError(
+            f"No PMBOK index in {index_dir}. Build it first with python -m pmbok.ingest"
+        )
+
+    cached = {}
+    try:
+        with open(path, "r") as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    guidance = {}
+    if not force and cached.get("version") == version:
+        guidance = {
+            element: text
+            for element, text in cached.get("elements", {}).items()
+            if element in elements
+        }
+
+    missing = [element for element in elements if element not in guidance]
+    if missing:
+        if llm is None:
+            from langchain_openai import ChatOpenAI
+
+            llm = ChatOpenAI(model_name=CONTEXT_MODEL, temperature=0)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            condensed = executor.map(lambda element: _condense(element, llm, index_dir, k), missing)
+            guidance.update(zip(missing, condensed))
+
+    guidance = {element: guidance[element] for element in elements}
+
+    # Write to a temporary file and swap it in, so readers never see a partial file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"version": version, "elements": guidance}, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+    print(f"Built the PMBOK guidance of {len(missing)} elements, {len(elements) - len(missing)} cached")
+    return guidance
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute the PMBOK guidance for each project workbook element."
+    )
+    parser.add_argument(
+        "--index-dir", default=PMBOKIndex.DEFAULT_DIR, help="The directory of the PMBOK index"
+    )
+    parser.add_argument("--path", default=PMBOK_CONTEXT_PATH, help="The path of the cached guidance")
+    parser.add_argument("--force", action="store_true", help="Rebuild the guidance of every element")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    build_element_context(index_dir=args.index_dir, path=args.path, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
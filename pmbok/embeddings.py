@@ -0,0 +1,240 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+
+# Embedding model used for the local PMBOK index
+EMBEDDING_MODEL = os.environ.get("PMBOK_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Directory of the embedding cache, or an empty string to disable it
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of the embeddings of one model, keyed by text hash.
+
+    Cache directory layout, per model:
+        vectors.f32     Append-only, row-major float32 matrix of embeddings, opened with mmap.
+        index.sqlite3   The matrix row of each text hash, and the embedding dimension.
+
+    The SQLite index is written in a transaction around each append, so several
+    processes can share one cache.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, model=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR):
+        """
+        Args:
+            model (str): The embedding model of the cached embeddings.
+            cache_dir (str): The directory of the cache.
+        """
+        self.model = model
+        self.directory = os.path.join(cache_dir, re.sub(r"[^\w.-]", "_", model))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+
+        self.hits = 0
+        self.misses = 0
+
+        # The memory-mapped matrix, reopened once the cache grows past it
+        self._vectors = None
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    @classmethod
+    def shared(cls, model=EMBEDDING_MODEL, cache_dir=EMBEDDING_CACHE_DIR):
+        """
+        Get the cache of a model, opening it once per process.
+
+        Returns:
+            EmbeddingCache: The shared cache.
+        """
+        with cls._shared_lock:
+            key = (model, cache_dir)
+            if key not in cls._shared:
+                cls._shared[key] = cls(model, cache_dir)
+            return cls._shared[key]
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _dim(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _matrix(self, dim, min_rows):
+        """Get the memory-mapped matrix, with at least min_rows rows."""
+        if self._vectors is None or len(self._vectors) < min_rows:
+            rows = os.path.getsize(self.vectors_path) // (4 * dim)
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim)
+            )
+        return self._vectors
+
+    def get_many(self, texts):
+        """
+        Look up the embeddings of texts.
+
+        Returns:
+            list[np.ndarray or None]: The embedding of each text, None if it is not cached.
+        """
+        keys = [self.key(text) for text in texts]
+
+        with self._lock:
+            rows = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i : i + 500]
+                rows.update(
+                    self._conn.execute(
+                        f"SELECT key, row FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                )
+
+            vectors = [None] * len(texts)
+            if rows:
+                matrix = self._matrix(self._dim(), max(rows.values()) + 1)
+                vectors = [
+                    np.array(matrix[rows[key]]) if key in rows else None for key in keys
+                ]
+
+            found = sum(vector is not None for vector in vectors)
+            self.hits += found
+            self.misses += len(texts) - found
+
+        return vectors
+
+    def put_many(self, texts, vectors):
+        """Add the embeddings of texts to the cache."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                dim = self._dim()
+                if dim is None:
+                    dim = vectors.shape[1]
+                    self._conn.execute(
+                        "INSERT INTO meta (name, value) VALUES ('dim', ?)", (str(dim),)
+                    )
+                elif dim != vectors.shape[1]:
+                    raise ValueError(
+                        f"Expected {dim}-dimensional embeddings for {self.model}, got {vectors.shape[1]}"
+                    )
+
+                # Drop a partial row left by an interrupted write before appending
+                with open(self.vectors_path, "ab") as f:
+                    start = f.tell() // (4 * dim)
+                    f.truncate(start * 4 * dim)
+                    f.write(vectors.tobytes())
+
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, row) VALUES (?, ?)",
+                    [(self.key(text), start + i) for i, text in enumerate(texts)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self):
+        """
+        Get the hit statistics of the cache in this process.
+
+        Returns:
+            dict: The hits, misses and hit rate, and the number of cached embeddings.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedder that only embeds texts missing from an EmbeddingCache.
+
+    The missing texts of a call are embedded together in a single
+    embed_documents call of the wrapped embedder.
+    """
+
+    def __init__(self, embedder, cache):
+        """
+        Args:
+            embedder (Embeddings): The embedder of cache misses.
+            cache (EmbeddingCache): The cache of the embedder's model.
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.model = cache.model
+
+    def embed_documents(self, texts):
+        vectors = self.cache.get_many(texts)
+
+        missing = list(
+            dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None)
+        )
+        if missing:
+            embedded = dict(zip(missing, self.embedder.embed_documents(missing)))
+            self.cache.put_many(missing, [embedded[text] for text in missing])
+            vectors = [
+                embedded[text] if vector is None else vector
+                for text, vector in zip(texts, vectors)
+            ]
+
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def default_embedder(model=EMBEDDING_MODEL):
+    """
+    Create the default embedder.
+
+    Embeddings are cached on disk in EMBEDDING_CACHE_DIR, so text embedded once,
+    e.g. by crew memory or PMBOK retrieval, is not sent to OpenAI again.
+
+    Args:
+        model (str): The OpenAI embedding model.
+
+    Returns:
+        Embeddings: An embedder with embed_documents and embed_query methods.
+    """
+    embedder = OpenAIEmbeddings(model=model)
+    if not EMBEDDING_CACHE_DIR:
+        return embedder
+    return CachedEmbeddings(embedder, EmbeddingCache.shared(model))
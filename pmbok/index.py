@@ -0,0 +1,357 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+import numpy as np
+
+
+class PMBOKIndex:
+    """
+    Local retrieval engine over PMBOK chunks.
+
+    Chunk embeddings are stored as one contiguous, L2-normalized float32 matrix
+    on disk and opened with mmap, so several worker processes share a single
+    copy through the page cache. Exact search scores every row with one
+    matrix-vector product; approximate search only scores the rows of the
+    clusters whose centroids are closest to the query.
+
+    Index directory layout:
+        meta.json       Dimension, row count, embedding model, cluster offsets and
+                        version, the sha256 of chunks.jsonl.
+        embeddings.f32  Row-major (count x dim) float32 matrix, rows grouped by cluster.
+        centroids.f32   Row-major (clusters x dim) float32 matrix of cluster centroids.
+        chunks.jsonl    One {"id", "text", "metadata"} object per matrix row.
+    """
+
+    DEFAULT_DIR = os.environ.get("PMBOK_INDEX_DIR", "db/pmbok_local")
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    # Fingerprints of indexes built without a version, with the mtime they were computed at
+    _fingerprints = {}
+    _fingerprints_lock = threading.Lock()
+
+    def __init__(self, index_dir=DEFAULT_DIR, embedder=None):
+        """
+        Args:
+            index_dir (str): The directory of a built index.
+            embedder: Object with embed_query used for text queries. Defaults to
+                the embedder of the model the index was built with.
+        """
+        self.index_dir = index_dir
+
+        with open(os.path.join(index_dir, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+
+        # Identifies the content of the index, e.g. in cache keys
+        self.version = self.meta.get("version") or self.current_version(index_dir)
+
+        self.dim = self.meta["dim"]
+        self.count = self.meta["count"]
+        self.model = self.meta.get("model")
+        self.offsets = self.meta.get("offsets", [0, self.count])
+
+        # Memory-map the embedding matrices instead of reading them into memory
+        self.embeddings = np.memmap(
+            os.path.join(index_dir, "embeddings.f32"),
+            dtype=np.float32,
+            mode="r",
+            shape=(self.count, self.dim),
+        )
+        self.centroids = np.memmap(
+            os.path.join(index_dir, "centroids.f32"),
+            dtype=np.float32,
+            mode="r",
+            shape=(len(self.offsets) - 1, self.dim),
+        )
+
+        with open(os.path.join(index_dir, "chunks.jsonl"), "r") as f:
+            self.chunks = [json.loads(line) for line in f]
+
+        self._embedder = embedder
+
+    @classmethod
+    def exists(cls, index_dir=DEFAULT_DIR):
+        """Check whether a built index exists in a directory."""
+        return os.path.exists(os.path.join(index_dir, "meta.json"))
+
+    @staticmethod
+    def fingerprint(index_dir=DEFAULT_DIR):
+        """
+        Hash the chunks of an index.
+
+        Returns:
+            str: The sha256 hex digest of chunks.jsonl.
+        """
+        digest = hashlib.sha256()
+        with open(os.path.join(index_dir, "chunks.jsonl"), "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @classmethod
+    def current_version(cls, index_dir=DEFAULT_DIR):
+        """
+        Get the version of the index currently built in a directory, without opening it.
+
+        The version is the fingerprint of the chunks recorded at build time, so
+        a copy, checkout or restore of an identical index has the same version.
+        Indexes built without one are fingerprinted once per modification.
+
+        Returns:
+            str or None: The version, None if there is no index.
+        """
+        try:
+            with open(os.path.join(index_dir, "meta.json"), "r") as f:
+                meta = json.load(f)
+            if meta.get("version"):
+                return meta["version"]
+            mtime = os.stat(os.path.join(index_dir, "chunks.jsonl")).st_mtime_ns
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        with cls._fingerprints_lock:
+            if cls._fingerprints.get(index_dir, (None,))[0] != mtime:
+                cls._fingerprints[index_dir] = (mtime, cls.fingerprint(index_dir))
+            return cls._fingerprints[index_dir][1]
+
+    @classmethod
+    def shared(cls, index_dir=DEFAULT_DIR):
+        """
+        Get the index for a directory, opening it once per version.
+
+        The index is reopened when the directory holds another version, e.g.
+        after python -m pmbok.ingest rebuilt it in another process.
+
+        Returns:
+            PMBOKIndex: The shared index.
+        """
+        version = cls.current_version(index_dir)
+        with cls._shared_lock:
+            index = cls._shared.get(index_dir)
+            if index is None or index.version != version:
+                index = cls._shared[index_dir] = cls(index_dir)
+            return index
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from pmbok.embeddings import default_embedder
+
+            self._embedder = (
+                default_embedder(self.model) if self.model else default_embedder()
+            )
+        return self._embedder
+
+    @staticmethod
+    def _normalize(vectors):
+        """L2-normalize vectors so that dot products are cosine similarities."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    @staticmethod
+    def _top_k(scores, k):
+        """Return the indices of the k highest scores, best first."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        top = np.argpartition(scores, -k)[-k:]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, query_vector, k=5, approximate=False, nprobe=4):
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            query_vector (list[float]): The query embedding.
+            k (int): The number of chunks to return.
+            approximate (bool): Only score the rows of the nprobe closest clusters.
+            nprobe (int): The number of clusters to score in approximate mode.
+
+        Returns:
+            list[dict]: The chunks with their "score", best first.
+        """
+        query = self._normalize(query_vector)
+
+        if approximate and len(self.offsets) > 2:
+            # Pick the closest clusters and score only their contiguous rows
+            clusters = self._top_k(self.centroids @ query, nprobe)
+            rows = np.concatenate(
+                [
+                    np.arange(self.offsets[c], self.offsets[c + 1])
+                    for c in sorted(clusters)
+                ]
+            )
+            scores = self.embeddings[rows] @ query
+            top = rows[self._top_k(scores, k)]
+            top_scores = self.embeddings[top] @ query
+        else:
+            scores = self.embeddings @ query
+            top = self._top_k(scores, k)
+            top_scores = scores[top]
+
+        return [
+            dict(self.chunks[row], score=float(score))
+            for row, score in zip(top, top_scores)
+        ]
+
+    def search_text(self, query, k=5, approximate=False, nprobe=4):
+        """
+        Find the chunks most relevant to a text query.
+
+        Args:
+            query (str): The query.
+            k (int): The number of chunks to return.
+            approximate (bool): Use approximate search.
+            nprobe (int): The number of clusters to score in approximate mode.
+
+        Returns:
+            list[dict]: The chunks with their "score", best first.
+        """
+        query_vector = self.embedder.embed_query(query)
+        return self.search(query_vector, k=k, approximate=approximate, nprobe=nprobe)
+
+    @staticmethod
+    def _cluster(vectors, n_clusters, iterations=10, seed=0):
+        """
+        Group normalized vectors with spherical k-means.
+
+        Returns:
+            tuple: The (n_clusters x dim) centroids and the cluster of each vector.
+        """
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)]
+
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(n_clusters):
+                members = vectors[assignments == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = PMBOKIndex._normalize(centroids)
+
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        return centroids, assignments
+
+    @classmethod
+    def build(
+        cls,
+        chunks,
+        embeddings,
+        index_dir=DEFAULT_DIR,
+        model=None,
+        n_clusters=None,
+    ):
+        """
+        Write a new index, replacing any existing one in the directory.
+
+        Args:
+            chunks (list[dict]): The chunks, each with "id", "text" and optional "metadata".
+            embeddings (list[list[float]]): The embedding of each chunk.
+            index_dir (str): The directory to write the index to.
+            model (str or None): The embedding model, used to embed text queries.
+            n_clusters (int or None): The number of clusters for approximate
+                search. Defaults to the square root of the number of chunks.
+
+        Returns:
+            PMBOKIndex: The built index.
+        """
+        vectors = cls._normalize(embeddings)
+        if vectors.ndim != 2 or len(vectors) != len(chunks) or not len(chunks):
+            raise ValueError("Expected one embedding per chunk")
+
+        if n_clusters is None:
+            n_clusters = int(np.sqrt(len(vectors)))
+        n_clusters = max(1, min(n_clusters, len(vectors)))
+
+        # Group rows by cluster so that each cluster is a contiguous slice
+        centroids, assignments = cls._cluster(vectors, n_clusters)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(n_clusters + 1))
+
+        # Write into a temporary directory and swap it in when complete
+        tmp_dir = f"{index_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        np.ascontiguousarray(vectors[order]).tofile(
+            os.path.join(tmp_dir, "embeddings.f32")
+        )
+        np.ascontiguousarray(centroids, dtype=np.float32).tofile(
+            os.path.join(tmp_dir, "centroids.f32")
+        )
+
+        # The hash of the chunks is the version of the index
+        digest = hashlib.sha256()
+        with open(os.path.join(tmp_dir, "chunks.jsonl"), "wb") as f:
+            for row in order:
+                chunk = chunks[row]
+                record = {
+                    "id": str(chunk["id"]),
+                    "text": chunk["text"],
+                    "metadata": chunk.get("metadata", {}),
+                }
+                line = (json.dumps(record) + "\n").encode("utf-8")
+                digest.update(line)
+                f.write(line)
+
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(
+                {
+                    "dim": int(vectors.shape[1]),
+                    "count": int(vectors.shape[0]),
+                    "model": model,
+                    "offsets": [int(offset) for offset in offsets],
+                    "version": digest.hexdigest(),
+                },
+                f,
+                indent=2,
+            )
+
+        old_dir = f"{index_dir}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(index_dir):
+            os.replace(index_dir, old_dir)
+        os.replace(tmp_dir, index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        # Drop the stale shared instance of this directory
+        with cls._shared_lock:
+            cls._shared.pop(index_dir, None)
+
+        return cls(index_dir)
+
+    @classmethod
+    def build_from_texts(cls, texts, index_dir=DEFAULT_DIR, embedder=None, batch_size=256):
+        """
+        Embed texts and write a new index from them.
+
+        Args:
+            texts (list[str]): The chunk texts.
+            index_dir (str): The directory to write the index to.
+            embedder: Object with embed_documents. Defaults to the default embedder.
+            batch_size (int): The number of texts per embedding request.
+
+        Returns:
+            PMBOKIndex: The built index.
+        """
+        from pmbok.embeddings import EMBEDDING_MODEL, default_embedder
+
+        embedder = embedder or default_embedder()
+        embeddings = []
+        for i in range(0, len(texts), batch_size):
+            embeddings.extend(embedder.embed_documents(texts[i : i + batch_size]))
+
+        chunks = [{"id": str(i), "text": text} for i, text in enumerate(texts)]
+        return cls.build(
+            chunks,
+            embeddings,
+            index_dir=index_dir,
+            model=getattr(embedder, "model", EMBEDDING_MODEL),
+        )
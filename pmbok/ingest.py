@@ -0,0 +1,382 @@
+"""
+Build or update the local PMBOK index from the PMBOK Guide PDF.
+
+Pages are extracted in a process pool and chunked page by page. Each page is
+tracked by the hash of its text, so re-running after the guide was revised
+only re-chunks and re-embeds the pages that changed.
+
+Usage:
+    python -m pmbok.ingest ["data/PMBOK Guide.pdf"] [--start-page 28] [--full]
+"""
+
+import re
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pmbok.index import PMBOKIndex
+
+
+PMBOK_PDF_PATH = "data/PMBOK Guide.pdf"
+
+# The first pages of the guide are front matter
+START_PAGE = 28
+
+CHUNK_MAX_CHARS = 1500
+CHUNK_OVERLAP_CHARS = 200
+
+# The PDF reader of each extraction worker process
+_reader = None
+
+
+def _init_worker(pdf_path):
+    """Open the PDF once in each worker process."""
+    global _reader
+    from pypdf import PdfReader
+
+    _reader = PdfReader(pdf_path)
+
+
+def _extract_page(page_number):
+    """Extract the text of one page in a worker process."""
+    text = _reader.pages[page_number].extract_text() or ""
+    return page_number, text.replace("\t", " ")
+
+
+def page_count(pdf_path):
+    from pypdf import PdfReader
+
+    return len(PdfReader(pdf_path).pages)
+
+
+def extract_pages(pdf_path, start_page=START_PAGE, workers=None):
+    """
+    Extract the text of the pages of a PDF in a process pool.
+
+    Args:
+        pdf_path (str): The path of the PDF.
+        start_page (int): The zero-based number of the first page to extract.
+        workers (int or None): The number of worker processes. Defaults to the number of CPUs.
+
+    Yields:
+        tuple: The page number and text of each page, in page order, as soon as they are extracted.
+    """
+    page_numbers = range(start_page, page_count(pdf_path))
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(pdf_path,)
+    ) as executor:
+        yield from executor.map(_extract_page, page_numbers, chunksize=8)
+
+
+def _split_sentence(sentence, max_chars):
+    """Split a sentence longer than max_chars at spaces, and words longer than max_chars anywhere."""
+    pieces = []
+    current = ""
+    for word in sentence.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if not word:
+            continue
+
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text, max_chars=CHUNK_MAX_CHARS, overlap_chars=CHUNK_OVERLAP_CHARS):
+    """
+    Split text into chunks of whole sentences.
+
+    Each chunk starts with the last sentences of the previous one, up to
+    overlap_chars, so that no passage loses its context at a chunk boundary.
+    Sentences longer than a chunk are split at spaces.
+
+    Args:
+        text (str): The text.
+        max_chars (int): The maximum number of characters per chunk.
+        overlap_chars (int): The maximum number of characters repeated from the previous chunk.
+
+    Returns:
+        list[str]: The chunks.
+    """
+    sentences = [
+        piece
+        for sentence in re.split(r"(?<=[.!?])\s+|\n\s*\n", re.sub(r" +", " ", text))
+        if sentence.strip()
+        for piece in _split_sentence(sentence.strip(), max_chars)
+    ]
+
+    chunks = []
+    current = []
+    # The length of the sentences of the current chunk joined with spaces
+    length = 0
+    for sentence in sentences:
+        if current and length + 1 + len(sentence) > max_chars:
+            chunks.append(" ".join(current))
+
+            # Carry the last sentences over into the next chunk, leaving room for the sentence
+            overlap = []
+            overlap_length = 0
+            for previous in reversed(current):
+                added = len(previous) + (1 if overlap else 0)
+                if (
+                    overlap_length + added > overlap_chars
+                    or overlap_length + added + 1 + len(sentence) > max_chars
+                ):
+                    break
+                overlap.insert(0, previous)
+                overlap_length += added
+            current, length = overlap, overlap_length
+
+        length += len(sentence) + (1 if current else 0)
+        current.append(sentence)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class LocalVectorStore:
+    """
+    Vector store backed by the local PMBOKIndex.
+
+    Upserts and deletes are applied in memory, and commit() writes the index.
+    Any object with the same upsert, delete, clear and commit methods can be
+    passed to ingest_pdf instead.
+    """
+
+    def __init__(self, index_dir=PMBOKIndex.DEFAULT_DIR, model=None):
+        """
+        Args:
+            index_dir (str): The directory of the index.
+            model (str or None): The embedding model of the embeddings.
+        """
+        self.index_dir = index_dir
+        self.model = model
+        self.records = {}
+        # Whether the existing index was loaded, i.e. the manifest can be trusted
+        self.loaded = False
+
+        # Start from the existing index, so unchanged chunks keep their embeddings
+        if PMBOKIndex.exists(index_dir):
+            try:
+                index = PMBOKIndex(index_dir)
+                for row, chunk in enumerate(index.chunks):
+                    self.records[chunk["id"]] = (
+                        chunk["text"],
+                        chunk.get("metadata", {}),
+                        np.array(index.embeddings[row]),
+                    )
+                self.loaded = True
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"The index in {index_dir} is corrupt, re-indexing every page: {e}")
+                self.records = {}
+
+    def upsert(self, ids, texts, embeddings, metadatas=None):
+        metadatas = metadatas or [{} for _ in ids]
+        for chunk_id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas):
+            self.records[chunk_id] = (text, metadata, np.asarray(embedding, dtype=np.float32))
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+    def clear(self):
+        self.records.clear()
+
+    def commit(self):
+        """Write the index, replacing the previous one."""
+        if not self.records:
+            return None
+
+        chunks = [
+            {"id": chunk_id, "text": text, "metadata": metadata}
+            for chunk_id, (text, metadata, _) in self.records.items()
+        ]
+        embeddings = np.stack([embedding for _, _, embedding in self.records.values()])
+        return PMBOKIndex.build(chunks, embeddings, index_dir=self.index_dir, model=self.model)
+
+
+def manifest_path(index_dir):
+    return f"{index_dir}.manifest.json"
+
+
+def _load_manifest(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def ingest_pdf(
+    pdf_path=PMBOK_PDF_PATH,
+    index_dir=PMBOKIndex.DEFAULT_DIR,
+    start_page=START_PAGE,
+    store=None,
+    embedder=None,
+    batch_size=128,
+    workers=None,
+    full=False,
+):
+    """
+    Index the pages of a PDF that changed since the last ingestion.
+
+    Pages whose text hash matches the manifest of the last ingestion are
+    skipped. The chunks of changed pages are embedded and upserted in batches
+    while the remaining pages are still being extracted, and the chunks of
+    removed pages are deleted.
+
+    Args:
+        pdf_path (str): The path of the PDF.
+        index_dir (str): The directory of the index, next to which the manifest is kept.
+        start_page (int): The zero-based number of the first page to index.
+        store: The vector store, with upsert, delete, clear and commit methods. Defaults to a LocalVectorStore.
+        embedder: Object with embed_documents and a model. Defaults to the default embedder.
+        batch_size (int): The number of chunks per embedding request and upsert.
+        workers (int or None): The number of page extraction processes.
+        full (bool): Re-index every page, ignoring the manifest and clearing the store.
+            Implied when the local index is missing or corrupt.
+
+    Returns:
+        dict: The number of pages seen, changed and removed, and of chunks upserted.
+    """
+    from pmbok.embeddings import EMBEDDING_MODEL, default_embedder
+
+    embedder = embedder or default_embedder()
+    model = getattr(embedder, "model", EMBEDDING_MODEL)
+    store = store or LocalVectorStore(index_dir, model=model)
+
+    path = manifest_path(index_dir)
+    manifest = _load_manifest(path)
+    settings = {
+        "model": model,
+        "start_page": start_page,
+        "chunk_max_chars": CHUNK_MAX_CHARS,
+        "chunk_overlap_chars": CHUNK_OVERLAP_CHARS,
+    }
+    known_pages = manifest.get("pages", {})
+    if isinstance(store, LocalVectorStore) and not full:
+        # The manifest only describes the index it was written with
+        indexed = all(
+            chunk_id in store.records
+            for page in known_pages.values()
+            for chunk_id in page["chunks"]
+        )
+        full = not store.loaded or not indexed
+    if full or manifest.get("settings") != settings:
+        # Chunks made with other settings can't be reused
+        full = True
+        known_pages = {}
+        store.clear()
+
+    stats = {"pages": 0, "changed_pages": 0, "removed_pages": 0, "chunks": 0}
+    pages = {}
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        ids, texts, metadatas = zip(*batch)
+        store.upsert(list(ids), list(texts), embedder.embed_documents(list(texts)), list(metadatas))
+        stats["chunks"] += len(batch)
+        batch.clear()
+
+    start = time.perf_counter()
+    for page_number, text in extract_pages(pdf_path, start_page, workers):
+        stats["pages"] += 1
+        key = str(page_number)
+        page_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        known = known_pages.get(key)
+        if known and known["hash"] == page_hash:
+            pages[key] = known
+            continue
+
+        # Re-chunk the changed page, replacing all of its old chunks
+        stats["changed_pages"] += 1
+        if known:
+            store.delete(known["chunks"])
+
+        chunk_ids = []
+        for i, chunk in enumerate(chunk_text(text)):
+            chunk_id = f"p{page_number}-{i}"
+            chunk_ids.append(chunk_id)
+            batch.append((chunk_id, chunk, {"page": page_number + 1}))
+            if len(batch) >= batch_size:
+                flush()
+
+        pages[key] = {"hash": page_hash, "chunks": chunk_ids}
+
+    flush()
+
+    # Delete the chunks of pages that are no longer in the guide
+    for key, known in known_pages.items():
+        if key not in pages:
+            stats["removed_pages"] += 1
+            store.delete(known["chunks"])
+
+    if full or stats["changed_pages"] or stats["removed_pages"]:
+        store.commit()
+
+    with open(path, "w") as f:
+        json.dump({"pdf": pdf_path, "settings": settings, "pages": pages}, f)
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the local PMBOK index from the PMBOK Guide PDF."
+    )
+    parser.add_argument("pdf_path", nargs="?", default=PMBOK_PDF_PATH, help="The PMBOK Guide PDF")
+    parser.add_argument(
+        "--index-dir", default=PMBOKIndex.DEFAULT_DIR, help="The directory of the index"
+    )
+    parser.add_argument(
+        "--start-page", type=int, default=START_PAGE, help="The zero-based first page to index"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=128, help="Chunks per embedding request and upsert"
+    )
+    parser.add_argument("--workers", type=int, help="Number of page extraction processes")
+    parser.add_argument("--full", action="store_true", help="Re-index every page")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    stats = ingest_pdf(
+        args.pdf_path,
+        index_dir=args.index_dir,
+        start_page=args.start_page,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        full=args.full,
+    )
+    print(
+        f"Indexed {stats['pages']} pages in {stats['seconds']} s: "
+        f"{stats['changed_pages']} changed, {stats['removed_pages']} removed, "
+        f"{stats['chunks']} chunks embedded"
+    )
+
+
+if __name__ == "__main__":
+    main()
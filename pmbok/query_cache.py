@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Maximum number of cached queries
+QUERY_CACHE_SIZE = int(os.environ.get("PMBOK_QUERY_CACHE_SIZE", 512))
+# Seconds a cached result is used for
+QUERY_CACHE_TTL = float(os.environ.get("PMBOK_QUERY_CACHE_TTL", 24 * 3600))
+# Path of the SQLite file persisting the cache, or an empty string to keep it in memory
+QUERY_CACHE_PATH = os.environ.get("PMBOK_QUERY_CACHE_PATH", "")
+# Minimum cosine similarity of a different query whose result is reused, or 0 to
+# only reuse the results of queries that are identical once normalized
+QUERY_CACHE_SIMILARITY = float(os.environ.get("PMBOK_QUERY_CACHE_SIMILARITY", 0))
+
+
+def normalize_query(query):
+    """Fold the case and whitespace of a query, and strip its surrounding punctuation."""
+    return " ".join(query.casefold().split()).strip(" .?!")
+
+
+class QueryCache:
+    """
+    LRU cache of search results by normalized query, with expiry.
+
+    Queries that only differ in case, whitespace or surrounding punctuation
+    share a result. With a similarity threshold, the result of a query whose
+    embedding is close enough to the new one's is reused too. Entries are
+    kept per namespace, e.g. the version of the searched index, so results are
+    never reused across index builds. With a path, entries are also written to
+    SQLite and reloaded by the next process.
+    """
+
+    def __init__(
+        self,
+        max_entries=QUERY_CACHE_SIZE,
+        ttl=QUERY_CACHE_TTL,
+        path=QUERY_CACHE_PATH,
+        similarity=QUERY_CACHE_SIMILARITY,
+        embedder=None,
+    ):
+        """
+        Args:
+            max_entries (int): The maximum number of cached queries.
+            ttl (float): The seconds a cached result is used for.
+            path (str or None): The path of the SQLite file persisting the cache.
+            similarity (float): The minimum cosine similarity of a reused query, 0 to disable.
+            embedder (Embeddings or None): The embedder of queries. Defaults to the default embedder.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._embedder = embedder
+
+        self.hits = 0
+        self.misses = 0
+
+        # (namespace, normalized query) -> (created_at, value, normalized embedding or None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    namespace TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    embedding BLOB,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, query)
+                )
+                """
+            )
+            self._conn.commit()
+            self._load()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from pmbok.embeddings import default_embedder
+
+            self._embedder = default_embedder()
+        return self._embedder
+
+    def _execute(self, query, params=()):
+        cursor = self._conn.execute(query, params)
+        self._conn.commit()
+        return cursor
+
+    def _load(self):
+        """Load the unexpired entries persisted by previous processes."""
+        self._execute("DELETE FROM query_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        rows = self._execute(
+            "SELECT namespace, query, value, embedding, created_at FROM query_cache ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+
+        for namespace, query, value, embedding, created_at in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self._entries[(namespace, query)] = (created_at, json.loads(value), vector)
+
+    def _embed(self, query):
+        vector = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _expired(self, created_at):
+        return time.time() - created_at > self.ttl
+
+    def _similar(self, namespace, vector):
+        """Find the key of the unexpired entry of a namespace most similar to an embedding."""
+        keys = [
+            key
+            for key, (created_at, _, entry_vector) in self._entries.items()
+            if key[0] == namespace and entry_vector is not None and not self._expired(created_at)
+        ]
+        if not keys:
+            return None
+
+        scores = np.stack([self._entries[key][2] for key in keys]) @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity else None
+
+    def lookup(self, query, namespace=""):
+        """
+        Look up the cached result of a query, along with the query's embedding.
+
+        The query is only embedded when there is no exact match and similarity
+        lookups are enabled, outside the lock so other lookups are not blocked
+        on the embedding request. Pass the embedding on to put() on a miss, so
+        the query is not embedded twice.
+
+        Returns:
+            tuple: The cached result, or None if there is none, and the
+                normalized embedding of the query, or None if it was not embedded.
+        """
+        key = (namespace, normalize_query(query))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], None
+
+        vector = self._embed(key[1]) if self.similarity > 0 else None
+
+        with self._lock:
+            similar = self._similar(namespace, vector) if vector is not None else None
+            if similar is None:
+                self.misses += 1
+                return None, vector
+
+            self._entries.move_to_end(similar)
+            self.hits += 1
+            return self._entries[similar][1], vector
+
+    def get(self, query, namespace=""):
+        """
+        Look up the cached result of a query.
+
+        Returns:
+            The cached result, or None if there is none.
+        """
+        return self.lookup(query, namespace)[0]
+
+    def put(self, query, value, namespace="", vector=None):
+        """
+        Cache the result of a query, evicting the least recently used entries beyond max_entries.
+
+        Args:
+            query (str): The query.
+            value: The result, serializable to JSON.
+            namespace (str): The namespace of the entry.
+            vector (numpy.ndarray or None): The normalized embedding of the query
+                returned by lookup(). The query is embedded if it is missing.
+        """
+        key = (namespace, normalize_query(query))
+        if vector is None and self.similarity > 0:
+            vector = self._embed(key[1])
+        created_at = time.time()
+
+        with self._lock:
+            self._entries[key] = (created_at, value, vector)
+            self._entries.move_to_end(key)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+            if self._conn is not None:
+                self._execute(
+                    "INSERT OR REPLACE INTO query_cache (namespace, query, value, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (*key, json.dumps(value), None if vector is None else vector.tobytes(), created_at),
+                )
+                self._conn.executemany(
+                    "DELETE FROM query_cache WHERE namespace = ? AND query = ?", evicted
+                )
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._execute("DELETE FROM query_cache")
+
+    def stats(self):
+        """
+        Get the hit statistics of the cache in this process.
+
+        Returns:
+            dict: The hits, misses and hit rate, and the number of cached queries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """
+    Get the PMBOK query cache of the process, shared by all sessions.
+
+    Returns:
+        QueryCache: The shared query cache.
+    """
+    global _query_cache
+
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+        return _query_cache
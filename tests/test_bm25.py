@@ -0,0 +1,70 @@
+import os
+import json
+
+import numpy as np
+
+from pmbok.bm25 import BM25Index, hybrid_search
+from pmbok.index import PMBOKIndex
+
+
+def test_shared_index_is_rebuilt_with_the_pmbok_index(tmp_path):
+    index_dir = str(tmp_path / "index")
+    PMBOKIndex.build([{"id": "a", "text": "scope baseline"}], np.ones((1, 2)), index_dir=index_dir)
+    first = BM25Index.shared(index_dir)
+
+    assert BM25Index.shared(index_dir) is first
+
+    chunks = [{"id": "a", "text": "scope baseline"}, {"id": "b", "text": "risk register"}]
+    PMBOKIndex.build(chunks, np.eye(2), index_dir=index_dir)
+    second = BM25Index.shared(index_dir)
+
+    assert second is not first
+    assert second.count == 2
+
+
+def test_indexes_rebuilt_by_another_process_are_reloaded(tmp_path):
+    index_dir = str(tmp_path / "index")
+    PMBOKIndex.build([{"id": "a", "text": "scope baseline"}], np.ones((1, 2)), index_dir=index_dir)
+    stale = PMBOKIndex.shared(index_dir)
+    BM25Index.shared(index_dir)
+
+    chunks = [{"id": "a", "text": "scope baseline"}, {"id": "b", "text": "risk register"}]
+    PMBOKIndex.build(chunks, np.eye(2), index_dir=index_dir)
+    # A process that did not run the build still holds the old index
+    PMBOKIndex._shared[index_dir] = stale
+
+    assert PMBOKIndex.shared(index_dir).count == 2
+    assert BM25Index.shared(index_dir).count == 2
+
+
+def test_index_without_a_version_is_fingerprinted(tmp_path):
+    index_dir = str(tmp_path / "index")
+    index = PMBOKIndex.build([{"id": "a", "text": "scope"}], np.ones((1, 2)), index_dir=index_dir)
+    meta_path = os.path.join(index_dir, "meta.json")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    del meta["version"]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
+    assert PMBOKIndex.shared(index_dir).version == index.version
+
+
+def test_hybrid_search_uses_the_given_query_vector(tmp_path):
+    index_dir = str(tmp_path / "index")
+    chunks = [{"id": "a", "text": "scope baseline"}, {"id": "b", "text": "risk register"}]
+    PMBOKIndex.build(chunks, np.eye(2), index_dir=index_dir)
+
+    class FailingEmbedder:
+        def embed_query(self, text):
+            raise AssertionError("The query was embedded again")
+
+    PMBOKIndex.shared(index_dir)._embedder = FailingEmbedder()
+    results = hybrid_search(
+        "how do we keep a register of the project risks",
+        k=1,
+        index_dir=index_dir,
+        query_vector=[0.0, 1.0],
+    )
+
+    assert [result["id"] for result in results] == ["b"]
@@ -0,0 +1,41 @@
+import json
+import shutil
+
+import numpy as np
+
+from pmbok.context import element_guidance
+from pmbok.index import PMBOKIndex
+
+
+def write_context(path, version):
+    with open(path, "w") as f:
+        json.dump({"version": version, "elements": {"Scope": "Define it."}}, f)
+
+
+def test_guidance_of_the_current_index_is_served(tmp_path):
+    index_dir, path = str(tmp_path / "index"), str(tmp_path / "context.json")
+    index = PMBOKIndex.build([{"id": "a", "text": "scope"}], np.ones((1, 2)), index_dir=index_dir)
+    write_context(path, index.version)
+
+    assert element_guidance(["Scope", "Risks"], path=path, index_dir=index_dir) == {"Scope": "Define it."}
+
+
+def test_guidance_of_another_index_version_is_ignored(tmp_path):
+    index_dir, path = str(tmp_path / "index"), str(tmp_path / "context.json")
+    index = PMBOKIndex.build([{"id": "a", "text": "scope"}], np.ones((1, 2)), index_dir=index_dir)
+    write_context(path, index.version + "0")
+
+    assert element_guidance(["Scope"], path=path, index_dir=index_dir) == {}
+    assert element_guidance(["Scope"], path=path, index_dir=str(tmp_path / "missing")) == {}
+
+
+def test_guidance_survives_a_copy_of_the_index(tmp_path):
+    index_dir, path = str(tmp_path / "index"), str(tmp_path / "context.json")
+    index = PMBOKIndex.build([{"id": "a", "text": "scope"}], np.ones((1, 2)), index_dir=index_dir)
+    write_context(path, index.version)
+
+    copy_dir = str(tmp_path / "copy")
+    shutil.copytree(index_dir, copy_dir)
+
+    assert PMBOKIndex.current_version(copy_dir) == index.version == PMBOKIndex.fingerprint(index_dir)
+    assert element_guidance(["Scope"], path=path, index_dir=copy_dir) == {"Scope": "Define it."}
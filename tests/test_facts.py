@@ -0,0 +1,13 @@
+from agent.facts import TranscriptFactStore
+
+
+def test_delete_forgets_only_the_given_transcripts(tmp_path):
+    store = TranscriptFactStore(db_path=str(tmp_path / "facts.sqlite3"))
+    store.put("client", "old", {"Goals": ["Launch the portal"]})
+    store.put("client", "kept", {"Risks": ["Budget cuts"]})
+    store.put("other", "old", {"Goals": ["Migrate the CRM"]})
+
+    store.delete("client", ["old"])
+
+    assert store.get_all("client") == {"kept": {"Risks": ["Budget cuts"]}}
+    assert store.get_all("other") == {"old": {"Goals": ["Migrate the CRM"]}}
@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+from pmbok.index import PMBOKIndex
+from pmbok.ingest import LocalVectorStore, chunk_text
+
+
+def test_chunks_never_exceed_max_chars():
+    sentences = [f"Sentence {i} " + "word " * (i % 40) + "end." for i in range(200)]
+    chunks = chunk_text(" ".join(sentences), max_chars=300, overlap_chars=80)
+
+    assert chunks
+    assert max(len(chunk) for chunk in chunks) <= 300
+
+
+def test_chunks_fill_up_to_max_chars_exactly():
+    # Two sentences of 749 characters join into exactly 1500
+    sentence = "a" * 748 + "."
+    chunks = chunk_text(" ".join([sentence] * 3), max_chars=1500, overlap_chars=0)
+
+    assert [len(chunk) for chunk in chunks] == [1499, 749]
+
+
+def test_long_sentences_are_split():
+    sentence = " ".join(["word"] * 100) + "."
+    chunks = chunk_text(sentence + " " + "x" * 120, max_chars=50, overlap_chars=10)
+
+    assert max(len(chunk) for chunk in chunks) <= 50
+    assert " ".join(chunks).replace(" ", "") == (sentence + "x" * 120).replace(" ", "")
+
+
+def test_overlap_repeats_the_last_sentences():
+    chunks = chunk_text("One two. Three four. Five six.", max_chars=21, overlap_chars=11)
+
+    assert chunks == ["One two. Three four.", "Three four. Five six."]
+
+
+def test_corrupt_index_is_not_loaded(tmp_path):
+    index_dir = str(tmp_path / "index")
+    chunks = [{"id": "a", "text": "Scope"}, {"id": "b", "text": "Schedule"}]
+    PMBOKIndex.build(chunks, np.eye(2), index_dir=index_dir)
+
+    assert LocalVectorStore(index_dir).loaded
+
+    # Truncate the embedding matrix
+    open(os.path.join(index_dir, "embeddings.f32"), "wb").close()
+    store = LocalVectorStore(index_dir)
+
+    assert not store.loaded
+    assert store.records == {}
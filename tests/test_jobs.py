@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from agent.jobs import JobRunner, JobStore
+
+
+class Unprintable:
+    def __str__(self):
+        raise ValueError("Can't print the result")
+
+
+def run(tmp_path, func):
+    runner = JobRunner(store=JobStore(str(tmp_path / "jobs.sqlite3")), max_workers=1)
+    job_id = runner.submit("project_workbook", "client", func)
+    runner._executor.shutdown(wait=True)
+    return runner, runner.store.get(job_id)
+
+
+def test_succeeded_job_stores_its_result(tmp_path):
+    runner, job = run(tmp_path, lambda: ("done", {"Scope": ["Portal"]}))
+
+    assert job["status"] == JobStore.SUCCEEDED
+    assert job["result"] == "done"
+    assert job["logs"] == {"Scope": ["Portal"]}
+    assert runner._progress == {}
+
+
+def test_failed_job_is_marked_failed(tmp_path):
+    def fail():
+        raise RuntimeError("Crew failed")
+
+    runner, job = run(tmp_path, fail)
+
+    assert job["status"] == JobStore.FAILED
+    assert "Crew failed" in job["error"]
+    assert runner._progress == {}
+
+
+def test_job_whose_result_can_not_be_stored_is_marked_failed(tmp_path):
+    runner, job = run(tmp_path, lambda: (Unprintable(), {}))
+
+    assert job["status"] == JobStore.FAILED
+    assert "Can't print the result" in job["error"]
+    assert runner._progress == {}
@@ -0,0 +1,89 @@
+import pytest
+
+crewai = pytest.importorskip("crewai")
+
+from crewai import Agent, Crew, Task
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.agents import AgentAction
+
+from agent.memory import CREW_MEMORY_ATTRIBUTES, ClientMemory
+
+
+class FakeEmbedder:
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+class RecordingChatModel(FakeListChatModel):
+    """Fake chat model keeping the messages of every call."""
+
+    prompts: list = []
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append("\n".join(str(message.content) for message in messages))
+        return super()._call(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def make_crew():
+    agent = Agent(
+        role="Tester",
+        goal="Test",
+        backstory="Tests things",
+        llm=RecordingChatModel(responses=["Final Answer: done"]),
+    )
+    task = Task(description="Do it", expected_output="Done", agent=agent)
+    return Crew(agents=[agent], tasks=[task], memory=False)
+
+
+def test_crew_declares_the_memory_attributes():
+    # ClientMemory.attach sets these private attributes of the pinned crewai
+    for name in CREW_MEMORY_ATTRIBUTES:
+        assert name in Crew.__private_attributes__
+
+
+def test_agents_use_the_attached_memory(tmp_path, monkeypatch):
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+    memory = ClientMemory("client", memory_dir=str(tmp_path), embedder=FakeEmbedder())
+    memory.short_term.storage.save("The budget is 50k", {"agent": "Tester"})
+
+    crew = memory.attach(make_crew())
+    crew.kickoff()
+    agent, task = crew.agents[0], crew.tasks[0]
+
+    # The agent reads the client's memory into its prompt
+    assert agent.crew is crew and agent.crew.memory is True
+    assert any("The budget is 50k" in prompt for prompt in agent.llm.prompts)
+
+    # and its executor writes its steps to the client's memory
+    executor = agent.agent_executor
+    executor.task = task
+    executor._create_short_term_memory(
+        AgentAction(tool="Search", tool_input="sponsor", log="The sponsor is the CFO")
+    )
+    assert any(
+        result["context"] == "The sponsor is the CFO"
+        for result in memory.short_term.storage.search("sponsor", limit=5, score_threshold=0)
+    )
+
+
+def test_attach_sets_the_client_memory(tmp_path):
+    memory = ClientMemory("client", memory_dir=str(tmp_path), embedder=FakeEmbedder())
+    crew = memory.attach(make_crew())
+
+    assert crew.memory is True
+    assert crew._short_term_memory is memory.short_term
+    assert crew._long_term_memory is memory.long_term
+    assert crew._entity_memory is memory.entities
+
+
+def test_memory_is_kept_per_client(tmp_path):
+    first = ClientMemory("first", memory_dir=str(tmp_path), embedder=FakeEmbedder())
+    second = ClientMemory("second", memory_dir=str(tmp_path), embedder=FakeEmbedder())
+
+    first.short_term.storage.save("The budget is 50k", {"agent": "Tester"})
+
+    assert first.short_term.storage.search("The budget is 50k", score_threshold=0)
+    assert not second.short_term.storage.search("The budget is 50k", score_threshold=0)
@@ -0,0 +1,267 @@
+import re
+import uuid
+from collections import Counter
+
+import pytest
+import requests
+
+import notion.notion as notion_module
+from notion.clients import ClientRegistry
+from notion.notion import Notion
+from notion.rate_limit import TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.headers = headers or {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    """
+    In-memory Notion API with injectable failures.
+
+    A failure queued with fail() applies to the next matching request: "before"
+    fails without applying it, "after" applies it and then answers 502, and
+    "disconnect" applies it and then raises a connection error.
+    """
+
+    BASE_URL = "https://api.notion.com/v1"
+
+    def __init__(self):
+        self.children = {}
+        self.counts = Counter()
+        self.failures = []
+
+    def fail(self, method, kind, status_code=500, headers=None):
+        self.failures.append((method, kind, status_code, headers))
+
+    def page(self, page_id):
+        return [block[block["type"]]["rich_text"][0]["plain_text"] for block in self.children[page_id]]
+
+    def _store(self, block):
+        block_id = uuid.uuid4().hex
+        block_type = block["type"]
+        content = dict(block[block_type])
+        children = content.pop("children", None) or []
+        content["rich_text"] = [
+            dict(item, plain_text=item.get("text", {}).get("content", ""))
+            for item in content.get("rich_text", [])
+        ]
+        self.children[block_id] = [self._store(child) for child in children]
+        return {"object": "block", "id": block_id, "type": block_type, block_type: content}
+
+    def request(self, method, url, headers=None, json=None, params=None, timeout=None):
+        self.counts[method] += 1
+
+        failure = None
+        if self.failures and self.failures[0][0] == method:
+            failure = self.failures.pop(0)
+            _, kind, status_code, failure_headers = failure
+            if kind == "before":
+                return FakeResponse(status_code, {"code": "internal_server_error"}, failure_headers)
+
+        response = self._apply(method, url.replace(self.BASE_URL, ""), json, params or {})
+        if failure is not None and failure[1] == "after":
+            return FakeResponse(502)
+        if failure is not None and failure[1] == "disconnect":
+            raise requests.ConnectionError("Connection reset")
+        return response
+
+    def _apply(self, method, path, json, params):
+        if method == "POST" and path == "/pages":
+            page_id = uuid.uuid4().hex
+            self.children[page_id] = []
+            return FakeResponse(200, {"id": page_id})
+
+        match = re.fullmatch(r"/blocks/([^/]+)/children", path)
+        if match:
+            children = self.children.setdefault(match.group(1), [])
+            ids = [child["id"] for child in children]
+
+            if method == "GET":
+                cursor = params.get("start_cursor")
+                if cursor is not None and cursor not in ids:
+                    return FakeResponse(400, {"code": "validation_error"})
+                start = ids.index(cursor) if cursor is not None else 0
+                end = start + int(params.get("page_size", 100))
+                return FakeResponse(
+                    200,
+                    {
+                        "results": children[start:end],
+                        "has_more": end < len(children),
+                        "next_cursor": ids[end] if end < len(children) else None,
+                    },
+                )
+
+            created = [self._store(block) for block in json["children"]]
+            position = ids.index(json["after"]) + 1 if json.get("after") in ids else len(children)
+            children[position:position] = created
+            return FakeResponse(200, {"results": created})
+
+        match = re.fullmatch(r"/blocks/([^/]+)", path)
+        for children in self.children.values():
+            for i, block in enumerate(children):
+                if block["id"] != match.group(1):
+                    continue
+                if method == "DELETE":
+                    del children[i]
+                else:
+                    block_type = block["type"]
+                    block[block_type] = self._store(dict(json, type=block_type))[block_type]
+                return FakeResponse(200, block)
+        return FakeResponse(404, {"code": "object_not_found"})
+
+
+@pytest.fixture
+def session(monkeypatch, tmp_path):
+    session = FakeSession()
+    registry = ClientRegistry(db_path=str(tmp_path / "clients.sqlite3"), import_path=None)
+    delays = []
+
+    monkeypatch.setattr(Notion, "session", session)
+    monkeypatch.setattr(Notion, "rate_limiter", TokenBucket(rate=1000))
+    monkeypatch.setattr(notion_module, "get_client_registry", lambda: registry)
+    monkeypatch.setattr(notion_module.time, "sleep", delays.append)
+    session.delays = delays
+    return session
+
+
+def existing_page(session, titles=()):
+    """Create a client whose page already has blocks, as a new process would find it."""
+    notion = Notion(client_id="client")
+    notion.update_project_workbook({title: ["Item"] for title in titles})
+    session.counts.clear()
+    return Notion(client_id="client")
+
+
+def test_append_does_not_list_the_page(session):
+    notion = existing_page(session, ["Scope"])
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+    notion.add_toggleable_notion_block("More Questions", ["Who signs off?"])
+
+    assert session.counts == Counter({"PATCH": 2})
+
+
+def test_failure_before_applying_is_retried(session):
+    notion = existing_page(session, ["Scope"])
+    session.fail("PATCH", "before", 503)
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+
+    assert session.page(notion.notion_page_id) == ["Scope", "Item", "Questions"]
+    assert session.counts["PATCH"] == 2
+
+
+@pytest.mark.parametrize("kind", ["after", "disconnect"])
+def test_applied_append_at_unknown_position_is_not_repeated(session, kind):
+    notion = existing_page(session, ["Scope"])
+    session.fail("PATCH", kind)
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+
+    assert session.page(notion.notion_page_id) == ["Scope", "Item", "Questions"]
+    assert session.counts["PATCH"] == 1
+
+
+@pytest.mark.parametrize("kind", ["after", "disconnect"])
+def test_applied_append_at_known_position_is_not_repeated(session, kind):
+    notion = existing_page(session, ["Scope"])
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+    session.fail("PATCH", kind)
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+
+    # The repeated block is appended once, not mistaken for the first one
+    assert session.page(notion.notion_page_id) == ["Scope", "Item", "Questions", "Questions"]
+    assert session.counts["PATCH"] == 2
+
+
+def test_rate_limited_request_waits_for_retry_after(session):
+    notion = existing_page(session)
+    session.fail("PATCH", "before", 429, {"Retry-After": "2"})
+    notion.add_toggleable_notion_block("Questions", ["What is the budget?"])
+
+    assert session.delays == [2.0]
+    assert session.page(notion.notion_page_id) == ["Questions"]
+    # A 429 is never applied, so it is retried without checking the page
+    assert session.counts["GET"] == 0
+
+
+def test_sync_only_writes_changed_items(session):
+    notion = existing_page(session)
+    notion.update_project_workbook({"Scope": ["Portal", "Reports"], "Risks": ["Delays"]})
+    session.counts.clear()
+
+    notion.update_project_workbook({"Scope": ["Portal", "Reports"], "Risks": ["Delays"]})
+    assert session.counts == Counter({"GET": 1})
+
+    session.counts.clear()
+    notion.update_project_workbook({"Scope": ["Portal", "Dashboards", "Exports"], "Risks": []})
+
+    assert session.page(notion.notion_page_id) == [
+        "Scope",
+        "Portal",
+        "Dashboards",
+        "Exports",
+        "Risks",
+    ]
+    assert session.counts == Counter({"GET": 1, "PATCH": 2, "DELETE": 1})
+
+
+def test_applied_insert_into_a_section_is_not_repeated(session):
+    notion = existing_page(session)
+    notion.update_project_workbook({"Scope": ["Portal"], "Risks": ["Delays"]})
+
+    session.fail("PATCH", "after")
+    notion.update_project_workbook({"Scope": ["Portal", "Reports"], "Risks": ["Delays"]})
+
+    assert session.page(notion.notion_page_id) == ["Scope", "Portal", "Reports", "Risks", "Delays"]
+
+
+def test_archived_block_is_already_deleted(session):
+    notion = existing_page(session)
+    session.fail("DELETE", "before", 404)
+    notion._delete_block("gone")
+
+    session.fail("DELETE", "before", 400)
+    with pytest.raises(notion_module.NotionAPIError):
+        notion._delete_block("gone")
+
+
+def test_known_sections_are_synced_without_reading_the_page(session):
+    notion = existing_page(session, ["Scope"])
+    sections = notion.update_project_workbook({"Risks": ["Delays"]})
+    session.counts.clear()
+
+    sections = notion.update_project_workbook(
+        {"Risks": ["Delays", "Budget cuts"], "Goals": ["Launch"]}, sections=sections
+    )
+    notion.update_project_workbook({"Scope": ["Portal"], "Risks": ["Delays"]}, sections=sections)
+
+    assert session.counts["GET"] == 0
+    assert session.page(notion.notion_page_id) == [
+        "Scope",
+        "Portal",
+        "Risks",
+        "Delays",
+        "Goals",
+        "Launch",
+    ]
+
+
+def test_only_new_sections_are_added_and_can_be_removed(session):
+    notion = existing_page(session, ["Scope"])
+
+    sections, added = notion.add_workbook_sections({"Scope": ["Portal"], "Risks": ["Delays"]})
+    sections, more = notion.add_workbook_sections({"Goals": ["Launch"]}, sections=sections)
+
+    assert (added, more) == (["Risks"], ["Goals"])
+    assert session.page(notion.notion_page_id) == ["Scope", "Item", "Risks", "Delays", "Goals", "Launch"]
+
+    notion.remove_workbook_sections(added + more, sections)
+    notion.update_project_workbook({"Scope": ["Item", "Portal"]}, sections=sections)
+
+    assert session.page(notion.notion_page_id) == ["Scope", "Item", "Portal"]
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from agent.progress import ProgressiveWorkbookWriter
+
+
+class FakeNotion:
+    def __init__(self, titles=()):
+        self.page = {title: None for title in titles}
+        self.reads = 0
+
+    def add_workbook_sections(self, workbook_contents, sections=None):
+        if sections is None:
+            self.reads += 1
+            sections = dict(self.page)
+        added = [key for key in workbook_contents if key not in sections]
+        for key in added:
+            self.page[key] = sections[key] = workbook_contents[key]
+        return sections, added
+
+    def remove_workbook_sections(self, keys, sections):
+        for key in keys:
+            del self.page[key]
+            del sections[key]
+
+
+def test_writer_reads_the_page_once_and_only_adds_new_sections():
+    notion = FakeNotion(["Scope"])
+    with ProgressiveWorkbookWriter(notion) as writer:
+        writer.add_section("Scope", ["Portal"])
+        writer.add_section("Risks", ["Delays"])
+        writer.add_section("Goals", ["Launch"])
+
+    assert notion.reads == 1
+    assert notion.page == {"Scope": None, "Risks": ["Delays"], "Goals": ["Launch"]}
+    assert writer.written == {"Risks": ["Delays"], "Goals": ["Launch"]}
+
+
+def test_discard_removes_the_added_sections():
+    notion = FakeNotion(["Scope"])
+    with ProgressiveWorkbookWriter(notion) as writer:
+        writer.add_section("Risks", ["Delays"])
+    writer.discard()
+
+    assert notion.page == {"Scope": None}
+    assert writer.written == {}
@@ -0,0 +1,42 @@
+from pmbok.query_cache import QueryCache
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.cache = None
+        self.queries = []
+
+    def embed_query(self, text):
+        # Embedding must never block other lookups
+        assert not self.cache._lock.locked()
+        self.queries.append(text)
+        return [1.0, float(len(text))]
+
+
+def make_cache():
+    embedder = CountingEmbedder()
+    cache = QueryCache(path="", similarity=0.99, embedder=embedder)
+    embedder.cache = cache
+    return cache, embedder
+
+
+def test_miss_embeds_the_query_once():
+    cache, embedder = make_cache()
+
+    value, vector = cache.lookup("What is a WBS?", namespace="v1")
+    assert value is None
+    cache.put("What is a WBS?", ["passage"], namespace="v1", vector=vector)
+
+    assert embedder.queries == ["what is a wbs"]
+    assert cache.get("what is a WBS", namespace="v1") == ["passage"]
+    assert embedder.queries == ["what is a wbs"]
+
+
+def test_similar_query_reuses_the_result():
+    cache, embedder = make_cache()
+    cache.put("What is a WBS?", ["passage"], namespace="v1")
+
+    assert cache.get("What is a SOW?", namespace="v1") == ["passage"]
+    assert cache.get("What is a SOW?", namespace="v2") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,39 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from agent.tracing import TraceCallbackHandler, trace_run
+
+
+def response(text, cached=False, prompt_tokens=1000, completion_tokens=500):
+    generation = SimpleNamespace(
+        text=text,
+        generation_info={"cached": True} if cached else None,
+        message=SimpleNamespace(
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens}
+        ),
+    )
+    return SimpleNamespace(generations=[[generation]], llm_output=None)
+
+
+def call(handler, result):
+    run_id = uuid.uuid4()
+    handler.on_chat_model_start({}, [], run_id=run_id, invocation_params={"model_name": "gpt-4o-mini"})
+    handler.on_llm_end(result, run_id=run_id)
+
+
+def test_cache_hits_are_left_out_of_the_llm_cost(tmp_path):
+    handler = TraceCallbackHandler()
+    with trace_run(trace_dir=str(tmp_path)) as trace:
+        call(handler, response("Fresh"))
+        call(handler, response("Cached", cached=True))
+        call(handler, response("Cached", cached=True))
+
+    llm = trace.summary()["llm"]
+    assert (llm["calls"], llm["cached_calls"]) == (1, 2)
+    assert (llm["prompt_tokens"], llm["completion_tokens"]) == (1000, 500)
+    assert llm["cost_usd"] == pytest.approx((1000 * 0.15 + 500 * 0.60) / 1e6)
+    assert [entry["cached"] for entry in trace.summary()["llm_calls"]] == [False, True, True]
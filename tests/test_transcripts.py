@@ -0,0 +1,171 @@
+from agent.transcripts import (
+    MEETING_HEADING,
+    compact_transcript,
+    merge_workbook_elements,
+    split_meetings,
+    split_transcript,
+)
+
+
+def compact(text):
+    compacted, _ = compact_transcript(text)
+    return compacted.strip().splitlines()
+
+
+def test_repeated_line_of_the_same_speaker_is_dropped():
+    lines = compact(
+        "Client: We need the portal live by March.\n"
+        "Consultant: Understood, by March then.\n"
+        "Client: We need the portal live by March.\n"
+    )
+
+    assert lines == [
+        "Client: We need the portal live by March.",
+        "Consultant: Understood, by March then.",
+    ]
+
+
+def test_answer_echoing_the_question_is_kept():
+    lines = compact(
+        "Consultant: So the budget is 50k for the whole project?\n"
+        "Client: Yes, the budget is 50k for the whole project.\n"
+    )
+
+    assert lines == [
+        "Consultant: So the budget is 50k for the whole project?",
+        "Client: Yes, the budget is 50k for the whole project.",
+    ]
+
+
+def test_line_repeating_another_speaker_is_kept():
+    lines = compact(
+        "Consultant: The portal needs single sign on.\n"
+        "Client: The portal needs single sign on.\n"
+    )
+
+    assert lines == [
+        "Consultant: The portal needs single sign on.",
+        "Client: The portal needs single sign on.",
+    ]
+
+
+def test_negated_line_is_kept():
+    lines = compact(
+        "Client: We need SSO integration for the portal.\n"
+        "Consultant: Which identity provider?\n"
+        "Client: Sorry, correction. We do not need SSO integration for the portal.\n"
+        "Client: We need SSO integration for the intranet.\n"
+    )
+
+    assert lines == [
+        "Client: We need SSO integration for the portal.",
+        "Consultant: Which identity provider?",
+        "Client: Sorry, correction. We do not need SSO integration for the portal. "
+        "We need SSO integration for the intranet.",
+    ]
+
+
+def test_reordered_line_is_kept():
+    lines = compact(
+        "Client: The vendor pays the client.\n"
+        "Client: The client pays the vendor.\n"
+    )
+
+    assert lines == ["Client: The vendor pays the client. The client pays the vendor."]
+
+
+def test_merge_canonicalizes_element_names():
+    merged = merge_workbook_elements(
+        [
+            {"budget_summary": ["The budget is 50k"]},
+            {"BUDGET SUMMARY": "Paid in two installments", "risk_log": ["Vendor delays"]},
+        ],
+        known_elements=["Budget Summary"],
+    )
+
+    assert merged == {
+        "Budget Summary": ["The budget is 50k", "Paid in two installments"],
+        "Risk Log": ["Vendor delays"],
+    }
+
+
+def test_merge_drops_near_duplicates():
+    merged = merge_workbook_elements(
+        [
+            {"Scope": ["The portal must support single sign on."]},
+            {"Scope": ["the portal must support single-sign-on", "Mobile app is out of scope"]},
+            {"Scope": ["portal must support single sign"]},
+        ]
+    )
+
+    assert merged == {
+        "Scope": ["The portal must support single sign on.", "Mobile app is out of scope"]
+    }
+
+
+def test_merge_keeps_contradicting_items():
+    merged = merge_workbook_elements(
+        [
+            {"Budget Summary": ["The budget is not approved", "The budget is 50k"]},
+            {"Budget Summary": ["The budget is approved", "The budget is 60k"]},
+            {"Stakeholders": ["Dr. Smith, CFO and sponsor"]},
+            {"Stakeholders": ["Smith"]},
+        ]
+    )
+
+    assert merged == {
+        "Budget Summary": [
+            "The budget is not approved",
+            "The budget is 50k",
+            "The budget is approved",
+            "The budget is 60k",
+        ],
+        "Stakeholders": ["Dr. Smith, CFO and sponsor", "Smith"],
+    }
+
+
+def test_merge_keeps_negated_long_items():
+    merged = merge_workbook_elements(
+        [
+            {"Scope": ["The first release of the portal includes the reporting module"]},
+            {"Scope": ["The first release of the portal does not include the reporting module"]},
+        ]
+    )
+
+    assert len(merged["Scope"]) == 2
+
+
+def meeting(number, turns):
+    return MEETING_HEADING.format(number=number) + "".join(
+        f"Speaker {i % 2}: {turn}\n" for i, turn in enumerate(turns)
+    )
+
+
+def test_split_transcript_keeps_short_meetings_whole():
+    text = meeting(1, ["Hello.", "Hi."]) + meeting(2, ["Budget?", "50k."])
+
+    assert split_transcript(text, max_chars=1000) == split_meetings(text)
+
+
+def test_split_transcript_repeats_the_heading_and_cuts_between_turns():
+    text = meeting(1, [f"Point number {i} about the project scope." for i in range(40)])
+    chunks = split_transcript(text, max_chars=300)
+
+    heading = MEETING_HEADING.format(number=1)
+    bodies = [chunk[len(heading) :].lstrip("\n") for chunk in chunks]
+
+    assert len(chunks) > 1
+    for chunk, body in zip(chunks, bodies):
+        assert len(chunk) <= 300
+        assert chunk.startswith(heading)
+        assert body.startswith("Speaker ")
+        assert body.endswith("scope.\n")
+    assert "".join(bodies) == text[len(heading) :]
+
+
+def test_split_transcript_cuts_long_turns():
+    text = meeting(1, ["word " * 500])
+    chunks = split_transcript(text, max_chars=400)
+
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks) <= 400